@@ -4,6 +4,7 @@ import numpy as np
 import md_stars as mds
 import md_universe as mdu
 import ag_prmtop_helper_functions as agphf
+import ag_filecache as agfc
 
 __version__ = "2017-08-17"
 
@@ -18,6 +19,7 @@ class AmberStuff(mdu.Universe):
         """
         mdu.Universe.__init__(self)
 
+    @agfc.cached_reader
     def read_prmtop(self, prmtop):
         """
         Read the contents of the amber prmtop-file. CHARMM-Entries will not be
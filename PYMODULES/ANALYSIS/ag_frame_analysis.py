@@ -0,0 +1,320 @@
+"""
+Map-reduce framework for analyses which process each frame of a trajectory
+independently (rmsd, rdf, h-bonds, cluster sizes, ...).
+
+The frames are split into chunks which are processed by a pool of processes.
+Only the analysis object and the names of the dcd-files are sent to the
+workers, each worker maps the dcd-files itself (see ag_lmpdcd), i.e. no
+coordinates are pickled.
+
+A new analysis derives from FrameAnalysis and implements the hooks:
+
+    prepare     called once in each process before its first frame (e.g. read
+                the topology)
+    per_frame   process a single frame and return its result
+    combine     add the result of a frame to the results of its chunk, called
+                in the worker (e.g. sum up histograms, so only one result per
+                chunk is sent back); by default all results are kept
+    reduce      combine the results of all chunks (ordered by frame) to the
+                final result, called once in the main process
+
+Examples
+--------
+
+Rmsd of each frame against the first one on 8 processes
+-------------------------------------------------------
+rmsds = RMSDAnalysis("system.dcd", reference=0, atm_idxs=range(24)).run(nprocs=8)
+
+Cluster sizes of every 10th frame of several pieces of the same run
+-------------------------------------------------------------------
+sizes = ClusterSizeAnalysis("system.lmpdat", "run_1.dcd", "run_2.dcd").run(step=10, nprocs=4)
+
+"""
+
+import multiprocessing
+import numpy as np
+import ag_geometry as agm
+import ag_lammps as aglmp
+import ag_lmpdcd as agldcd
+
+# analysis of each worker process (prepared once, see _init_worker)
+_WORKER_ANALYSIS = None
+
+
+class FrameAnalysis(object):
+    """
+    Base class of all analyses which process frames independently.
+    """
+    def __init__(self, *dcds):
+        """
+        Parameters
+        ----------
+        dcds : str
+            dcd-file(s) of the trajectory (several ones are chained, see
+            ag_lmpdcd.DCDChain)
+
+        """
+        self.dcds = list(dcds)
+        # atoms read of each frame (set by run)
+        self.atoms = None
+
+    def prepare(self):
+        """
+        Set up everything each process needs (called once before its first
+        frame).
+        """
+        pass
+
+    def per_frame(self, frame_idx, coords, box):
+        """
+        Analyze a single frame.
+
+        Parameters
+        ----------
+        frame_idx : int
+            index of the frame in the trajectory
+        coords : np.array
+            (natoms, 3)-array of the frame (buffer which is reused for the
+            next frame, copy if needed)
+        box : md_box.Box or None
+            box of the frame (lattice box-type)
+
+        Returns
+        -------
+        result
+            anything that can be pickled
+
+        """
+        raise NotImplementedError
+
+    def combine(self, results, result):
+        """
+        Add the result of a frame to the results of its chunk (runs in the
+        worker processes).
+
+        Parameters
+        ----------
+        results : list or None
+            results of the chunk so far (None before its first frame)
+        result
+            result of the current frame (see per_frame)
+
+        Returns
+        -------
+        results : list
+            results of the chunk; the lists of all chunks are joined and
+            passed to reduce
+
+        """
+        if results is None:
+            results = []
+
+        results.append(result)
+        return results
+
+    def reduce(self, results):
+        """
+        Combine the results of all chunks (ordered by frame index).
+        """
+        return results
+
+    def run(self, start=None, stop=None, step=None, atoms=None, nprocs=1,
+            chunks_per_proc=4, prefetch=0):
+        """
+        Analyze the frames and return the reduced result.
+
+        Parameters
+        ----------
+        start, stop, step : int or None
+            frames to analyze (same as slicing, step must be positive)
+        atoms : array of ints or None
+            read only these atoms (default: all atoms)
+        nprocs : int
+            number of processes
+        chunks_per_proc : int
+            number of chunks of frames per process (more chunks balance the
+            load if frames take different times)
+        prefetch : int
+            number of frames each process reads ahead in a background
+            thread (see ag_lmpdcd.FramePrefetcher, 0: no prefetching)
+
+        """
+        if step is not None and step < 1:
+            raise ValueError("Step must be positive!")
+
+        self.atoms = None if atoms is None else np.asarray(atoms, dtype=int)
+        trajectory = agldcd.open_dcds(*self.dcds)
+        frame_idxs = range(trajectory.nframes)[slice(start, stop, step)]
+        trajectory.close()
+
+        if nprocs == 1:
+            self.prepare()
+            return self.reduce(_run_chunk(self, frame_idxs, prefetch))
+
+        # contiguous chunks, each worker reads its frames sequentially
+        nchunks = min(nprocs * chunks_per_proc, max(len(frame_idxs), 1))
+        bounds = np.linspace(0, len(frame_idxs), nchunks + 1).astype(int)
+        chunks = [(frame_idxs[lo:hi], prefetch)
+                  for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+        # the analysis is sent to and prepared in each worker only once
+        pool = multiprocessing.Pool(nprocs, _init_worker, (self,))
+
+        try:
+            chunk_results = pool.map(_run_worker_chunk, chunks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        return self.reduce([i for chunk in chunk_results for i in chunk])
+
+
+def _init_worker(analysis):
+    """
+    Prepare the analysis of a worker process.
+    """
+    global _WORKER_ANALYSIS
+    analysis.prepare()
+    _WORKER_ANALYSIS = analysis
+
+
+def _run_worker_chunk(args):
+    """
+    Analyze a range of frames with the analysis of the worker process.
+    """
+    return _run_chunk(_WORKER_ANALYSIS, *args)
+
+
+def _run_chunk(analysis, frame_idxs, prefetch):
+    """
+    Analyze a range of frames of an already prepared analysis.
+    """
+    if len(frame_idxs) == 0:
+        return []
+
+    trajectory = agldcd.open_dcds(*analysis.dcds)
+    atoms = analysis.atoms
+
+    if prefetch > 0:
+        frames = agldcd.FramePrefetcher(trajectory, frame_idxs.start, frame_idxs.stop,
+                                        frame_idxs.step, atoms, nbuffers=prefetch)
+    else:
+        frames = trajectory.iter_frames(frame_idxs.start, frame_idxs.stop,
+                                        frame_idxs.step, atoms)
+
+    # results of the frames are combined right away (see combine)
+    results = None
+
+    for frame_idx, (coords, box) in zip(frame_idxs, frames):
+        results = analysis.combine(results, analysis.per_frame(frame_idx, coords, box))
+
+    trajectory.close()
+    return results if results is not None else []
+
+
+class RMSDAnalysis(FrameAnalysis):
+    """
+    Rmsd (after alignment) of each frame against a reference.
+    """
+    def __init__(self, *dcds, **kwargs):
+        """
+        Parameters
+        ----------
+        dcds : str
+            dcd-file(s) of the trajectory
+        reference : int or np.array
+            index of the reference frame or (natoms, 3)-array (default: 0)
+        atm_idxs : list of ints or None
+            atoms to compare (default: all atoms); if only some atoms are
+            read (run(atoms=...)), atm_idxs must be part of them
+
+        """
+        FrameAnalysis.__init__(self, *dcds)
+        reference = kwargs.get("reference", 0)
+        atm_idxs = kwargs.get("atm_idxs", None)
+        self.atm_idxs = None if atm_idxs is None else np.asarray(atm_idxs, dtype=int)
+
+        if np.ndim(reference) == 0:
+            trajectory = agldcd.open_dcds(*self.dcds)
+            reference = trajectory[reference]
+            trajectory.close()
+
+        reference = np.asarray(reference, dtype=np.float64)
+
+        if self.atm_idxs is not None and len(reference) != len(self.atm_idxs):
+            reference = reference[self.atm_idxs]
+
+        self.reference = reference
+        # rows of the atoms to compare in the coordinates of a frame and their
+        # reference (set by prepare, the reference itself is not changed)
+        self.coord_idxs = self.atm_idxs
+        self._ref = None
+
+    def prepare(self):
+        self.coord_idxs = self.atm_idxs
+        self._ref = self.reference
+
+        if self.atoms is None:
+            return
+
+        # coordinates of the frames only have the atoms read
+        atm_rows = {atm_idx: row for row, atm_idx in enumerate(self.atoms.tolist())}
+
+        if self.atm_idxs is None:
+            # all atoms read are compared, i.e. their rows of the reference
+            missing = [i for i in atm_rows if not 0 <= i < len(self.reference)]
+
+            if missing:
+                raise ValueError("Atoms {} are read but not in the reference!".format(missing))
+
+            self.coord_idxs = None
+            self._ref = self.reference[self.atoms]
+        else:
+            missing = [i for i in self.atm_idxs.tolist() if i not in atm_rows]
+
+            if missing:
+                raise ValueError("Atoms {} are compared but not read!".format(missing))
+
+            self.coord_idxs = np.array([atm_rows[i] for i in self.atm_idxs.tolist()], dtype=int)
+
+    def per_frame(self, frame_idx, coords, box):
+        if self.coord_idxs is not None:
+            coords = coords[self.coord_idxs]
+
+        return agm.get_rmsd(np.array(coords, dtype=np.float64), self._ref.copy())
+
+    def reduce(self, results):
+        return np.array(results)
+
+
+class ClusterSizeAnalysis(FrameAnalysis):
+    """
+    Number of molecules of each aggregate of each frame (largest first).
+    """
+    def __init__(self, lmpdat, *dcds, **kwargs):
+        """
+        Parameters
+        ----------
+        lmpdat : str
+            lammps data file with the topology of the system
+        dcds : str
+            dcd-file(s) of the trajectory
+        atm_atm_dist, excluded_atm_idxs
+            see md_universe.Universe.connect_molecules
+
+        """
+        FrameAnalysis.__init__(self, *dcds)
+        self.lmpdat = lmpdat
+        self.atm_atm_dist = kwargs.get("atm_atm_dist", 4)
+        self.excluded_atm_idxs = kwargs.get("excluded_atm_idxs", None)
+        self.md_sys = None
+
+    def prepare(self):
+        self.md_sys = aglmp.read_lmpdat(self.lmpdat)
+        self.md_sys.fetch_molecules_by_bonds()
+
+    def per_frame(self, frame_idx, coords, box):
+        self.md_sys.ts_coords = [coords]
+        self.md_sys.ts_boxes = [box]
+        return self.md_sys.get_cluster_sizes(0, self.atm_atm_dist,
+                                             self.excluded_atm_idxs)
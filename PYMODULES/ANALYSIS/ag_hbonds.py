@@ -0,0 +1,329 @@
+"""
+Hydrogen bond statistics of trajectories.
+
+H-bonds of each frame are found by md_universe.Universe.find_h_bonds (geometric
+criterion), this module gathers them to per-frame counts, the occupancy of each
+donor-hydrogen...acceptor triple and the h-bond lifetime (integral of the
+autocorrelation function of the fluctuations of the h-bond existence).
+
+Examples
+--------
+
+Whole dcd-file (frames are streamed one by one)
+-----------------------------------------------
+hbonds = h_bonds_from_dcd("system.lmpdat", "system.dcd", da_dist=3.5,
+                          dha_angle=120.0)
+print(hbonds.get_lifetime(dt=0.5))
+hbonds.write_clmsv("system_hbonds.clmsv")
+
+Parallel (see ag_frame_analysis)
+--------------------------------
+hbonds = HBondAnalysis("system.lmpdat", "system.dcd").run(nprocs=8)
+
+Frames already read
+-------------------
+hbonds = HBonds()
+for frame_h_bonds in md_sys.find_h_bonds():
+    hbonds.add_frame(frame_h_bonds)
+
+"""
+
+import collections
+import numpy as np
+import ag_clmsv as agclmsv
+import ag_frame_analysis as agfa
+import ag_lammps as aglmp
+
+# memory of the existence columns transformed at once (float32, zero padded)
+CHUNK_BYTES = 16 * 1024**2
+
+
+class HBonds(object):
+    """
+    Collect the h-bonds (donor, hydrogen, acceptor) of consecutive frames.
+    """
+    def __init__(self):
+        # each h-bond triple gets an id in the order of its first appearance
+        self.triple_ids = collections.OrderedDict()
+        # ids of all h-bonds of each frame
+        self.frames = []
+
+    def add_frame(self, frame_h_bonds):
+        """
+        Add the h-bonds of the next frame.
+
+        Parameters
+        ----------
+        frame_h_bonds : array of ints
+            (m, 3)-array with donor, hydrogen and acceptor of each h-bond
+
+        """
+        cur_ids = []
+
+        for triple in map(tuple, np.asarray(frame_h_bonds, dtype=int).reshape(-1, 3)):
+            if triple not in self.triple_ids:
+                self.triple_ids[triple] = len(self.triple_ids)
+            cur_ids.append(self.triple_ids[triple])
+
+        self.frames.append(np.array(cur_ids, dtype=int))
+
+    def get_counts(self):
+        """
+        Number of h-bonds of each frame.
+        """
+        return np.array([len(i) for i in self.frames], dtype=int)
+
+    def get_occupancy(self):
+        """
+        Fraction of frames each h-bond exists in (largest first).
+
+        Returns
+        -------
+        triples : array of ints
+            (n, 3)-array with donor, hydrogen and acceptor
+        occupancy : array of floats
+            fraction of frames of each triple
+
+        """
+        triples = np.array(list(self.triple_ids.keys()), dtype=int).reshape(-1, 3)
+        occupancy = np.zeros(len(triples))
+
+        if len(self.frames) > 0 and len(triples) > 0:
+            occupancy = np.bincount(np.concatenate(self.frames),
+                                    minlength=len(triples)) / float(len(self.frames))
+
+        order = np.argsort(-occupancy, kind="stable")
+        return (triples[order], occupancy[order])
+
+    def _correlate(self, fluctuations=False):
+        """
+        Sum of <h(0)h(t)> over all triples for each lag t (see get_autocorrelation).
+
+        The existence of the triples is transformed in chunks of columns
+        (float32, see CHUNK_BYTES), i.e. the (frames, triples)-array is never
+        built as a whole.
+        """
+        nframes = len(self.frames)
+        ntriples = len(self.triple_ids)
+        acf = np.zeros(nframes)
+
+        if nframes == 0 or ntriples == 0:
+            return acf
+
+        # frame and triple of each existing h-bond, sorted by triple
+        frame_idxs = np.repeat(np.arange(nframes), [len(i) for i in self.frames])
+        triple_idxs = np.concatenate(self.frames)
+        order = np.argsort(triple_idxs, kind="stable")
+        frame_idxs, triple_idxs = frame_idxs[order], triple_idxs[order]
+
+        # zero padding avoids the circular correlation of the fft
+        nfft = 2*nframes
+        chunk_size = max(1, CHUNK_BYTES // (nfft * 4))
+
+        for start in range(0, ntriples, chunk_size):
+            stop = min(start + chunk_size, ntriples)
+            lo, hi = np.searchsorted(triple_idxs, [start, stop])
+            existence = np.zeros((nfft, stop - start), dtype=np.float32)
+            existence[frame_idxs[lo:hi], triple_idxs[lo:hi] - start] = 1.0
+
+            if fluctuations is True:
+                existence[:nframes] -= existence[:nframes].mean(axis=0)
+
+            spectrum = np.fft.rfft(existence, axis=0)
+            power = spectrum.real**2 + spectrum.imag**2
+            acf += np.fft.irfft(power, n=nfft, axis=0)[:nframes].sum(axis=1)
+
+        # average over all time origins of each lag
+        return acf / (nframes - np.arange(nframes))
+
+    def get_autocorrelation(self, fluctuations=False):
+        """
+        Intermittent h-bond autocorrelation function C(t) = <h(0)h(t)>/<h(0)>.
+
+        h(t) is 1 if a triple exists in frame t and 0 otherwise; the average
+        runs over all time origins and all triples. Computed via fft.
+
+        C(t) levels off at about the occupancy of the h-bonds instead of
+        decaying to zero. With fluctuations, the mean occupancy of each
+        triple is subtracted from h(t) first, i.e. the normalized
+        autocorrelation of the fluctuations is returned (decays to zero).
+
+        Parameters
+        ----------
+        fluctuations : bool
+            correlate h(t) - <h> instead of h(t)
+
+        Returns
+        -------
+        acf : array of floats
+            C(t) for each lag t (in frames), zeros if there are no h-bonds
+            (or, with fluctuations, no h-bond ever breaks or forms)
+
+        """
+        acf = self._correlate(fluctuations)
+
+        if len(acf) == 0 or acf[0] <= 0:
+            return np.zeros(len(acf))
+
+        return acf / acf[0]
+
+    def get_lifetime(self, dt=1.0):
+        """
+        Lifetime of the h-bonds, i.e. the integral of the autocorrelation
+        function of the fluctuations (see get_autocorrelation).
+
+        The integral stops at the first zero crossing of the autocorrelation
+        function, at most at half of the frames (later lags are averaged over
+        few time origins only). For h-bonds without memory between frames
+        the lifetime is about half a frame (dt/2).
+
+        Parameters
+        ----------
+        dt : float
+            time between two frames
+
+        Returns
+        -------
+        lifetime : float
+            0 if there are no h-bonds, inf if h-bonds exist but none of them
+            ever breaks or forms
+
+        """
+        acf = self.get_autocorrelation(fluctuations=True)
+
+        if len(acf) < 2:
+            return 0.0
+
+        if acf[0] == 0:
+            return float("inf") if any(len(i) for i in self.frames) else 0.0
+
+        acf = acf[:max(len(acf) // 2, 2)]
+        crossings = np.flatnonzero(acf <= 0)
+
+        if len(crossings) > 0:
+            acf = acf[:crossings[0] + 1]
+
+        return float(np.sum((acf[1:] + acf[:-1]) / 2) * dt)
+
+    def to_clmsv(self, dt=1.0):
+        """
+        Put counts, occupancy and autocorrelation into a Clmsv-instance.
+        """
+        clmsv = agclmsv.Clmsv()
+        nframes = len(self.frames)
+
+        cdata = collections.OrderedDict()
+        cdata["frame"] = list(range(nframes))
+        cdata["n_hbonds"] = list(self.get_counts())
+        clmsv.data.append(cdata)
+
+        triples, occupancy = self.get_occupancy()
+        cdata = collections.OrderedDict()
+        cdata["donor"] = list(triples[:, 0])
+        cdata["hydrogen"] = list(triples[:, 1])
+        cdata["acceptor"] = list(triples[:, 2])
+        cdata["occupancy"] = list(occupancy)
+        clmsv.data.append(cdata)
+
+        cdata = collections.OrderedDict()
+        cdata["time"] = list(np.arange(nframes) * dt)
+        cdata["acf"] = list(self.get_autocorrelation())
+        clmsv.data.append(cdata)
+
+        return clmsv
+
+    def write_clmsv(self, clmsv_out, dt=1.0):
+        """
+        Write counts, occupancy and autocorrelation as three entries of a clmsv-file.
+        """
+        self.to_clmsv(dt).write_clmsv(clmsv_out)
+
+
+def h_bonds_from_dcd(lmpdat, dcd, donor_hydrogen_pairs=None, acceptor_idxs=None,
+                     da_dist=3.5, dha_angle=120.0, frame_start=None,
+                     frame_stop=None, frame_step=None):
+    """
+    Stream all frames of a dcd-file and find the h-bonds of each frame.
+
+    Parameters
+    ----------
+    lmpdat : str
+        lammps data file with the topology of the system
+    dcd : str
+        trajectory of the system
+    donor_hydrogen_pairs, acceptor_idxs, da_dist, dha_angle
+        see md_universe.Universe.find_h_bonds
+    frame_start, frame_stop, frame_step : int or None
+        frames to analyze (same as slicing, see ag_lmpdcd.DCDFile.iter_frames)
+
+    Returns
+    -------
+    hbonds : HBonds
+
+    """
+    md_sys = aglmp.read_lmpdat(lmpdat)
+
+    if donor_hydrogen_pairs is None:
+        donor_hydrogen_pairs = md_sys.get_donor_hydrogen_pairs()
+
+    if acceptor_idxs is None:
+        acceptor_idxs = md_sys.get_acceptors()
+
+    hbonds = HBonds()
+    md_sys.import_dcd(dcd)
+
+    for atm_coords, box in md_sys.iter_frames(frame_start, frame_stop, frame_step):
+        # only the current frame is kept
+        md_sys.ts_coords = [atm_coords]
+        md_sys.ts_boxes = [box]
+        hbonds.add_frame(md_sys.find_h_bonds([0], donor_hydrogen_pairs,
+                                             acceptor_idxs, da_dist,
+                                             dha_angle)[0])
+
+    md_sys.close_dcd()
+    return hbonds
+
+
+class HBondAnalysis(agfa.FrameAnalysis):
+    """
+    H-bonds of each frame with frames processed in parallel.
+    """
+    def __init__(self, lmpdat, *dcds, **h_bond_args):
+        """
+        Parameters
+        ----------
+        lmpdat : str
+            lammps data file with the topology of the system
+        dcds : str
+            dcd-file(s) of the trajectory
+        h_bond_args
+            donor_hydrogen_pairs, acceptor_idxs, da_dist and dha_angle (see
+            md_universe.Universe.find_h_bonds)
+
+        """
+        agfa.FrameAnalysis.__init__(self, *dcds)
+        self.lmpdat = lmpdat
+        self.h_bond_args = h_bond_args
+        self.md_sys = None
+
+    def prepare(self):
+        self.md_sys = aglmp.read_lmpdat(self.lmpdat)
+
+        if self.h_bond_args.get("donor_hydrogen_pairs") is None:
+            self.h_bond_args["donor_hydrogen_pairs"] = self.md_sys.get_donor_hydrogen_pairs()
+
+        if self.h_bond_args.get("acceptor_idxs") is None:
+            self.h_bond_args["acceptor_idxs"] = self.md_sys.get_acceptors()
+
+    def per_frame(self, frame_idx, coords, box):
+        self.md_sys.ts_coords = [coords]
+        self.md_sys.ts_boxes = [box]
+        return self.md_sys.find_h_bonds([0], **self.h_bond_args)[0]
+
+    def reduce(self, results):
+        hbonds = HBonds()
+
+        for frame_h_bonds in results:
+            hbonds.add_frame(frame_h_bonds)
+
+        return hbonds
@@ -0,0 +1,364 @@
+"""
+Radial distribution functions of atom-type (or selection) pairs.
+
+Frames are streamed one by one from a dcd-file, pair distances are taken from
+the vectorized linked cells (md_linked_cells.CellList) and binned on the fly,
+i.e. the memory needed does not grow with the length of the trajectory.
+
+Examples
+--------
+
+All atom-type pairs
+-------------------
+rdf = rdf_from_dcd("system.lmpdat", "system.dcd", rmax=12.0, nbins=240)
+rdf.write_clmsv("system_rdf.clmsv")
+
+Selection pairs (e.g. oxygen atoms of two different molecule species)
+--------------------------------------------------------------------
+rdf = rdf_from_dcd("system.lmpdat", "system.dcd",
+                   selections={"OW": [0, 3, 6], "OM": [90, 102]},
+                   exclude_same_molecule=True)
+rdf.write_clmsv("system_rdf.clmsv")
+
+Parallel (see ag_frame_analysis)
+--------------------------------
+rdf = RDFAnalysis("system.lmpdat", "system.dcd", rmax=12.0).run(nprocs=8)
+rdf.write_clmsv("system_rdf.clmsv")
+
+"""
+
+import collections
+import numpy as np
+import ag_cryst as agc
+import ag_clmsv as agclmsv
+import ag_frame_analysis as agfa
+import ag_lammps as aglmp
+import md_linked_cells as mdlc
+
+
+class RDF(object):
+    """
+    Histogram pair distances of labeled atoms frame by frame.
+
+    Each atom carries an integer label (e.g. its atom type), atoms with a
+    negative label are ignored. Pairs are histogrammed for each combination
+    of labels (label_a <= label_b).
+    """
+    def __init__(self, atm_labels, rmax=10.0, nbins=200, label_names=None,
+                 atm_groups=None):
+        """
+        Parameters
+        ----------
+        atm_labels : list or np.array of ints
+            label of each atom in the system; atoms with negative labels are
+            not considered
+        rmax : float
+            largest distance of the histogram (must not exceed half of the
+            smallest perpendicular width of the box)
+        nbins : int
+            number of bins between 0 and rmax
+        label_names : list of str
+            name of each label (used as column names in the clmsv-file)
+        atm_groups : list or np.array of ints
+            molecule of each atom; pairs of the same molecule are skipped if
+            given
+
+        """
+        atm_labels = np.asarray(atm_labels, dtype=int)
+        self.atm_idxs = np.flatnonzero(atm_labels >= 0)
+        self.labels = atm_labels[self.atm_idxs]
+        self.nlabels = int(self.labels.max()) + 1 if len(self.labels) > 0 else 0
+
+        if label_names is None:
+            label_names = [str(i) for i in range(self.nlabels)]
+        self.label_names = label_names
+
+        if atm_groups is not None:
+            atm_groups = np.asarray(atm_groups, dtype=int)[self.atm_idxs]
+        self.groups = atm_groups
+
+        self.rmax = rmax
+        self.nbins = nbins
+        self.edges = np.linspace(0.0, rmax, nbins + 1)
+
+        # number of atoms per label
+        self.label_counts = np.bincount(self.labels, minlength=self.nlabels)
+
+        # pairs of the same molecule per label pair (not part of the histograms)
+        self.excluded_pairs = np.zeros((self.nlabels, self.nlabels))
+
+        if atm_groups is not None:
+            groups, group_idxs = np.unique(atm_groups, return_inverse=True)
+            group_counts = np.zeros((len(groups), self.nlabels))
+            np.add.at(group_counts, (group_idxs.ravel(), self.labels), 1)
+            self.excluded_pairs = group_counts.T.dot(group_counts)
+            self.excluded_pairs[np.diag_indices(self.nlabels)] = (
+                (group_counts * (group_counts - 1)).sum(axis=0) / 2.0)
+
+        # accumulated pair counts and inverse volumes of all frames so far
+        self.histograms = np.zeros((self.nlabels, self.nlabels, nbins), dtype=np.int64)
+        self.inv_volumes = 0.0
+        self.nframes = 0
+
+    def add_frame(self, atm_coords, ltc_a, ltc_b, ltc_c, ltc_alpha, ltc_beta,
+                  ltc_gamma):
+        """
+        Bin the pair distances of the current frame.
+
+        Parameters
+        ----------
+        atm_coords : np.array, shape (natoms, 3)
+            cartesian coordinates of all atoms of the frame
+        ltc_a, ltc_b, ltc_c, ltc_alpha, ltc_beta, ltc_gamma : floats
+            lattice vectors and angles (radians) of the frame's box
+
+        """
+        histograms, inv_volume = self.frame_histograms(atm_coords, ltc_a, ltc_b,
+                                                       ltc_c, ltc_alpha,
+                                                       ltc_beta, ltc_gamma)
+        self.add_histograms(histograms, inv_volume)
+
+    def add_histograms(self, histograms, inv_volumes, nframes=1):
+        """
+        Add pair counts and inverse volumes of other frames.
+        """
+        self.histograms += histograms
+        self.inv_volumes += inv_volumes
+        self.nframes += nframes
+
+    def frame_histograms(self, atm_coords, ltc_a, ltc_b, ltc_c, ltc_alpha,
+                         ltc_beta, ltc_gamma):
+        """
+        Pair counts and inverse volume of a single frame (see add_frame).
+
+        Returns
+        -------
+        histograms : np.array, shape (nlabels, nlabels, nbins)
+        inv_volume : float
+
+        """
+        atm_coords = np.asarray(atm_coords)[self.atm_idxs]
+        # raises a ValueError if rmax exceeds half of the box width
+        cell_list = mdlc.CellList(atm_coords, ltc_a, ltc_b, ltc_c,
+                                  ltc_alpha, ltc_beta, ltc_gamma, self.rmax)
+
+        dr = self.rmax / self.nbins
+        histograms = np.zeros_like(self.histograms)
+
+        for idxs_i, idxs_j, dists in cell_list.iter_pairs(groups=self.groups):
+            bins = (dists / dr).astype(int)
+            inside = bins < self.nbins
+            labels_i = self.labels[idxs_i[inside]]
+            labels_j = self.labels[idxs_j[inside]]
+            label_lo = np.minimum(labels_i, labels_j)
+            label_hi = np.maximum(labels_i, labels_j)
+            flat_idxs = (label_lo * self.nlabels + label_hi) * self.nbins + bins[inside]
+            histograms += np.bincount(flat_idxs, minlength=histograms.size).reshape(
+                histograms.shape)
+
+        inv_volume = 1.0 / agc.box_lat_volume(ltc_a, ltc_b, ltc_c,
+                                              ltc_alpha, ltc_beta, ltc_gamma)
+        return (histograms, inv_volume)
+
+    def get_rdf(self, label_a, label_b):
+        """
+        Normalized radial distribution function g(r) of two labels.
+
+        The ideal gas reference uses the volume of each frame, i.e. boxes
+        of different size (npt) are handled correctly.
+
+        Returns
+        -------
+        g_r : np.array, shape (nbins,)
+
+        """
+        label_a, label_b = sorted((label_a, label_b))
+        shells = 4.0 / 3.0 * np.pi * (self.edges[1:]**3 - self.edges[:-1]**3)
+        natoms_a = self.label_counts[label_a]
+        natoms_b = self.label_counts[label_b]
+
+        # pairs are counted only once (i < j), pairs of the same molecule are
+        # not counted if they are excluded
+        if label_a == label_b:
+            npairs = natoms_a * (natoms_a - 1) / 2.0
+        else:
+            npairs = float(natoms_a * natoms_b)
+
+        npairs -= self.excluded_pairs[label_a, label_b]
+
+        ideal = npairs * shells * self.inv_volumes
+        g_r = np.zeros(self.nbins)
+        np.divide(self.histograms[label_a, label_b], ideal, out=g_r, where=ideal > 0)
+        return g_r
+
+    def get_centers(self):
+        """
+        Centers of all bins.
+        """
+        return (self.edges[1:] + self.edges[:-1]) / 2
+
+    def to_clmsv(self):
+        """
+        Put r and g(r) of all label pairs into a Clmsv-instance.
+        """
+        cdata = collections.OrderedDict()
+        cdata["r"] = list(self.get_centers())
+
+        for label_a in range(self.nlabels):
+            for label_b in range(label_a, self.nlabels):
+                ckey = "g_{}_{}".format(self.label_names[label_a],
+                                        self.label_names[label_b])
+                cdata[ckey] = list(self.get_rdf(label_a, label_b))
+
+        clmsv = agclmsv.Clmsv()
+        clmsv.data.append(cdata)
+        return clmsv
+
+    def write_clmsv(self, clmsv_out):
+        """
+        Write r and g(r) of all label pairs to a clmsv-file.
+        """
+        self.to_clmsv().write_clmsv(clmsv_out)
+
+
+def _type_labels(md_sys):
+    """
+    Label each atom by its atom type; names are the sitnams if available.
+    """
+    atm_labels = [atom.atm_key for atom in md_sys.atoms]
+    label_names = []
+
+    for atm_key in range(max(atm_labels) + 1):
+        sitnam = None
+
+        if atm_key in md_sys.atm_types:
+            sitnam = getattr(md_sys.atm_types[atm_key], "sitnam", None)
+
+        label_names.append(sitnam if sitnam else str(atm_key))
+
+    return (atm_labels, label_names)
+
+
+def _selection_labels(natoms, selections):
+    """
+    Label each atom by the selection it belongs to (-1 if in none).
+    """
+    atm_labels = -np.ones(natoms, dtype=int)
+    label_names = []
+
+    for label, (name, atm_idxs) in enumerate(selections.items()):
+        atm_idxs = np.asarray(atm_idxs, dtype=int)
+
+        if np.any(atm_labels[atm_idxs] >= 0):
+            raise ValueError("Selection {} overlaps with another selection".format(name))
+
+        atm_labels[atm_idxs] = label
+        label_names.append(name)
+
+    return (atm_labels, label_names)
+
+
+def rdf_of_system(md_sys, rmax=10.0, nbins=200, selections=None,
+                  exclude_same_molecule=False):
+    """
+    Create an (empty) RDF with the labels of a system (see rdf_from_dcd).
+    """
+    if selections is None:
+        atm_labels, label_names = _type_labels(md_sys)
+    else:
+        atm_labels, label_names = _selection_labels(len(md_sys.atoms), selections)
+
+    atm_groups = None
+    if exclude_same_molecule is True:
+        atm_groups = [atom.grp_id for atom in md_sys.atoms]
+
+    return RDF(atm_labels, rmax, nbins, label_names=label_names,
+               atm_groups=atm_groups)
+
+
+def rdf_from_dcd(lmpdat, dcd, rmax=10.0, nbins=200, selections=None,
+                 exclude_same_molecule=False, frame_start=None, frame_stop=None,
+                 frame_step=None):
+    """
+    Stream all frames of a dcd-file and histogram the pair distances.
+
+    Parameters
+    ----------
+    lmpdat : str
+        lammps data file with the topology of the system
+    dcd : str
+        trajectory of the system
+    rmax, nbins : float, int
+        see RDF
+    selections : collections.OrderedDict or None
+        name -> atom indices; histogram selection pairs instead of atom types
+    exclude_same_molecule : bool
+        skip pairs of atoms of the same molecule
+    frame_start, frame_stop, frame_step : int or None
+        frames to analyze (same as slicing, see ag_lmpdcd.DCDFile.iter_frames)
+
+    Returns
+    -------
+    rdf : RDF
+
+    """
+    md_sys = aglmp.read_lmpdat(lmpdat)
+    rdf = rdf_of_system(md_sys, rmax, nbins, selections, exclude_same_molecule)
+    md_sys.import_dcd(dcd)
+
+    for atm_coords, box in md_sys.iter_frames(frame_start, frame_stop, frame_step):
+        if box is None:
+            raise ValueError("{} has no unit cells, the rdf needs the box of "
+                             "each frame!".format(dcd))
+
+        rdf.add_frame(atm_coords, box.ltc_a, box.ltc_b, box.ltc_c,
+                      box.ltc_alpha, box.ltc_beta, box.ltc_gamma)
+
+    md_sys.close_dcd()
+    return rdf
+
+
+class RDFAnalysis(agfa.FrameAnalysis):
+    """
+    Radial distribution functions with frames processed in parallel.
+    """
+    def __init__(self, lmpdat, *dcds, **rdf_args):
+        """
+        Parameters
+        ----------
+        lmpdat : str
+            lammps data file with the topology of the system
+        dcds : str
+            dcd-file(s) of the trajectory
+        rdf_args
+            rmax, nbins, selections and exclude_same_molecule (see rdf_from_dcd)
+
+        """
+        agfa.FrameAnalysis.__init__(self, *dcds)
+        self.rdf = rdf_of_system(aglmp.read_lmpdat(lmpdat), **rdf_args)
+
+    def per_frame(self, frame_idx, coords, box):
+        if box is None:
+            raise ValueError("Frame {} has no box (dcd without unit cells), "
+                             "the rdf needs the box of each frame!".format(frame_idx))
+
+        return self.rdf.frame_histograms(coords, box.ltc_a, box.ltc_b, box.ltc_c,
+                                         box.ltc_alpha, box.ltc_beta, box.ltc_gamma)
+
+    def combine(self, results, result):
+        # histograms of a chunk are summed up in the worker
+        histograms, inv_volume = result
+
+        if results is None:
+            return [[histograms, inv_volume, 1]]
+
+        results[0][0] += histograms
+        results[0][1] += inv_volume
+        results[0][2] += 1
+        return results
+
+    def reduce(self, results):
+        for histograms, inv_volumes, nframes in results:
+            self.rdf.add_histograms(histograms, inv_volumes, nframes)
+
+        return self.rdf
@@ -135,14 +135,15 @@ class ResultGetter(ag_fileio.FileHandler):
         log_data.read_lmplog(lmplog)
         dimer_sys = agum.Unification()
         dimer_sys.import_dcd(dcd)
-        dimer_sys.read_frames()
-        nframes = range(len(dimer_sys.ts_coords))
 
-        for frame_id in nframes:
-            distance = self._get_distance(dimer_sys, idxs1, idxs2, frame_id)
+        # frames are read one by one, only the current one is kept
+        for frame_id, (coords, _) in enumerate(dimer_sys.iter_frames()):
+            dimer_sys.ts_coords = [coords.astype(np.float64)]
+            distance = self._get_distance(dimer_sys, idxs1, idxs2)
             energy = log_data.data[frame_id]["PotEng"][frame]
             self.results.append((distance, energy))
 
+        dimer_sys.close_dcd()
         self._norm_results()
 
     def process_pw_gau(self, idxs1, idxs2, filetype=None):
@@ -0,0 +1,54 @@
+"""
+Repeated runs of RMSDAnalysis (run with pytest).
+"""
+
+import numpy as np
+import pytest
+import ag_lmpdcd as agldcd
+import ag_frame_analysis as agfa
+
+
+@pytest.fixture
+def dcd(tmp_path):
+    """
+    Trajectory of 10 atoms moving randomly over 6 frames.
+    """
+    rng = np.random.RandomState(0)
+    coords = np.cumsum(rng.normal(0.0, 0.3, (6, 10, 3)), axis=0) + rng.uniform(0, 10, (10, 3))
+    dcd = str(tmp_path / "traj.dcd")
+    dcd_out = agldcd.DCDWriter(dcd, 10, has_unitcells=False)
+    dcd_out.write_frames(coords)
+    dcd_out.close()
+    return dcd
+
+
+def test_rerun_with_other_atoms(dcd):
+    analysis = agfa.RMSDAnalysis(dcd)
+    reference = analysis.reference.copy()
+
+    subset = analysis.run(atoms=[1, 3, 5, 7])
+    full = analysis.run()
+    subset2 = analysis.run(atoms=[0, 2, 4])
+
+    assert np.array_equal(analysis.reference, reference)
+    assert np.allclose(full, agfa.RMSDAnalysis(dcd).run())
+    assert np.allclose(subset, agfa.RMSDAnalysis(dcd, atm_idxs=[1, 3, 5, 7]).run())
+    assert np.allclose(subset2, agfa.RMSDAnalysis(dcd, atm_idxs=[0, 2, 4]).run())
+    assert not np.allclose(full, subset)
+
+
+def test_rerun_compared_atoms(dcd):
+    analysis = agfa.RMSDAnalysis(dcd, atm_idxs=[3, 5, 7])
+    ref = analysis.run()
+
+    assert np.allclose(analysis.run(atoms=[1, 3, 5, 7, 9]), ref)
+    assert np.allclose(analysis.run(atoms=[7, 5, 3]), ref)
+    assert np.allclose(analysis.run(), ref)
+
+    with pytest.raises(ValueError):
+        analysis.run(atoms=[3, 5])
+
+
+def test_atoms_not_in_reference(dcd):
+    with pytest.raises(ValueError):
+        agfa.RMSDAnalysis(dcd, reference=np.zeros((4, 3))).run(atoms=[2, 6])
@@ -0,0 +1,82 @@
+"""
+Autocorrelation and lifetime of HBonds (run with pytest).
+"""
+
+import numpy as np
+import ag_hbonds as aghb
+
+
+def _hbonds(existence):
+    """
+    HBonds of a boolean (frames, triples)-array.
+    """
+    hbonds = aghb.HBonds()
+
+    # every triple appears in the first frame, i.e. triple ids are column indices
+    for triple_idx in range(existence.shape[1]):
+        hbonds.triple_ids[(triple_idx, triple_idx, triple_idx)] = triple_idx
+
+    for cur_existence in existence:
+        hbonds.frames.append(np.flatnonzero(cur_existence))
+
+    return hbonds
+
+
+def _markov_existence(nframes, ntriples, lifetime, seed=0):
+    """
+    Existence of h-bonds which break and form with the same probability in
+    each frame; the autocorrelation of the fluctuations is exp(-t/lifetime).
+    """
+    rng = np.random.RandomState(seed)
+    switch = (1.0 - np.exp(-1.0 / lifetime)) / 2
+    existence = np.empty((nframes, ntriples), dtype=bool)
+    existence[0] = rng.rand(ntriples) < 0.5
+
+    for frame_idx in range(1, nframes):
+        existence[frame_idx] = existence[frame_idx - 1] ^ (rng.rand(ntriples) < switch)
+
+    return existence
+
+
+def test_lifetime_of_markov_h_bonds():
+    hbonds = _hbonds(_markov_existence(4000, 100, lifetime=5.0))
+    assert abs(hbonds.get_lifetime() - 5.0) < 0.5
+    assert abs(hbonds.get_lifetime(dt=0.5) - 2.5) < 0.25
+
+
+def test_lifetime_without_memory():
+    # the lifetime must not grow with the length of the trajectory
+    rng = np.random.RandomState(1)
+
+    for nframes in (100, 1000, 4000):
+        hbonds = _hbonds(rng.rand(nframes, 20) < 0.5)
+        assert hbonds.get_lifetime() < 1.0
+
+
+def test_autocorrelation():
+    existence = _markov_existence(500, 7, lifetime=3.0, seed=2)
+    hbonds = _hbonds(existence)
+    nframes = len(existence)
+
+    # direct sums over all time origins and triples
+    h = existence.astype(float)
+    dh = h - h.mean(axis=0)
+    ref = np.array([np.sum(h[:nframes - t] * h[t:]) / (nframes - t) for t in range(nframes)])
+    ref_dh = np.array([np.sum(dh[:nframes - t] * dh[t:]) / (nframes - t) for t in range(nframes)])
+
+    assert np.allclose(hbonds.get_autocorrelation(), ref / ref[0], atol=1e-5)
+    assert np.allclose(hbonds.get_autocorrelation(fluctuations=True), ref_dh / ref_dh[0],
+                       atol=1e-5)
+
+
+def test_chunks(monkeypatch):
+    hbonds = _hbonds(_markov_existence(200, 30, lifetime=4.0, seed=3))
+    acf = hbonds.get_autocorrelation(fluctuations=True)
+    monkeypatch.setattr(aghb, "CHUNK_BYTES", 1)
+    assert np.allclose(hbonds.get_autocorrelation(fluctuations=True), acf, atol=1e-6)
+
+
+def test_no_breaking_h_bonds():
+    assert aghb.HBonds().get_lifetime() == 0.0
+    assert _hbonds(np.zeros((10, 3), dtype=bool)).get_lifetime() == 0.0
+    assert _hbonds(np.ones((10, 3), dtype=bool)).get_lifetime() == float("inf")
@@ -44,7 +44,7 @@ class Clmsv(logu.LogUniverse):
                             for key, value in zip(keys, values):
                                 cdata[key].append(value)
 
-        self._int_values()
+        self._to_arrays()
 
     def write_clmsv(self, clmsv_out, split=False):
         """
@@ -0,0 +1,314 @@
+"""
+Opt-in cache for parsed input files.
+
+Readers of the universe classes (e.g. LmpStuff.read_lmpdat, AmberStuff.read_prmtop,
+PwStuff.read_pwout, GauStuff.read_gau_log) are decorated with cached_reader. If
+the cache is enabled, the state of the universe after parsing is pickled to the
+cache directory; reading the same file again (same content, same reader and same
+arguments) loads the pickled state instead of parsing the file. Entries are keyed
+by the source of the module defining the reader as well, i.e. editing a reader
+(or a helper in its module) invalidates its entries. Each entry records the
+source of the modules of all classes in the pickled state (e.g. md_stars,
+md_box); if one of them changed, the entry is dropped and the file is parsed
+again. CACHE_VERSION invalidates all entries if increased.
+
+Only readers called on a freshly created universe are cached, loading data on
+top of an existing universe is always parsed.
+
+The cache is disabled by default. It is enabled by enable_cache or by setting
+the environment variable AG_CACHE_DIR (and optionally AG_CACHE_MAX_BYTES).
+
+Examples
+--------
+import ag_filecache as agfc
+import ag_lammps as aglmp
+
+agfc.enable_cache("~/.cache/pymodules", max_bytes=2*1024**3)
+solvent_sys = aglmp.read_lmpdat("solvent.lmpdat")  # parsed and cached
+solvent_sys = aglmp.read_lmpdat("solvent.lmpdat")  # loaded from the cache
+
+"""
+
+import io
+import os
+import functools
+import hashlib
+import importlib.util
+import inspect
+import pickle
+import tempfile
+
+# cache directory (None: cache disabled) and its size limit in bytes
+CACHE_DIR = os.environ.get("AG_CACHE_DIR")
+CACHE_MAX_BYTES = int(os.environ.get("AG_CACHE_MAX_BYTES", 1024**3))
+# part of the key of all entries, increase to invalidate the whole cache
+CACHE_VERSION = 2
+
+# content hash of each file by (path, size, mtime), avoids hashing a file twice
+_FILE_DIGESTS = {}
+
+
+def enable_cache(cache_dir, max_bytes=1024**3):
+    """
+    Enable the cache for all decorated readers.
+
+    Parameters
+    ----------
+    cache_dir : str
+        directory the parsed files are stored in (created if necessary)
+    max_bytes : int
+        size of the cache; least recently used entries are removed if exceeded
+
+    """
+    global CACHE_DIR, CACHE_MAX_BYTES
+    CACHE_DIR = os.path.abspath(os.path.expanduser(cache_dir))
+    CACHE_MAX_BYTES = max_bytes
+
+
+def disable_cache():
+    """
+    Disable the cache (entries already stored are kept).
+    """
+    global CACHE_DIR
+    CACHE_DIR = None
+
+
+def clear_cache():
+    """
+    Remove all entries of the cache.
+    """
+    for entry, _, _ in _entries():
+        os.remove(entry)
+
+
+def file_digest(filename):
+    """
+    Content hash of a file.
+
+    The hash is computed only once for each path, size and modification time.
+    """
+    stat = os.stat(filename)
+    stat_key = (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+
+    if stat_key not in _FILE_DIGESTS:
+        digest = hashlib.sha1()
+
+        with open(filename, "rb") as opened_file:
+            for chunk in iter(lambda: opened_file.read(1 << 20), b""):
+                digest.update(chunk)
+
+        _FILE_DIGESTS[stat_key] = digest.hexdigest()
+
+    return _FILE_DIGESTS[stat_key]
+
+
+def reader_digest(reader):
+    """
+    Hash of the source file of the module defining reader.
+
+    The byte code and constants of the reader are hashed instead if its
+    source file cannot be found (e.g. only compiled files installed).
+    """
+    try:
+        source = inspect.getsourcefile(reader)
+    except TypeError:
+        source = None
+
+    if source is not None and os.path.isfile(source):
+        return file_digest(source)
+
+    code = reader.__code__
+    return hashlib.sha1(code.co_code + repr(code.co_consts).encode()).hexdigest()
+
+
+def module_digests(modules):
+    """
+    Content hash of the source file of each module (modules without a python
+    source file, e.g. builtins or compiled extensions, are left out).
+    """
+    digests = {}
+
+    for name in sorted(modules):
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None
+
+        source = getattr(spec, "origin", None)
+
+        if source is not None and source.endswith(".py") and os.path.isfile(source):
+            digests[name] = file_digest(source)
+        elif spec is None:
+            # a module of the entry does not exist anymore
+            digests[name] = None
+
+    return digests
+
+
+class _ModulePickler(pickle.Pickler):
+    """
+    Pickler recording the modules of the classes of all pickled objects.
+    """
+    def __init__(self, *args, **kwargs):
+        pickle.Pickler.__init__(self, *args, **kwargs)
+        self.modules = set()
+
+    def reducer_override(self, obj):
+        self.modules.add(type(obj).__module__)
+        return NotImplemented
+
+
+def _load_entry(entry):
+    """
+    State and result of an entry (None if there is no valid entry).
+
+    Entries of classes changed since they were written, renamed or moved
+    classes and broken entries are removed.
+    """
+    try:
+        with open(entry, "rb") as opened_entry:
+            digests = pickle.load(opened_entry)
+
+            if isinstance(digests, dict) and module_digests(digests) == digests:
+                return pickle.load(opened_entry)
+    except (IOError, OSError):
+        # no entry (yet)
+        return None
+    except (EOFError, pickle.UnpicklingError, AttributeError, ImportError,
+            IndexError, TypeError, ValueError):
+        pass
+
+    try:
+        os.remove(entry)
+    except OSError:
+        pass
+
+    return None
+
+
+def _entries():
+    """
+    Path, size and last access of all entries of the cache.
+    """
+    if CACHE_DIR is None or not os.path.isdir(CACHE_DIR):
+        return []
+
+    entries = []
+
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".pkl"):
+            entry = os.path.join(CACHE_DIR, name)
+            stat = os.stat(entry)
+            entries.append((entry, stat.st_size, stat.st_mtime))
+
+    return entries
+
+
+def _evict():
+    """
+    Remove the least recently used entries until the cache fits its size.
+    """
+    entries = sorted(_entries(), key=lambda entry: entry[2])
+    total_size = sum(entry[1] for entry in entries)
+
+    for entry, size, _ in entries:
+        if total_size <= CACHE_MAX_BYTES:
+            break
+
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+        total_size -= size
+
+
+def _is_fresh(instance):
+    """
+    Check if an instance is still in the state its __init__ left it in.
+    """
+    try:
+        fresh = instance.__class__()
+    except TypeError:
+        return False
+
+    protocol = pickle.HIGHEST_PROTOCOL
+    return (pickle.dumps(instance.__dict__, protocol) ==
+            pickle.dumps(fresh.__dict__, protocol))
+
+
+def cached_reader(reader):
+    """
+    Decorate a reader method 'reader(self, filename, *args, **kwargs)'.
+
+    The entry of the cache is keyed by the class and the reader, the source
+    of the reader (see reader_digest), the content hash and the size of the
+    file and all further arguments of the reader (defaults included, i.e.
+    passing an argument by position, by keyword or not at all gives the same
+    entry).
+    """
+    signature = inspect.signature(reader)
+    # names of self and of the file
+    skipped = list(signature.parameters)[:2]
+
+    @functools.wraps(reader)
+    def wrapper(self, filename, *args, **kwargs):
+        if CACHE_DIR is None or not _is_fresh(self):
+            return reader(self, filename, *args, **kwargs)
+
+        bound = signature.bind(self, filename, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = []
+
+        for name, value in bound.arguments.items():
+            if name in skipped:
+                continue
+
+            if signature.parameters[name].kind == inspect.Parameter.VAR_KEYWORD:
+                value = sorted(value.items())
+
+            arguments.append((name, value))
+
+        key = hashlib.sha1(repr((CACHE_VERSION, self.__class__.__name__, reader.__name__,
+                                 reader_digest(reader),
+                                 os.path.getsize(filename), file_digest(filename),
+                                 arguments)).encode())
+        entry = os.path.join(CACHE_DIR, key.hexdigest() + ".pkl")
+
+        # warm load, mark the entry as recently used
+        loaded = _load_entry(entry)
+
+        if loaded is not None:
+            state, result = loaded
+            os.utime(entry, None)
+            self.__dict__.update(state)
+            return result
+
+        result = reader(self, filename, *args, **kwargs)
+
+        # the modules of the classes are only known after pickling the state
+        pickled = io.BytesIO()
+        pickler = _ModulePickler(pickled, pickle.HIGHEST_PROTOCOL)
+
+        try:
+            pickler.dump((self.__dict__, result))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # e.g. open file handles, the state is not cached then
+            return result
+
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+
+        # write to a temporary file first, other processes may read the entry
+        tmp_fd, tmp_entry = tempfile.mkstemp(suffix=".tmp", dir=CACHE_DIR)
+
+        with os.fdopen(tmp_fd, "wb") as opened_entry:
+            pickle.dump(module_digests(pickler.modules), opened_entry,
+                        pickle.HIGHEST_PROTOCOL)
+            opened_entry.write(pickled.getvalue())
+
+        os.rename(tmp_entry, entry)
+        _evict()
+        return result
+
+    return wrapper
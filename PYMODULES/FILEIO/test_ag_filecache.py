@@ -0,0 +1,124 @@
+"""
+Keys and invalidation of the entries of ag_filecache (run with pytest).
+"""
+
+import importlib
+import os
+import sys
+import time
+import pytest
+import ag_filecache as agfc
+
+STATE_MODULE = '''
+class Thing(object):
+    def __init__(self, value):
+        self.value = value
+'''
+
+READER_MODULE = '''
+import ag_filecache as agfc
+import fcstate
+
+NREADS = [0]
+
+
+class Reader(object):
+    def __init__(self):
+        self.thing = None
+
+    @agfc.cached_reader
+    def read(self, filename, scale=1, offset=0):
+        NREADS[0] += 1
+
+        with open(filename) as opened_file:
+            self.thing = fcstate.Thing(scale * int(opened_file.read()) + offset)
+
+        return self.thing.value
+'''
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    """
+    Reader module and the module of the class it stores, cache enabled.
+    """
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "fcstate.py").write_text(STATE_MODULE)
+    (source_dir / "fcreader.py").write_text(READER_MODULE)
+    (tmp_path / "number.txt").write_text("21")
+    monkeypatch.syspath_prepend(str(source_dir))
+    monkeypatch.setattr(agfc, "CACHE_DIR", str(tmp_path / "cache"))
+
+    for name in ("fcstate", "fcreader"):
+        sys.modules.pop(name, None)
+
+    fcreader = importlib.import_module("fcreader")
+    yield fcreader, source_dir, str(tmp_path / "number.txt")
+
+    for name in ("fcstate", "fcreader"):
+        sys.modules.pop(name, None)
+
+
+def _entries():
+    return [i for i in os.listdir(agfc.CACHE_DIR) if i.endswith(".pkl")]
+
+
+def test_warm_load(modules):
+    fcreader, _, number = modules
+    assert fcreader.Reader().read(number) == 21
+    reader = fcreader.Reader()
+    assert reader.read(number) == 21
+    assert reader.thing.value == 21
+    assert fcreader.NREADS[0] == 1
+
+
+def test_arguments_are_normalized(modules):
+    fcreader, _, number = modules
+    fcreader.Reader().read(number)
+    fcreader.Reader().read(number, 1)
+    fcreader.Reader().read(number, scale=1)
+    fcreader.Reader().read(number, offset=0, scale=1)
+    assert fcreader.NREADS[0] == 1
+    assert len(_entries()) == 1
+
+    assert fcreader.Reader().read(number, 2) == 42
+    assert fcreader.NREADS[0] == 2
+    assert len(_entries()) == 2
+
+
+def test_changed_class_module(modules):
+    fcreader, source_dir, number = modules
+    fcreader.Reader().read(number)
+
+    # same size, newer mtime and other content
+    time.sleep(0.01)
+    (source_dir / "fcstate.py").write_text(STATE_MODULE.replace("value", "Value"))
+    reader = fcreader.Reader()
+    assert reader.read(number) == 21
+    assert fcreader.NREADS[0] == 2
+    assert len(_entries()) == 1
+
+
+def test_missing_class(modules, monkeypatch):
+    fcreader, _, number = modules
+    fcreader.Reader().read(number)
+
+    # e.g. a class renamed or moved, unpickling fails
+    monkeypatch.delattr(sys.modules["fcstate"], "Thing")
+    monkeypatch.setattr(agfc, "module_digests", lambda digests: digests)
+    entry = os.path.join(agfc.CACHE_DIR, _entries()[0])
+    assert agfc._load_entry(entry) is None
+    assert not os.path.exists(entry)
+
+
+def test_broken_entry(modules):
+    fcreader, _, number = modules
+    fcreader.Reader().read(number)
+    entry = os.path.join(agfc.CACHE_DIR, _entries()[0])
+
+    with open(entry, "wb") as opened_entry:
+        opened_entry.write(b"broken")
+
+    assert fcreader.Reader().read(number) == 21
+    assert fcreader.NREADS[0] == 2
@@ -6,6 +6,7 @@ import pdb
 import md_stars as mds
 import md_universe as mdu
 import md_elements as mde
+import ag_filecache as agfc
 #import log_universe as logu
 
 __version__ = "2018-10-16"
@@ -469,6 +470,7 @@ class GauStuff(mdu.Universe):
         else:
             self.ts_coords[-1] = ts_coords
 
+    @agfc.cached_reader
     def read_gau_log(self, gau_log, save_all_scf_steps=False, overwrite=False, read_summary=False):
         """
         Read the last coordinates from a gaussian log file.
@@ -17,7 +17,7 @@ from lammps import lammps, PyLammps
 import Transformations as cgt
 import md_elements as mde
 import md_box as mdb
-import md_universe as mdu
+import md_linked_cells as mdlc
 #import ag_unify_md as agum
 import ag_geometry as agm
 import ag_lammps as aglmp
@@ -61,26 +61,24 @@ def rename(src, dst):
 
 
 def get_natms(lmpdat):
-    """[summary]
+    """
+    Get the number of atoms of a lammps data file.
 
-    [description]
+    Only the header of the data file is read (see ag_lammps.read_lmpdat).
 
     Parameters
     ----------
-    lmpdat : {[type]}
-        [description]
+    lmpdat : str
+        lammps data file
 
     Returns
     -------
-    [type]
-        [description]
+    natms : int
+        number of atoms
+
     """
-    with open(lmpdat, "r") as f_in:
-        line = f_in.readline()
-        while line != '':
-            line = f_in.readline()
-            if "atoms" in line:
-                return int(line.split()[0])
+    lmpdat_sys = aglmp.read_lmpdat(lmpdat, sections=[])
+    return lmpdat_sys.lmpdat_totals["atoms"]
 
 
 def get_remaining_cycles(total_cycles):
@@ -388,24 +386,52 @@ def _create_new_box(md_sys):
     md_sys.ts_boxes[0].box_lat2lmp(triclinic=False)
 
 
-def _check_sys(md_sys, atm_idx_max):
+def _clash_cells(coords, radius, min_dist):
     """
+    Bin coordinates into linked cells for clash checks.
+
+    The cubic box only serves the clash check; it holds everything inside
+    radius (around the origin) and is large enough that periodic images
+    never come closer than min_dist.
+
+    Parameters
+    ----------
+    coords : array of floats
+        coordinates to bin
+    radius : float
+        radius around the origin all atoms (binned and queried) lie within
+    min_dist : float
+        minimal distance between two atoms
+
+    Returns
+    -------
+    cell_list : md_linked_cells.CellList
+
     """
-    # check interatomic distances
-    md_sys.create_linked_cells(-1)
-    close_atms = md_sys.chk_atm_dist(frame_id=-1, min_dist=1.2)
-    close_atms = sorted(close_atms)
-
-    # check if new atoms were placed too near to the main system by comparing
-    # the atom indices (atom indices lower than those from the original main
-    # system are not counted)
-    try:
-        return close_atms[-1] > atm_idx_max
-    except IndexError:
-        return True
+    box_length = 2 * (radius + min_dist)
+    pi_2 = math.pi / 2
+    return mdlc.CellList(coords, box_length, box_length, box_length,
+                         pi_2, pi_2, pi_2, min_dist)
+
+
+def _check_sys(main_cells, add_sys, min_dist=1.2):
+    """
+    Check if the atoms of the added system clash with the main system.
+
+    Only the new atoms are queried against the (once) binned main system; the
+    search stops at the first clash.
+
+    Returns
+    -------
+    success : bool
+        True if no new atom is closer than min_dist to any atom of the main system
+
+    """
+    close_atms = main_cells.get_contacts(add_sys.ts_coords[-1], min_dist, first_only=True)
+    return len(close_atms) == 0
 
 
-def sysprep(lmpdat_out, lmpdat_main, lmpdat_add, dcd_main=None, dcd_add=None, frame_idx_main=-1, frame_idx_add=-1):
+def sysprep(lmpdat_out, lmpdat_main, lmpdat_add, dcd_main=None, dcd_add=None, frame_idx_main=-1, frame_idx_add=-1, attempts=1, min_dist=1.2):
     """
     Prepare the system for the next docking step.
 
@@ -414,7 +440,8 @@ def sysprep(lmpdat_out, lmpdat_main, lmpdat_add, dcd_main=None, dcd_add=None, fr
     radius r1 is created around the main system as well as a sphere with radius
     r2 around the agglomerate to add. Both systems are combined, checked for clashes
     and eventually a new lammps data file is written which can further be
-    utilized. If
+    utilized. The main system is binned only once, each placement of the added
+    system only checks the new atoms.
 
     Parameters
     ----------
@@ -440,6 +467,12 @@ def sysprep(lmpdat_out, lmpdat_main, lmpdat_add, dcd_main=None, dcd_add=None, fr
     frame_idx_add : int
         frame index of frame to add from dcd_add to lmpdat_add
 
+    attempts : int (optional, default: 1)
+        number of random placements of the added system to try
+
+    min_dist : float (optional, default: 1.2)
+        minimal distance between atoms of different molecules
+
     Returns
     -------
     success : bool
@@ -451,34 +484,50 @@ def sysprep(lmpdat_out, lmpdat_main, lmpdat_add, dcd_main=None, dcd_add=None, fr
     # read and transpose the main sys to the origin
     main_sys = aglmp.read_lmpdat(lmpdat_main, dcd_main, frame_idx_main)
     main_sys.transpose_by_cog(-1, [0, 0, 0], copy=False)
-    _natoms = len(main_sys.atoms)
 
     # read and transpose the add sys to the origin
     add_sys = aglmp.read_lmpdat(lmpdat_add, dcd_add, frame_idx_add)
     add_sys.transpose_by_cog(-1, [0, 0, 0], copy=False)
 
-    # rotate add sys
-    _rotate_sys(add_sys)
-
     # shift add sys to sphere around main sys
     main_sys_radius = main_sys.get_system_radius(-1)
     add_sys_radius = add_sys.get_system_radius(-1)
     kwz_radius = main_sys_radius + add_sys_radius
 
-    _shift_sys(add_sys, kwz_radius)
+    # molecules of the added system must not clash with each other (this does
+    # not change by rotating or shifting the whole system)
+    add_cells = _clash_cells(add_sys.ts_coords[-1], add_sys_radius, min_dist)
+    add_grps = np.array([atm.grp_id for atm in add_sys.atoms])
 
-    # merge both systems
-    main_sys.extend_universe(add_sys, mode="merge")
-    _create_new_box(main_sys)
+    if any(len(idxs_i) > 0 for idxs_i, _, _ in add_cells.iter_pairs(groups=add_grps)):
+        return False
 
-    # group atoms by bonds
-    main_sys.fetch_molecules_by_bonds()
-    main_sys.mols_to_grps()
+    # bin the main system once; added atoms lie within kwz_radius + buffer
+    # + add_sys_radius around the origin
+    main_cells = _clash_cells(main_sys.ts_coords[-1], kwz_radius + 1 + add_sys_radius, min_dist)
+    add_sys_coords = add_sys.ts_coords[-1]
+    success = False
 
-    success = _check_sys(main_sys, _natoms)
+    for _ in range(attempts):
+        add_sys.ts_coords[-1] = add_sys_coords
+        # rotate add sys and shift it to the sphere around main sys
+        _rotate_sys(add_sys)
+        _shift_sys(add_sys, kwz_radius)
+        success = _check_sys(main_cells, add_sys, min_dist)
+
+        if success is True:
+            break
 
     # write an output lammps data only if everything worked out
     if success is True:
+        # merge both systems
+        main_sys.extend_universe(add_sys, mode="merge")
+        _create_new_box(main_sys)
+
+        # group atoms by bonds
+        main_sys.fetch_molecules_by_bonds()
+        main_sys.mols_to_grps()
+
         # write new data file
         main_sys.change_indices(incr=1, mode="increase")
         main_sys.write_lmpdat(lmpdat_out, frame_id=0, title="System ready" +
@@ -726,15 +775,23 @@ def _lmp_indent(lmp, indents, runsteps, keep_last_fixes=False):
             lmp.command("unfix {}".format(indent_fix.split()[1]))
 
 
-def _check_clashes(sys_both, sys_a, sys_b, dcd_b=None, unwrap=False):
+def _check_clashes(sys_a, sys_b, dcd_b=None, unwrap=False, min_dist=1.0):
     """
     Check for imaginary clashes between atoms of two systems before combining them.
 
+    System b (e.g. the solvent) is binned into linked cells, only the atoms of
+    system a (e.g. the solvate) are queried against it.
+
     Parameters
     ----------
-    sys_both : Universe
     sys_a : Universe
     sys_b : Universe
+    dcd_b : str or None
+        dcd file to read the latest coordinates and box of system b from
+    unwrap : bool
+        unwrap the cell of system b first
+    min_dist : float
+        minimal distance between atoms of both systems
 
     Returns
     -------
@@ -743,7 +800,6 @@ def _check_clashes(sys_both, sys_a, sys_b, dcd_b=None, unwrap=False):
         solvent atoms otherwise
 
     """
-    #sys_both.reset_cells()
     # read latest solvent coordinates and boxes
     if dcd_b:
         sys_b.import_dcd(dcd_b)
@@ -755,22 +811,10 @@ def _check_clashes(sys_both, sys_a, sys_b, dcd_b=None, unwrap=False):
     if unwrap:
         sys_b.unwrap_cell(frame_id=-1)
 
-    # testing #################################################################
-    #sys_b.change_indices()
-    #sys_b.write_lmpdat("unwrapped.lmpdat", frame_id=-1, cgcmm=True)
-    #exit()
-    # #########################################################################
-
-    # concatenate solute and latest solvent coordinates
-    sys_both.ts_coords.append(np.concatenate((sys_a.ts_coords[-1], sys_b.ts_coords[-1])))
-    sys_both.ts_boxes = sys_b.ts_boxes
-    sys_both.create_linked_cells(-1, rcut_a=2, rcut_b=2, rcut_c=2)
-    close_atms_ab = sys_both.chk_atm_dist(-1, min_dist=1.0, exclude_same_molecule=True)
-    # only get close atoms from system a
-    close_atms_a = [i for i in close_atms_ab if i <= len(sys_a.atoms)]
+    cells_b = sys_b.create_cell_list(-1, min_dist)
+    close_atms_a = cells_b.get_contacts(sys_a.ts_coords[-1]).tolist()
 
     sys_b.reset_cells()
-    sys_both.reset_cells()
     return close_atms_a
 
 
@@ -784,11 +828,9 @@ def create_voids(lmpcuts, lmpdat_solvate, dcd_solvate=None, dcd_solvent=None):
 
     # load solution system (last frame only)
     solvent_sys = aglmp.read_lmpdat(lmpcuts.input_lmpdat, dcd_solvent, frame_idx_start=-2, frame_idx_stop=-1)
-    solution_sys = mdu.merge_systems([solvate_sys, solvent_sys])
-    solution_sys.reset_cells()
 
     # check solvate atoms with too close contacts to solvent atoms
-    close_atoms = _check_clashes(solution_sys, solvate_sys, solvent_sys)
+    close_atoms = _check_clashes(solvate_sys, solvent_sys)
     cogs_atoms = [solvate_sys.ts_coords[-1][i] for i in close_atoms]
     radii_atoms = [mde.elements_mass_radii[round(solvate_sys.atm_types[solvate_sys.atoms[i].atm_key].weigh, 1)] for i in close_atoms]
 
@@ -837,7 +879,7 @@ def create_voids(lmpcuts, lmpdat_solvate, dcd_solvate=None, dcd_solvent=None):
         for _ in range(5):
             indent_strs = _fix_indent_ids(all_radii_atoms, all_cogs_atoms, "atom", scale_start=factor_start, scale_stop=factor_stop)
             _lmp_indent(lmp, indent_strs, lmpcuts.runsteps, keep_last_fixes=False)
-            close_atoms = _check_clashes(solution_sys, solvate_sys, solvent_sys, lmpcuts.output_dcd)
+            close_atoms = _check_clashes(solvate_sys, solvent_sys, lmpcuts.output_dcd)
 
             # add new close atoms to present ones or stop indenting
             if close_atoms == []:
@@ -848,7 +890,7 @@ def create_voids(lmpcuts, lmpdat_solvate, dcd_solvate=None, dcd_solvent=None):
                 #print(close_atoms)
                 if atm_idx not in all_close_atoms:
                     all_close_atoms.append(atm_idx)
-                    all_radii_atoms.append(mde.elements_mass_radii[round(solvate_sys.atm_types[solvate_sys.atoms[i].atm_key].weigh, 1)])
+                    all_radii_atoms.append(mde.elements_mass_radii[round(solvate_sys.atm_types[solvate_sys.atoms[atm_idx].atm_key].weigh, 1)])
                     all_cogs_atoms.append(solvate_sys.ts_coords[-1][atm_idx])
 
             # dynamically grow sphere around atoms
@@ -924,7 +966,7 @@ def _append_data(data, lmplog, fstart=1, thermo="PotEng"):
 
     # potential energy of the whole system (solvent included if part of system)
     cur_data = cur_log.data[-1][thermo][fstart:]
-    data.extend(cur_data)
+    data.extend(cur_data.tolist())
 
 
 #def vmd_rmsd_and_cluster(lmpdat_solution, lmpdat_solvate, dcd_files, atm_idxs, xyz_out, percentage_to_check=80):
@@ -1329,7 +1371,7 @@ def find_best_frame(lmplogs, dcds, thermo="c_pe_solvate_complete", percentage_to
         # flatten list if more than one run was done
         # neglect the first frame since it is redundant in the log file
         cur_data = [i[thermo][1:] for i in cur_log.data]
-        cur_data = [item for i in cur_data for item in i]
+        cur_data = np.concatenate(cur_data).tolist() if cur_data else []
         total_data.append(cur_data)
 
     del cur_data
@@ -1,19 +1,163 @@
 
 import pdb
 import os
+import itertools
 import numpy as np
 import copy
 import md_box as mdb
 import md_stars as mds
 import md_universe as mdu
 import ag_vectalg as agv
-import struct
 import ag_lmpdcd_helpers as agldh
-from natsort import natsorted
+import ag_lmpdcd as agldcd
+import ag_lmprst_helpers as aglrh
+import ag_filecache as agfc
 #import collections
 
 __version__ = "2018-10-25"
 
+# header entries with the number of entries of each section
+LMPDAT_TOTALS = ("atoms", "bonds", "angles", "dihedrals", "impropers",
+                 "atom types", "bond types", "angle types", "dihedral types",
+                 "improper types")
+
+# sections of the data file and the header entry with their number of lines
+# (None: one line for each pair of atom types)
+LMPDAT_SECTIONS = {
+    "Masses": "atom types",
+    "Pair Coeffs": "atom types",
+    "PairIJ Coeffs": None,
+    "Bond Coeffs": "bond types",
+    "Angle Coeffs": "angle types",
+    "Dihedral Coeffs": "dihedral types",
+    "Improper Coeffs": "improper types",
+    "Atoms": "atoms",
+    "Velocities": "atoms",
+    "Bonds": "bonds",
+    "Angles": "angles",
+    "Dihedrals": "dihedrals",
+    "Impropers": "impropers",
+    "Forces": "atoms",
+}
+
+# sections which must be read as well to read a section (ids are translated)
+LMPDAT_SECTION_DEPENDENCIES = {
+    "Pair Coeffs": ("Masses",),
+    "PairIJ Coeffs": ("Masses",),
+    "Atoms": ("Masses",),
+    "Bonds": ("Bond Coeffs", "Atoms", "Masses"),
+    "Angles": ("Angle Coeffs", "Atoms", "Masses"),
+    "Dihedrals": ("Dihedral Coeffs", "Atoms", "Masses"),
+    "Impropers": ("Improper Coeffs", "Atoms", "Masses"),
+}
+
+
+def _is_number(word):
+    """
+    Check if a word of a line is a number.
+    """
+    try:
+        float(word)
+    except ValueError:
+        return False
+
+    return True
+
+
+def _section_nlines(section, totals):
+    """
+    Number of lines of a section (without its header and the empty line).
+    """
+    if section == "PairIJ Coeffs":
+        return totals["atom types"] * (totals["atom types"] + 1) // 2
+
+    return totals[LMPDAT_SECTIONS[section]]
+
+
+def _skip_section(lmpdat_in, nlines):
+    """
+    Skip the empty line and all lines of a section without parsing them.
+    """
+    next(itertools.islice(lmpdat_in, nlines + 1, nlines + 1), None)
+
+
+def _read_section(lmpdat_in, nlines, ncols):
+    """
+    Read all lines of a section (Atoms, Bonds, ...) at once.
+
+    Comments (cgcmm-info) are split off all lines in one go, the entries
+    are split into a (nlines, ncols)-array of strings (columns beyond ncols,
+    e.g. image flags, are dropped).
+
+    Returns
+    -------
+    entries : np.array of str
+        (nlines, ncols)-array with the entries of each line
+    comments : np.array of str
+        comment of each line (empty if there is none)
+    has_comment : np.array of bools
+        True if the line has a comment
+
+    """
+    next(lmpdat_in)  # skip empty line
+    lines = list(itertools.islice(lmpdat_in, nlines))
+
+    if len(lines) != nlines:
+        raise IOError("Section ended after {} of {} lines!".format(len(lines), nlines))
+
+    if nlines == 0:
+        return (np.zeros((0, ncols), dtype=str), np.zeros(0, dtype=str),
+                np.zeros(0, dtype=bool))
+
+    parts = np.char.partition(np.array(lines), "#")
+    data = parts[:, 0]
+    has_comment = parts[:, 1] == "#"
+    # only the part up to a second '#' is the comment
+    comments = np.char.partition(np.char.rstrip(parts[:, 2], "\n"), "#")[:, 0]
+
+    words = " ".join(data.tolist()).split()
+    ncols_file = len(data[0].split())
+
+    if len(words) == nlines * ncols_file and ncols_file >= ncols:
+        entries = np.array(words).reshape(nlines, ncols_file)[:, :ncols]
+    else:
+        # lines with different numbers of columns
+        entries = np.array([i.split()[:ncols] for i in data.tolist()])
+
+    if entries.shape != (nlines, ncols):
+        raise IOError("Expected {} columns in each line of the section!".format(ncols))
+
+    return (entries, comments, has_comment)
+
+
+def _id_map(old_new):
+    """
+    Sorted arrays of the ids of the data file and the internal ids (from a
+    dictionary old id -> new id) for _translate.
+    """
+    old_ids = np.array(sorted(old_new), dtype=np.int64)
+    new_ids = np.array([old_new[i] for i in old_ids.tolist()], dtype=np.int64)
+    return (old_ids, new_ids)
+
+
+def _translate(id_map, ids):
+    """
+    Translate ids of the data file to internal ids (vectorized look-up).
+    """
+    old_ids, new_ids = id_map
+    ids = np.asarray(ids).astype(np.int64)
+
+    if len(ids) == 0:
+        return ids
+
+    pos = np.minimum(np.searchsorted(old_ids, ids), len(old_ids) - 1)
+    unknown = old_ids[pos] != ids
+
+    if np.any(unknown):
+        raise KeyError(int(ids[unknown][0]))
+
+    return new_ids[pos]
+
 
 class LmpStuff(mdu.Universe):
     """
@@ -25,12 +169,23 @@ class LmpStuff(mdu.Universe):
         """
         # generates lists for atom-, bond-, angle-types, etc. pp.
         mdu.Universe.__init__(self)
+        # header entries (e.g. 'atoms', 'bond types') of the last data file read
+        self.lmpdat_totals = dict.fromkeys(LMPDAT_TOTALS, 0)
 
+    @agfc.cached_reader
     def read_lmpdat(self, lmpdat, energy_unit=None, angle_unit=None,
-                    overwrite_data=False, debug=False):
+                    overwrite_data=False, debug=False, sections=None):
         """
         energy_unit eV, kCal, kJ
         angle_unit  deg, rad
+        sections    list of str; sections to read (e.g. ["Atoms"]), the header
+                    is always read; None reads all sections; sections the given
+                    ones depend on are read as well (see
+                    LMPDAT_SECTION_DEPENDENCIES); all other sections are skipped
+                    and reading stops when all sections asked for are read;
+                    the header entries are kept in lmpdat_totals, i.e.
+                    sections=[] gives the number of atoms, bonds etc. without
+                    reading any section
         cgcmm       boolean; parse cgcmm although not given in file header;
                     bond coefficients may be given by numbers 1, 2, 3 in
                     comment line (first entry) after each entry in the Bond Coeffs section:
@@ -47,6 +202,22 @@ class LmpStuff(mdu.Universe):
         """
         pair_ii = False
 
+        # sections still to read (None: all)
+        remaining = None
+
+        if sections is not None:
+            remaining = set(sections)
+            unknown = remaining - set(LMPDAT_SECTIONS)
+
+            if unknown:
+                raise ValueError("Unknown section(s) {}".format(", ".join(sorted(unknown))))
+
+            for section in sections:
+                remaining.update(LMPDAT_SECTION_DEPENDENCIES.get(section, ()))
+
+        # molecules are only assigned if the bonds are read
+        fetch_molecules = remaining is None or "Bonds" in remaining
+
         # check if there are frames existing before data is loaded
         if self.ts_coords:
             print("***Info Loading coordinates from data-file on top of " +
@@ -61,55 +232,53 @@ class LmpStuff(mdu.Universe):
                 print("***Info: CGCMM-Style found! " +
                       "Trying to parse additional data.")
 
+            totals = self.lmpdat_totals = dict.fromkeys(LMPDAT_TOTALS, 0)
+
             for line in lmpdat_in:
+                # each section header is detected by its keyword, i.e. the
+                # words of the line which are not numbers or comments
+                # (e.g. 'atoms', 'xlo xhi', 'Bond Coeffs')
+                words = line.split("#")[0].split()
+                keyword = " ".join(i for i in words if not _is_number(i))
+                section = "Forces" if line.startswith("# Forces") else keyword
+
+                # skip sections not asked for, stop if all of them are read
+                if remaining is not None and section in LMPDAT_SECTIONS:
+                    if not remaining:
+                        break
+
+                    if section not in remaining:
+                        _skip_section(lmpdat_in, _section_nlines(section, totals))
+                        continue
+
+                    remaining.discard(section)
+
                 # /// general stuff ///
-                if "atoms" in line:
-                    total_atms = int(line.split()[0])
-                elif "bonds" in line:
-                    total_bnds = int(line.split()[0])
-                elif "angles" in line:
-                    total_angs = int(line.split()[0])
-                elif "dihedrals" in line:
-                    total_dihs = int(line.split()[0])
-                elif "impropers" in line:
-                    total_imps = int(line.split()[0])
-                elif "atom types" in line:
-                    total_atmtypes = int(line.split()[0])
-                elif "bond types" in line:
-                    total_bndtypes = int(line.split()[0])
-                elif "angle types" in line:
-                    total_angtypes = int(line.split()[0])
-                elif "dihedral types" in line:
-                    total_dihtypes = int(line.split()[0])
-                elif "improper types" in line:
-                    total_imptypes = int(line.split()[0])
+                if keyword in totals:
+                    totals[keyword] = int(words[0])
 
                 # /// box settings ///
-                elif "xlo xhi" in line:
-                    line = line.split()
-                    lmpdat_box.lmp_xlo = float(line[0])
-                    lmpdat_box.lmp_xhi = float(line[1])
-                elif "ylo yhi" in line:
-                    line = line.split()
-                    lmpdat_box.lmp_ylo = float(line[0])
-                    lmpdat_box.lmp_yhi = float(line[1])
-                elif "zlo zhi" in line:
-                    line = line.split()
-                    lmpdat_box.lmp_zlo = float(line[0])
-                    lmpdat_box.lmp_zhi = float(line[1])
-                elif "xy xz yz" in line:
-                    line = line.split()
-                    lmpdat_box.lmp_xy = float(line[0])
-                    lmpdat_box.lmp_xz = float(line[1])
-                    lmpdat_box.lmp_yz = float(line[2])
+                elif keyword == "xlo xhi":
+                    lmpdat_box.lmp_xlo = float(words[0])
+                    lmpdat_box.lmp_xhi = float(words[1])
+                elif keyword == "ylo yhi":
+                    lmpdat_box.lmp_ylo = float(words[0])
+                    lmpdat_box.lmp_yhi = float(words[1])
+                elif keyword == "zlo zhi":
+                    lmpdat_box.lmp_zlo = float(words[0])
+                    lmpdat_box.lmp_zhi = float(words[1])
+                elif keyword == "xy xz yz":
+                    lmpdat_box.lmp_xy = float(words[0])
+                    lmpdat_box.lmp_xz = float(words[1])
+                    lmpdat_box.lmp_yz = float(words[2])
 
                 # /// atom types (masses) ///
-                elif "Masses" in line:
+                elif keyword == "Masses":
                     next(lmpdat_in)  # skip empty line
 
                     # parse mass entry
                     atm_tp_old_new = {}
-                    for atmcnt in range(total_atmtypes):
+                    for atmcnt in range(totals["atom types"]):
                         line = next(lmpdat_in)
                         cur_atype = mds.Atom()
                         # parse cgcmm-section
@@ -124,12 +293,12 @@ class LmpStuff(mdu.Universe):
                         atm_tp_old_new[atm_key] = atmcnt
 
                 # /// bond types(coeffs) ///
-                elif "Bond Coeffs" in line:
+                elif keyword == "Bond Coeffs":
                     next(lmpdat_in)  # skip empty line
 
                     # parse bond-type entries
                     bnd_tp_old_new = {}
-                    for bndcnt in range(total_bndtypes):
+                    for bndcnt in range(totals["bond types"]):
                         line = next(lmpdat_in)
                         line, comment = self._split_line(line)  # split line into data and comment
                         line = line.split()
@@ -175,12 +344,12 @@ class LmpStuff(mdu.Universe):
                             self.bnd_types[bndcnt].check_bnd_type()
 
                 # /// angle types(coeffs) ///
-                elif "Angle Coeffs" in line:
+                elif keyword == "Angle Coeffs":
                     next(lmpdat_in)  # skip empty line
 
                     # parse angle-type entries
                     ang_tp_old_new = {}
-                    for angcnt in range(total_angtypes):
+                    for angcnt in range(totals["angle types"]):
                         line = next(lmpdat_in)
                         line, comment = self._split_line(line)
                         line = line.split()
@@ -212,14 +381,14 @@ class LmpStuff(mdu.Universe):
                         self.ang_types[angcnt].check_ang_type()
 
                 # /// dihedral types(coeffs) ///
-                elif "Dihedral Coeffs" in line:
+                elif keyword == "Dihedral Coeffs":
                     if debug is True:
                         print("***Lammps-Data-Info: Only charmm-dihedral-style supported (atm)!")
                     next(lmpdat_in)  # skip empty line
 
                     # parse dihedral-type entries
                     dih_tp_old_new = {}
-                    for dihcnt in range(total_dihtypes):
+                    for dihcnt in range(totals["dihedral types"]):
                         line = next(lmpdat_in)
                         line, comment = self._split_line(line)
                         line = line.split()
@@ -244,7 +413,7 @@ class LmpStuff(mdu.Universe):
                             self.dih_types[dihcnt].check_dih_type()
 
                 # /// improper types(coeffs) ///
-                elif "Improper Coeffs" in line:
+                elif keyword == "Improper Coeffs":
                     if debug is True:
                         print("***Lammps-Data-Info: Only cvff-improper-style supported (atm)!")
 
@@ -252,7 +421,7 @@ class LmpStuff(mdu.Universe):
 
                     # parse improper-type entries
                     imp_tp_old_new = {}
-                    for impcnt in range(total_imptypes):
+                    for impcnt in range(totals["improper types"]):
                         line = next(lmpdat_in)
                         line, comment = self._split_line(line)
                         line = line.split()
@@ -276,12 +445,12 @@ class LmpStuff(mdu.Universe):
                             self.imp_types[impcnt].check_imp_type()
 
                 # /// pair coefficients entry ///
-                elif "Pair Coeffs" in line:
+                elif keyword == "Pair Coeffs":
                     if debug is True:
                         print("***Lammps-Data-Info: Parsing Pair Coeffs")
 
                     next(lmpdat_in)
-                    total_pairtypes = total_atmtypes
+                    total_pairtypes = totals["atom types"]
 
                     for _ in range(total_pairtypes):
                         line = next(lmpdat_in)
@@ -308,12 +477,12 @@ class LmpStuff(mdu.Universe):
 
                     pair_ii = True
 
-                elif "PairIJ Coeffs" in line:
+                elif keyword == "PairIJ Coeffs":
                     if debug is True:
                         print("***Lmpdat-Info: Parsing PairIJ Coeffs")
 
                     next(lmpdat_in)
-                    total_pairtypes = int(total_atmtypes*(total_atmtypes+1)/2)
+                    total_pairtypes = int(totals["atom types"]*(totals["atom types"]+1)/2)
 
                     for _ in range(total_pairtypes):
                         line = next(lmpdat_in)
@@ -341,34 +510,37 @@ class LmpStuff(mdu.Universe):
                             self.atm_types[atm_key_i].sigma   = sigma_ij
 
                 # /// atoms entry ///
-                elif "Atoms" in line:
+                elif keyword == "Atoms":
                     # read whole section first, sort by id, then re-index the atom-ids
-                    #self.atm_idx_id = {}
-                    atm_id_old_new = {}
-                    tmp_ts = []
-                    next(lmpdat_in)  # skip empty line
-                    tmp_atm_lines = []
-
-                    # parse 'Atoms' and append to self.atoms
-                    for atmcnt in range(total_atms):
-                        line = next(lmpdat_in)
-
-                        # divide line in lmpdat- and cgcmm-stuff
-                        #lmpdat_stuff, csitnam, cres = self._parse_cgcmm(line)  #TODO old garbage
-                        tmp_atm_lines.append(self._parse_cgcmm(line))
+                    entries, comments, has_comment = _read_section(
+                        lmpdat_in, totals["atoms"], 7)
 
                     # sort lines by id
                     if debug is True:
                         print("***Lammps-Data-Info: Sorting atoms by their id's, " +
                               "starting with the smallest one from given data file.")
-                    tmp_atm_lines = natsorted(tmp_atm_lines)
 
-                    for atmcnt, sorted_line in enumerate(tmp_atm_lines):
-                        # atmcnt starts with 0
-                        lmpdat_stuff, csitnam, cres = sorted_line
-                        # translate original atom-ids to new internal ids
-                        atm_id_old_new[int(lmpdat_stuff[0])] = atmcnt
-                        #self.atm_idx_id[atmcnt] = int(lmpdat_stuff[0])
+                    atm_ids = entries[:, 0].astype(np.int64)
+                    order = np.argsort(atm_ids, kind="stable")
+                    # translate original atom-ids to new internal ids (atmcnt)
+                    atm_id_map = (atm_ids[order], np.arange(len(order)))
+
+                    grp_ids = entries[order, 1].astype(np.int64).tolist()
+                    atm_keys = _translate(_id_map(atm_tp_old_new), entries[order, 2]).tolist()
+                    chges = entries[order, 3].astype(np.float64).tolist()
+                    # cgcmm-info: atom name and residue
+                    cgcmm_info = [i.split() for i in comments[order].tolist()]
+                    has_comment = has_comment[order].tolist()
+
+                    for atmcnt in range(len(order)):
+                        csitnam, cres = None, None
+
+                        if has_comment[atmcnt] is True:
+                            if len(cgcmm_info[atmcnt]) > 0:
+                                csitnam = cgcmm_info[atmcnt][0]
+
+                            if len(cgcmm_info[atmcnt]) >= 2:
+                                cres = cgcmm_info[atmcnt][1]
 
                         # check if instance of Atom with id atmcnt already exists
                         # i.e. a data file have had already been loaded
@@ -377,11 +549,10 @@ class LmpStuff(mdu.Universe):
 
                             # overwrite data
                             if overwrite_data is True:
-                                #cur_atm.atm_id  = int(lmpdat_stuff[0])
                                 cur_atm.atm_id  = atmcnt
-                                cur_atm.grp_id  = int(lmpdat_stuff[1])
-                                cur_atm.atm_key = atm_tp_old_new[int(lmpdat_stuff[2])]
-                                cur_atm.chge    = float(lmpdat_stuff[3])
+                                cur_atm.grp_id  = grp_ids[atmcnt]
+                                cur_atm.atm_key = atm_keys[atmcnt]
+                                cur_atm.chge    = chges[atmcnt]
 
                                 # parse cgcmm stuff if available
                                 if csitnam is not None:
@@ -393,17 +564,16 @@ class LmpStuff(mdu.Universe):
                             else:  # complement data
 
                                 if not hasattr(self.atoms[atmcnt], "atm_id"):
-                                    #cur_atm.atm_id  = int(lmpdat_stuff[0])
                                     cur_atm.atm_id  = atmcnt
 
                                 if not hasattr(self.atoms[atmcnt], "grp_id"):
-                                    cur_atm.grp_id  = int(lmpdat_stuff[1])
+                                    cur_atm.grp_id  = grp_ids[atmcnt]
 
                                 if not hasattr(self.atoms[atmcnt], "atm_key"):
-                                    cur_atm.atm_key = atm_tp_old_new[int(lmpdat_stuff[2])]
+                                    cur_atm.atm_key = atm_keys[atmcnt]
 
                                 if not hasattr(self.atoms[atmcnt], "chge"):
-                                    cur_atm.chge    = float(lmpdat_stuff[3])
+                                    cur_atm.chge    = chges[atmcnt]
 
                                 # parse cgcmm stuff if available
                                 if not hasattr(self.atoms[atmcnt], "sitnam") and csitnam is not None:
@@ -414,142 +584,98 @@ class LmpStuff(mdu.Universe):
 
                         # new atom must be created
                         except IndexError:
-                            #atm_id=int(lmpdat_stuff[0])
                             cur_atm = mds.Atom(atm_id=atmcnt,
-                                               grp_id=int(lmpdat_stuff[1]),
-                                               atm_key=atm_tp_old_new[int(lmpdat_stuff[2])],
-                                               chge=float(lmpdat_stuff[3])
-                                               )
-
-                            # # parse cgcmm stuff if available
-                            if csitnam is not None:
-                                cur_atm.sitnam = csitnam
-
-                            if cres is not None:
-                                cur_atm.res = cres
+                                               grp_id=grp_ids[atmcnt],
+                                               atm_key=atm_keys[atmcnt],
+                                               chge=chges[atmcnt],
+                                               sitnam=csitnam,
+                                               res=cres)
 
                             # append new atom if none was present before
                             self.atoms.append(cur_atm)
 
-                        # parse coordinates
-                        ccoords = np.array([float(i) for i in lmpdat_stuff[4:7]])
-                        # append coordinates to temporary frame
-                        tmp_ts.append(ccoords)
-
                     # append coordinates from data to (given) timesteps
-                    self.ts_coords.append(np.array(tmp_ts))
+                    self.ts_coords.append(entries[order, 4:7].astype(np.float64))
 
                 # /// bonds entry ///
-                elif line.startswith("Bonds"):
-                    next(lmpdat_in)  # skip empty line
-
-                    # parse bonds
-                    for bndcnt in range(total_bnds):
-                        line = next(lmpdat_in)
-                        line, comment = self._split_line(line)
-                        line = line.split()
-                        #line = [int(i) for i in line]
-
-                        cur_bnd = mds.Bond()
-                        #cur_bnd.bnd_id = int(line[0])
-                        cur_bnd.bnd_id  = bndcnt
-                        cur_bnd.bnd_key = bnd_tp_old_new[int(line[1])]
-                        # translate original atom-ids
-                        cur_bnd.atm_id1 = atm_id_old_new[int(line[2])]
-                        cur_bnd.atm_id2 = atm_id_old_new[int(line[3])]
-
-                        if comment is not None:
-                            comment = comment.split()
-
-                            # try reading the bond order if first item after
-                            # the comment is a number
-                            try:
-                                cur_bnd.bnd_order = float(comment[0])
-
-                                # read atom types the bond is between
-                                if len(comment) > 2:
-                                    cur_bnd.sitnam_2 = comment[2]
-                                if len(comment) > 1:
-                                    cur_bnd.sitnam_1 = comment[1]
-                            except ValueError:
-                                pass
-
+                elif keyword == "Bonds":
+                    entries, comments, has_comment = _read_section(
+                        lmpdat_in, totals["bonds"], 4)
+                    bnd_keys = _translate(_id_map(bnd_tp_old_new), entries[:, 1]).tolist()
+                    # translate original atom-ids
+                    atm_ids1 = _translate(atm_id_map, entries[:, 2]).tolist()
+                    atm_ids2 = _translate(atm_id_map, entries[:, 3]).tolist()
+
+                    for bndcnt in range(len(entries)):
+                        cur_bnd = mds.Bond(bnd_id=bndcnt, bnd_key=bnd_keys[bndcnt],
+                                           atm_id1=atm_ids1[bndcnt],
+                                           atm_id2=atm_ids2[bndcnt])
                         self.bonds.append(cur_bnd)
 
-                # /// angles entry ///
-                elif "Angles" in line:
-                    next(lmpdat_in)  # skip empty line
+                    # bond orders (and atom names) only of bonds with a comment
+                    for bndcnt in np.flatnonzero(has_comment).tolist():
+                        comment = comments[bndcnt].split()
+                        cur_bnd = self.bonds[-len(entries) + bndcnt]
 
-                    # parse angles
-                    for angcnt in range(total_angs):
-                        line = next(lmpdat_in)
-                        line, comment = self._split_line(line)
-                        line = line.split()
-                        #line = [int(i) for i in line]
+                        # try reading the bond order if first item after
+                        # the comment is a number
+                        try:
+                            cur_bnd.bnd_order = float(comment[0])
 
-                        cur_ang = mds.Angle()
-                        #cur_ang.ang_id = int(line[0])
-                        cur_ang.ang_id  = angcnt
-                        cur_ang.ang_key = ang_tp_old_new[int(line[1])]
-                        cur_ang.atm_id1 = atm_id_old_new[int(line[2])]
-                        cur_ang.atm_id2 = atm_id_old_new[int(line[3])]
-                        cur_ang.atm_id3 = atm_id_old_new[int(line[4])]
+                            # read atom types the bond is between
+                            if len(comment) > 2:
+                                cur_bnd.sitnam_2 = comment[2]
+                            if len(comment) > 1:
+                                cur_bnd.sitnam_1 = comment[1]
+                        except (ValueError, IndexError):
+                            pass
 
+                # /// angles entry ///
+                elif keyword == "Angles":
+                    entries = _read_section(lmpdat_in, totals["angles"], 5)[0]
+                    ang_keys = _translate(_id_map(ang_tp_old_new), entries[:, 1]).tolist()
+                    atm_ids = _translate(atm_id_map, entries[:, 2:5].ravel()).reshape(-1, 3).tolist()
+
+                    for angcnt, (atm_id1, atm_id2, atm_id3) in enumerate(atm_ids):
+                        cur_ang = mds.Angle(ang_id=angcnt, ang_key=ang_keys[angcnt],
+                                            atm_id1=atm_id1, atm_id2=atm_id2,
+                                            atm_id3=atm_id3)
                         self.angles.append(cur_ang)
 
                 # /// dihedrals entry ///
-                elif "Dihedrals" in line:
-                    next(lmpdat_in)  # skip empty line
-
-                    # parse dihedrals
-                    for dihcnt in range(total_dihs):
-                        line = next(lmpdat_in)
-                        line, comment = self._split_line(line)
-                        line = line.split()
-                        #line = [int(i) for i in line]
-
-                        cur_dih = mds.Dihedral()
-                        #cur_dih.dih_id = int(line[0])
-                        cur_dih.dih_id  = dihcnt
-                        cur_dih.dih_key = dih_tp_old_new[int(line[1])]
-                        cur_dih.atm_id1 = atm_id_old_new[int(line[2])]
-                        cur_dih.atm_id2 = atm_id_old_new[int(line[3])]
-                        cur_dih.atm_id3 = atm_id_old_new[int(line[4])]
-                        cur_dih.atm_id4 = atm_id_old_new[int(line[5])]
-
+                elif keyword == "Dihedrals":
+                    entries = _read_section(lmpdat_in, totals["dihedrals"], 6)[0]
+                    dih_keys = _translate(_id_map(dih_tp_old_new), entries[:, 1]).tolist()
+                    atm_ids = _translate(atm_id_map, entries[:, 2:6].ravel()).reshape(-1, 4).tolist()
+
+                    for dihcnt, (atm_id1, atm_id2, atm_id3, atm_id4) in enumerate(atm_ids):
+                        cur_dih = mds.Dihedral(dih_id=dihcnt, dih_key=dih_keys[dihcnt],
+                                               atm_id1=atm_id1, atm_id2=atm_id2,
+                                               atm_id3=atm_id3, atm_id4=atm_id4)
                         self.dihedrals.append(cur_dih)
 
                 # /// impropers entry ///
-                elif "Impropers" in line:
-                    next(lmpdat_in)  # skip empty line
-
-                    for impcnt in range(total_imps):
-                        line = next(lmpdat_in)
-                        line, comment = self._split_line(line)
-                        line = line.split()
-                        #line = [int(i) for i in line]
-
-                        cur_imp = mds.Improper()
-                        #cur_imp.imp_id = int(line[0])
-                        cur_imp.imp_id  = impcnt
-                        cur_imp.imp_key = imp_tp_old_new[int(line[1])]
-                        cur_imp.atm_id1 = atm_id_old_new[int(line[2])]
-                        cur_imp.atm_id2 = atm_id_old_new[int(line[3])]
-                        cur_imp.atm_id3 = atm_id_old_new[int(line[4])]
-                        cur_imp.atm_id4 = atm_id_old_new[int(line[5])]
-
+                elif keyword == "Impropers":
+                    entries = _read_section(lmpdat_in, totals["impropers"], 6)[0]
+                    imp_keys = _translate(_id_map(imp_tp_old_new), entries[:, 1]).tolist()
+                    atm_ids = _translate(atm_id_map, entries[:, 2:6].ravel()).reshape(-1, 4).tolist()
+
+                    for impcnt, (atm_id1, atm_id2, atm_id3, atm_id4) in enumerate(atm_ids):
+                        cur_imp = mds.Improper(imp_id=impcnt, imp_key=imp_keys[impcnt],
+                                               atm_id1=atm_id1, atm_id2=atm_id2,
+                                               atm_id3=atm_id3, atm_id4=atm_id4)
                         self.impropers.append(cur_imp)
 
-                elif "Velocities" in line:
+                elif keyword == "Velocities":
                     pass  # wip
-                elif "# Forces" in line:
+                elif line.startswith("# Forces"):
                     # since lammps also provides us with forces information,
                     # we make it possible to read those from the data file
                     # THIS IS NOT PART OF THE OFFICIAL LAMMPS DATA STRUCTURE!
                     next(lmpdat_in)  # skip empty line
                     tmp_forces = []
 
-                    for atmcnt, sorted_line in enumerate(tmp_atm_lines):
+                    for _ in range(totals["atoms"]):
                         line = next(lmpdat_in)
                         # parse coordinates
                         cforces = np.array([float(i) for i in line.split()[2:4]])
@@ -564,11 +690,12 @@ class LmpStuff(mdu.Universe):
         # append data-box to timestep-box (every timestep needs a box!)
         self.ts_boxes.append(lmpdat_box)
 
-        # assign all atoms to their corresponding molecules internally
-        self.fetch_molecules_by_bonds()
+        if fetch_molecules is True:
+            # assign all atoms to their corresponding molecules internally
+            self.fetch_molecules_by_bonds()
 
-        # assign atoms to groups according to their molecule membership
-        self.mols_to_grps()
+            # assign atoms to groups according to their molecule membership
+            self.mols_to_grps()
 
         # only mix, if ii-pairs given (ij-pairs may be defined differently)
         if pair_ii is True:
@@ -901,21 +1028,25 @@ class LmpStuff(mdu.Universe):
 
                     lmpdat_out.write("\n")
 
+            # each of the following sections is formatted completely and
+            # written at once; the column widths are put into the format
+            # strings beforehand
+
             # /// atoms entry ///
             if self.atoms:
-                lmpdat_out.write("Atoms\n")
-                lmpdat_out.write("\n")
                 try:
                     longest_grp_id = len(str(self.atoms[-1].grp_id))
                 except AttributeError:
                     longest_grp_id = 2
 
                 longest_atm_key = len(str(len(self.atm_types)))
+                atm_fmt = ("{0:<8d} {1:<%dd}      {2:<%dd} {3: >10.6f} " +
+                           "{4: >16.6f} {5: >12.6f} {6: >12.6f}") % (longest_grp_id,
+                                                                     longest_atm_key)
+                atm_coords = np.asarray(self.ts_coords[frame_id]).tolist()
+                section = ["Atoms\n", "\n"]
 
                 for cidx, catm in enumerate(self.atoms):
-                    # get atom-index for current atom
-                    #cidx = self.atm_id_idx[catm.atm_id]
-                    #cidx = catm.atm_id
                     # atom-id
                     if not hasattr(catm, "atm_id"):
                         catm.atm_id = cidx
@@ -929,110 +1060,91 @@ class LmpStuff(mdu.Universe):
                     if not hasattr(catm, "chge"):
                         catm.chge = 0.0
 
-                    lmpdat_out.write("{0:<8d} {1:<{width_2}d}      {2:<{width_3}d} {3: >10.6f} {c[0]: >16.6f} {c[1]: >12.6f} {c[2]: >12.6f}".format(
-                        catm.atm_id,
-                        catm.grp_id,
-                        catm.atm_key,
-                        catm.chge,
-                        width_2=longest_grp_id,
-                        width_3=longest_atm_key,
-                        c=self.ts_coords[frame_id][cidx])
-                    )
+                    section.append(atm_fmt.format(catm.atm_id, catm.grp_id,
+                                                  catm.atm_key, catm.chge,
+                                                  *atm_coords[cidx][:3]))
 
                     # write cgcmm info (if given)
                     if cgcmm:
-                        lmpdat_out.write(" #")
+                        section.append(" #")
                         try:
-                            lmpdat_out.write(" {:<s}".format(catm.sitnam))
-                            lmpdat_out.write(" {}".format(catm.res))
+                            section.append(" {:<s}".format(catm.sitnam))
+                            section.append(" {}".format(catm.res))
                         except AttributeError:
                             pass
 
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
+                    section.append("\n")
+
+                section.append("\n")
+                lmpdat_out.write("".join(section))
 
             # /// bonds entry ///
             if self.bonds:
-                lmpdat_out.write("Bonds\n")
-                lmpdat_out.write("\n")
                 longest_bnd_key = len(str(len(self.bnd_types)))
+                bnd_fmt = "{0:<8d} {1:>%dd}      {2:>%dd} {3:>%dd}" % (
+                    longest_bnd_key, longest_atm_id, longest_atm_id)
+                section = ["Bonds\n", "\n"]
 
                 for cbnd in self.bonds:
-                    lmpdat_out.write("{0:<8d} {1:>{width_2}d}      {2:>{width_3}d} {3:>{width_3}d}".format(
-                        cbnd.bnd_id, cbnd.bnd_key, cbnd.atm_id1, cbnd.atm_id2,
-                        width_2=longest_bnd_key,
-                        width_3=longest_atm_id)
-                    )
+                    section.append(bnd_fmt.format(cbnd.bnd_id, cbnd.bnd_key,
+                                                  cbnd.atm_id1, cbnd.atm_id2))
 
                     # write bond order as well if given for current bond
                     if hasattr(cbnd, "bnd_order"):
-                        lmpdat_out.write(" # {}".format(cbnd.bnd_order))
+                        section.append(" # {}".format(cbnd.bnd_order))
 
+                    section.append("\n")
 
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
+                section.append("\n")
+                lmpdat_out.write("".join(section))
 
             # /// angles entry ///
             if self.angles:
-                lmpdat_out.write("Angles\n")
-                lmpdat_out.write("\n")
                 longest_ang_key = len(str(len(self.ang_types)))
-
-                for cang in self.angles:
-                    lmpdat_out.write("{0:<8d} {1:>{width_2}d}      {2:>{width_3}d} {3:>{width_3}d} {4:>{width_3}d}".format(
-                        cang.ang_id, cang.ang_key,
-                        cang.atm_id1, cang.atm_id2, cang.atm_id3,
-                        width_2=longest_ang_key,
-                        width_3=longest_atm_id)
-                    )
-
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
+                ang_fmt = "{0:<8d} {1:>%dd}      {2:>%dd} {3:>%dd} {4:>%dd}\n" % (
+                    (longest_ang_key,) + 3*(longest_atm_id,))
+                section = ["Angles\n", "\n"]
+                section.extend(ang_fmt.format(cang.ang_id, cang.ang_key,
+                                              cang.atm_id1, cang.atm_id2, cang.atm_id3)
+                               for cang in self.angles)
+                section.append("\n")
+                lmpdat_out.write("".join(section))
 
             # /// dihedrals entry ///
             if self.dihedrals:
-                lmpdat_out.write("Dihedrals\n")
-                lmpdat_out.write("\n")
                 longest_dih_key = len(str(len(self.dih_types)))
-
-                for cdih in self.dihedrals:
-                    lmpdat_out.write("{0:<8d} {1:>{width_2}d}      {2:>{width_3}d} {3:>{width_3}d} {4:>{width_3}d} {5:>{width_3}d}".format(
-                        cdih.dih_id, cdih.dih_key,
-                        cdih.atm_id1, cdih.atm_id2, cdih.atm_id3, cdih.atm_id4,
-                        width_2=longest_dih_key,
-                        width_3=longest_atm_id)
-                    )
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
-
+                dih_fmt = "{0:<8d} {1:>%dd}      {2:>%dd} {3:>%dd} {4:>%dd} {5:>%dd}\n" % (
+                    (longest_dih_key,) + 4*(longest_atm_id,))
+                section = ["Dihedrals\n", "\n"]
+                section.extend(dih_fmt.format(cdih.dih_id, cdih.dih_key,
+                                              cdih.atm_id1, cdih.atm_id2,
+                                              cdih.atm_id3, cdih.atm_id4)
+                               for cdih in self.dihedrals)
+                section.append("\n")
+                lmpdat_out.write("".join(section))
+
+            # /// impropers entry ///
             if self.impropers:
-                lmpdat_out.write("Impropers\n")
-                lmpdat_out.write("\n")
                 longest_imp_key = len(str(len(self.imp_types)))
-
-                for cimp in self.impropers:
-                    lmpdat_out.write("{0:<8d} {1:>{width_2}d}      {2:>{width_3}d}  {3:>{width_3}d} {4:>{width_3}d} {5:>{width_3}d}".format(
-                        cimp.imp_id,
-                        cimp.imp_key,
-                        cimp.atm_id1, cimp.atm_id2, cimp.atm_id3, cimp.atm_id4,
-                        width_2=longest_imp_key,
-                        width_3=longest_atm_id)
-                    )
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
+                imp_fmt = "{0:<8d} {1:>%dd}      {2:>%dd}  {3:>%dd} {4:>%dd} {5:>%dd}\n" % (
+                    (longest_imp_key,) + 4*(longest_atm_id,))
+                section = ["Impropers\n", "\n"]
+                section.extend(imp_fmt.format(cimp.imp_id, cimp.imp_key,
+                                              cimp.atm_id1, cimp.atm_id2,
+                                              cimp.atm_id3, cimp.atm_id4)
+                               for cimp in self.impropers)
+                section.append("\n")
+                lmpdat_out.write("".join(section))
 
             if self.ts_forces:
-                lmpdat_out.write("# Forces\n\n")
-
-                for cidx, catm in enumerate(self.atoms):
-                    lmpdat_out.write("# {0:<8d} {c[0]: >16.6f} {c[1]: >12.6f} {c[2]: >12.6f}".format(
-                        catm.atm_id,
-                        c=self.ts_forces[frame_id][cidx])
-                    )
-                    lmpdat_out.write("\n")
-                lmpdat_out.write("\n")
-
-    def import_dcd(self, dcd):
+                frc_fmt = "# {0:<8d} {c[0]: >16.6f} {c[1]: >12.6f} {c[2]: >12.6f}\n"
+                section = ["# Forces\n\n"]
+                section.extend(frc_fmt.format(catm.atm_id, c=self.ts_forces[frame_id][cidx])
+                               for cidx, catm in enumerate(self.atoms))
+                section.append("\n")
+                lmpdat_out.write("".join(section))
+
+    def import_dcd(self, *dcds):
         """
         Read and write the "DCD" binary trajectory file format used by LAMMPS.
         Other formats are not considered (yet).
@@ -1043,225 +1155,197 @@ class LmpStuff(mdu.Universe):
                     http://stackoverflow.com/questions/38297929/why-does-unpacking-a-struct-result-in-a-tuple
                     http://prody.csb.pitt.edu/_modules/prody/trajectory/dcdfile.html#codemodal
         Open DCD and read the remarks. This function must be called before
-        anything else that has to do anything with file reading.
+        anything else that has to do anything with file reading. The frames
+        are memory mapped (see ag_lmpdcd.DCDFile), i.e. each frame may be
+        accessed directly. Several dcds (pieces of the same run) are chained
+        to a single trajectory (see ag_lmpdcd.DCDChain). Lammps text dumps
+        are read as well (see ag_lmpdump.DumpFile).
         """
-        self._dcdfile = open(dcd, 'rb')
-        self._read_header()
-        self._read_title()
-        # get position in file (bytes?) after header and title
-        self._pos_1 = self._dcdfile.tell()
+        self._dcd = agldcd.open_dcds(*dcds)
+        self.nframes    = self._dcd.nframes
+        self.sframe     = self._dcd.sframe
+        self.step       = self._dcd.step
+        self.lframe     = self._dcd.lframe
+        self.natoms     = self._dcd.natoms
+        self.extra_blck = self._dcd.extra_blck
+        self.has_4dims  = self._dcd.has_4dims
+        self.is_charmm  = self._dcd.is_charmm
+        # index of the next frame for _read_frame
+        self._frame_ptr = 0
 
     def jump_to_first_frame(self):
         """
         Rewind to the first frame
         """
-        self._dcdfile.seek(self._pos_1)
-
-    def _read_header(self, debug=False):
-        """
-        Read header block.
-        """
-        self.extra_blck = None  # only if unit cell
-        self.has_4dims  = None  # purpose unknown
-        self.is_charmm  = False
-
-        # header block
-        hdr_blck = agldh.read_record(self._dcdfile)
-        hdr = struct.unpack('4c9if10i', hdr_blck)
-        self.nframes = hdr[4]  # total number of frames
-        self.sframe  = hdr[5]  # number of start frame
-        self.step    = hdr[6]  # number of frames between each frame
-        self.lframe  = hdr[7]  # number of last frame
-
-        # check charmm-formatting
-        if hdr[23] != 0:
-            self.is_charmm = True
-            self.extra_blck = hdr[14]
-            # some dcd files have 4 dimensions?
-            self.has_4dims = hdr[15]
-
-            if debug is True:
-                print("***Reading Charmm formatted DCD with 4 dimensions!***")
-
-    def _read_title(self, debug=False):
-        """
-        Read title blocks (only possible if header block was read before!)
-        """
-        # 2 title lines
-        title_1 = agldh.read_record(self._dcdfile)  # 1st title block
-        title_2 = agldh.read_record(self._dcdfile)  # 2nd title block
-        self.natoms, = struct.unpack("i", title_2)
-
-        if debug is True:
-            print("   Remark 1: {}\n   Remark 2: Number of Atoms: {}".format(
-                  title_1, self.natoms))
+        self._frame_ptr = 0
 
     def _read_frame(self):
         """
         Read one frame.
-        Layout of unitcell is [A, alpha, B, beta, gamma, C] (Historical reasons)
+        Layout of unitcell is [A, cos(gamma), B, cos(beta), cos(alpha), C]
+        (Historical reasons)
         """
-        # read cell information
+        x, y, z = self._dcd[self._frame_ptr].T
+        cur_cell = None
+
         if self.extra_blck:
-            cur_blck = agldh.read_record(self._dcdfile)
-            cur_cell = struct.unpack("6d", cur_blck)
-
-        # read coordinate-sets
-        x_coordset = agldh.read_record(self._dcdfile)
-        y_coordset = agldh.read_record(self._dcdfile)
-        z_coordset = agldh.read_record(self._dcdfile)
-        x = np.fromstring(x_coordset, dtype=np.dtype('f'), count=self.natoms)
-        y = np.fromstring(y_coordset, dtype=np.dtype('f'), count=self.natoms)
-        z = np.fromstring(z_coordset, dtype=np.dtype('f'), count=self.natoms)
-
-        # 4th dimension given? (has also to be read)
-        if self.has_4dims:
-            agldh.read_record(self._dcdfile)
-            #dims_4_blck = agldh.read_record(self._dcdfile)
-            #dunno = struct.unpack(str(self.natoms)+"i", dims_4_blck)
+            cur_cell = self._dcd.unitcells[self._frame_ptr]
 
+        self._frame_ptr += 1
         return(x, y, z, cur_cell)
 
     def _skip_frame(self):
-        if self.extra_blck:
-            agldh.read_record(self._dcdfile)
+        self._frame_ptr += 1
 
-        agldh.read_record(self._dcdfile)
-        agldh.read_record(self._dcdfile)
-        agldh.read_record(self._dcdfile)
+    def iter_frames(self, start=None, stop=None, step=None, atoms=None,
+                    dtype=np.float32):
+        """
+        Iterate over the frames of the dcd one by one (constant memory).
 
-        if self.has_4dims:
-            agldh.read_record(self._dcdfile)
+        Nothing is appended to ts_coords or ts_boxes; see
+        ag_lmpdcd.DCDFile.iter_frames for the parameters.
+        """
+        return self._dcd.iter_frames(start, stop, step, atoms, dtype)
 
-    def read_frames(self, frame=None, to_frame=-1, frame_by="index", debug=False):
+    def read_frames(self, frame=None, to_frame=-1, frame_by="index", dtype=None,
+                    frame_step=1, atoms=None, debug=False):
         """
+        Read frames of the dcd and append them to ts_coords and ts_boxes.
+
+        All frames are read into a single (frames, atoms, 3)-array, each
+        entry of ts_coords is a view of it. With dtype=np.float32 the
+        coordinates are kept in the precision of the dcd-file (half the
+        memory); analyses which need double precision convert the frames
+        they work on.
+
+        Only every frame_step-th frame and only the given atoms are read
+        from the file (e.g. the solvate of a solvated system); memory and
+        i/o scale with the selection. Note that ts_coords then no longer
+        correspond to all atoms of the universe.
+
+        dtype:      np.dtype or None; dtype of the coordinates (default: ts_dtype)
+        frame_step: int; read every frame_step-th frame between frame and to_frame
+        atoms:      list of ints or None; indices of the atoms to read (default: all)
+
         Sources:    https://github.com/MDAnalysis/mdanalysis/issues/187
         """
-        if debug:
-            print("***Verbose: MB already read: {:.2f} MiB".format(self._dcdfile.tell() / 1000000))
-
-        M_PI_2 = np.pi / 2
         # convert input to corresponding indices
         frm, to_frm = agldh.reshape_arguments(self.sframe, self.nframes,
                                               self.step, frame, to_frame,
                                               frame_by)
 
-        # preallocate memory for arrays to come
-        if to_frame is None:
-            num_frames = abs(frm - to_frm) - 1
-        else:
-            num_frames = abs(frm - to_frm)  # one frame is always read
-
         if debug is True:
-            print("***Info: Reading: Frame (start): {}, ToFrame (excluded): {}, NumFrames: {}".format(frm, to_frm, num_frames))
-
-        x_set, y_set, z_set = agldh.deploy_array(num_frames, self.natoms)
-        # fill arrays with coordinates
-        ptr = 0  # pointer to place data in right position of array
-
-        for frame_num in range(self.nframes):
-
-            if frm <= frame_num < to_frm:
-
-                # coords
-                x, y, z, cur_box = self._read_frame()
-                x_set[ptr] = x
-                y_set[ptr] = y
-                z_set[ptr] = z
-
-                # create box and append to other boxes of trajectory
-                #TODO: Check if angles are right this way with triclinic cell
-                alpha = np.radians(90.0 - np.arcsin(cur_box[4])*90.0/M_PI_2)  # cosAB
-                beta  = np.radians(90.0 - np.arcsin(cur_box[3])*90.0/M_PI_2)  # cosAC
-                gamma = np.radians(90.0 - np.arcsin(cur_box[1])*90.0/M_PI_2)  # cosBC
-                cur_box = mdb.Box(ltc_alpha=alpha,
-                                  ltc_beta=beta,
-                                  ltc_gamma=gamma,
-                                  ltc_a=cur_box[0],
-                                  ltc_b=cur_box[2],
-                                  ltc_c=cur_box[5],
-                                  boxtype="lattice")
-
-                # convert lattice-box-type to lammps-box-type
-                cur_box.box_lat2lmp()
-                self.ts_boxes.append(cur_box)
-
-                # get step numbers per frame so we can later access them if wanted
-                #self.ts_steps.append(frame_num*self.step+self.sframe)
-                ptr += 1
-            elif frame_num > to_frm:
-                break
-            else:
-                self._skip_frame()  # keep reading until first is reached
+            print("***Info: Reading: Frame (start): {}, ToFrame (excluded): {}, NumFrames: {}".format(frm, to_frm, to_frm - frm))
+
+        if dtype is None:
+            dtype = self.ts_dtype
 
-        # concatenate all arrays to (1,3)-arrays
-        coordinates = np.stack((x_set, y_set, z_set), axis=-1)
+        # frames are sliced from the memory mapped file into one buffer
+        frames = slice(frm, to_frm, frame_step)
+        natoms = self.natoms if atoms is None else len(atoms)
+        coordinates = agldh.deploy_array(len(range(self.nframes)[frames]), natoms, dtype)
+        self._dcd.read(frames, out=coordinates, atoms=atoms)
+
+        if self.extra_blck:
+            # all unit cells are converted at once (lattice -> lammps)
+            #TODO: Check if angles are right this way with triclinic cell
+            self.ts_boxes.extend(self._dcd.get_boxes(frames))
 
         # append coordinates to universe ts-coordinates
         for i in coordinates:
             self.ts_coords.append(i)
 
-    def append_dcds(self, *dcd_files, **read_frame_args):
+    def append_dcds(self, *dcd_files):
         """
-        Read and append another DCD to an existing one/s.
+        Read and append further DCDs (pieces of the same run) to the imported one/s.
         Only dcd may appended, if the number of atoms is the same!
 
+        All dcds are chained (see ag_lmpdcd.DCDChain); frames which were
+        already part of the dcds before (same step number) are skipped.
+
         dcds:   str; dcd file name(s) to append
-        read_frame_args: same as for method read_frames
         """
-        cur_num_atoms = self.natoms  # same atoms as in data
+        nframes_before = self.nframes
+        dcds = self._dcd.dcds + list(dcd_files)
+        self.close_dcd()
+        self.import_dcd(*dcds)
+        self.read_frames(frame=nframes_before, to_frame=-1)
 
-        for cur_dcd in dcd_files:
-            c_dcd = LmpStuff()
-            c_dcd.import_dcd(cur_dcd)
-
-            # check if number of atoms is the same as in data/previous dcd file
-            if cur_num_atoms != c_dcd.natoms:
-                raise RuntimeError("Different number of atoms in DCD-files!")
-
-            cur_num_atoms = c_dcd.natoms
-            # use same kwargs as for "append_dcds"
-            c_dcd.read_frames(**read_frame_args)
-            do_not_append = []
-
-            # find duplicate step-entries, save indices
-            for k, i in enumerate(c_dcd.ts_coords):
-                for j in self.ts_coords:
-                    if i == j:
-                        do_not_append.append(k)
-
-            # append ts-steps, ts-boxes and ts-coordinates to universe
-            for iidx, istp in enumerate(c_dcd.ts_coords):
-                if iidx not in do_not_append:
-                    self.ts_coords.append(istp)
-                    self.ts_boxes.append(c_dcd.ts_boxes[iidx])
-                    self.ts_coords.append(c_dcd.ts_coords[iidx])
+    def read_lmprst(self, lmprst, unwrap=False):
+        """
+        Append the coordinates and the box of a lammps restart-file to
+        ts_coords and ts_boxes (see ag_lmprst_helpers.LmpRestart). Atoms are
+        sorted by their id (as in read_lmpdat).
 
-            c_dcd.close_dcd()
+        unwrap:     boolean; unwrap the coordinates by the image flags
+        """
+        rst = aglrh.read_lmprst(lmprst)
+        self.ts_coords.append(rst.get_coords(unwrap))
+        self.ts_boxes.append(rst.get_box())
 
     def close_dcd(self, debug=False):
         """
         Close dcd-file if still open.
         """
-        if not self._dcdfile.closed:
-
-            if debug is True:
-                print("***Info: Closing file: {}.".format(self._dcdfile))
+        if debug is True:
+            print("***Info: Closing file(s): {}.".format(", ".join(self._dcd.dcds)))
 
-            self._dcdfile.close()
+        self._dcd.close()
 
-    def write_dcd(self, *frames):
+    def write_dcd(self, dcd_out, frame_ids=None, sframe=0, step=1, timestep=1.0,
+                  append=False):
         """
-        Write frames to DCD-file. TBD.
+        Write frames (ts_coords and ts_boxes) to a DCD-file.
+
+        Parameters
+        ----------
+        dcd_out : str
+            name of the dcd-file
+        frame_ids : list of ints or None
+            frames to write (default: all frames)
+        sframe, step : int
+            step number of the first frame and steps between two frames
+            (ignored when appending)
+        timestep : float
+            time of a single step
+        append : bool
+            append the frames to an existing dcd-file
+
         """
-        pass
+        if frame_ids is None:
+            frame_ids = list(range(len(self.ts_coords)))
+
+        coords = np.array([self.ts_coords[i] for i in frame_ids], dtype=np.float32)
+        unitcells = None
+
+        if self.ts_boxes != []:
+            unitcells = []
+
+            for frame_id in frame_ids:
+                tmp_copy_box = copy.copy(self.ts_boxes[frame_id])
+
+                if tmp_copy_box.boxtype == "lammps":
+                    tmp_copy_box.box_lmp2lat()
+                elif tmp_copy_box.boxtype == "cartesian":
+                    tmp_copy_box.box_cart2lat()
+
+                unitcells.append(agldh.lattice_to_unitcell(tmp_copy_box.ltc_a,
+                                                           tmp_copy_box.ltc_b,
+                                                           tmp_copy_box.ltc_c,
+                                                           tmp_copy_box.ltc_alpha,
+                                                           tmp_copy_box.ltc_beta,
+                                                           tmp_copy_box.ltc_gamma))
+
+        agldcd.write_dcd(dcd_out, coords, unitcells, append=append,
+                         sframe=sframe, step=step, timestep=timestep)
 
 
 ################################################################################
 # Shortcut functions for common procedures
 ################################################################################
 
-def read_lmpdat(lmpdat=None, dcd=None, frame_idx_start=-1, frame_idx_stop=-1):
+def read_lmpdat(lmpdat=None, dcd=None, frame_idx_start=-1, frame_idx_stop=-1,
+                sections=None):
     """
     Read a lammps data file and optionally a dcd file on top.
 
@@ -1281,6 +1365,10 @@ def read_lmpdat(lmpdat=None, dcd=None, frame_idx_start=-1, frame_idx_stop=-1):
     frame_idx : int (default: -1)
         Index of the frame to use from the dcd file.
 
+    sections : list of str (optional)
+        Sections of the lammps data file to read (see LmpStuff.read_lmpdat),
+        e.g. [] for the header only or ["Atoms"] for the coordinates.
+
     Returns
     -------
     md_sys : LmpStuff object
@@ -1291,7 +1379,7 @@ def read_lmpdat(lmpdat=None, dcd=None, frame_idx_start=-1, frame_idx_stop=-1):
     md_sys = LmpStuff()
 
     if lmpdat is not None:
-        md_sys.read_lmpdat(lmpdat)
+        md_sys.read_lmpdat(lmpdat, sections=sections)
 
     if dcd is not None:
         md_sys.import_dcd(dcd)
@@ -0,0 +1,469 @@
+"""
+Compact archive of finished trajectories (e.g. the dcd-pieces of each
+Kawska-Zahn cycle).
+
+Coordinates are quantized to a fixed precision (default: 0.001 angstrom),
+stored as integers relative to the previous frame (first frame of each
+chunk is absolute) and each chunk of frames is compressed with zlib. Boxes
+(dcd unit cells) and step numbers are kept without loss. Chunks are sized by
+the number of atoms, i.e. a decoded chunk takes about CHUNK_BYTES of memory
+for small and for large systems alike.
+
+Layout of an archive-file
+-------------------------
+    MAGIC                   8 bytes
+    chunk 0, 1, ...         zlib-compressed int32-arrays (frames, atoms, 3)
+    index                   zlib-compressed npz with the meta data, steps,
+                            unit cells and offsets/sizes of all chunks
+    offset of the index     int64
+
+Each chunk is read and decompressed on its own, i.e. frames can be
+accessed randomly (see TrajectoryArchive, same interface as
+ag_lmpdcd.DCDFile). ag_lmpdcd.open_dcds opens archives as well, so
+everything which works with dcd-files (e.g. LmpStuff.import_dcd or
+ag_frame_analysis) works with archives.
+
+Examples
+--------
+
+Archive the pieces of a cycle (duplicate frames at the seams are skipped)
+-----------------------------------------------------------------------
+dcd_to_archive("cycle_1.trjz", "quench.dcd", "anneal.dcd", "requench.dcd")
+
+Stream the frames
+-----------------
+archive = TrajectoryArchive("cycle_1.trjz")
+for coords, box in archive.iter_frames(step=10):
+    pass
+
+Convert back
+------------
+archive_to_dcd("cycle_1.trjz", "cycle_1.dcd")
+
+"""
+
+import io
+import os
+import struct
+import zlib
+import numpy as np
+import md_box as mdb
+import ag_lmpdcd_helpers as agldh
+
+MAGIC = b"AGTRJZ01"
+CHUNK_BYTES = 16 * 1024**2
+PRECISION = 0.001
+
+
+def chunk_frames(natoms, chunk_bytes=CHUNK_BYTES):
+    """
+    Number of frames of a chunk with (about) chunk_bytes of quantized coordinates.
+    """
+    return max(1, chunk_bytes // (max(natoms, 1) * 3 * 4))
+
+
+def is_archive(file_name):
+    """
+    Check if a file is a trajectory archive (by its first bytes).
+    """
+    with open(file_name, "rb") as file_in:
+        return file_in.read(len(MAGIC)) == MAGIC
+
+
+class ArchiveWriter(object):
+    """
+    Write frames to an archive-file chunk by chunk.
+
+    Frames are buffered until a chunk is complete, i.e. memory does not
+    grow with the number of frames. The index is written when the file is
+    closed.
+    """
+    def __init__(self, archive, natoms, sframe=0, step=1, timestep=1.0,
+                 has_unitcells=True, title="Created by ag_lmparchive",
+                 precision=PRECISION, chunk_size=None, level=6):
+        """
+        Parameters
+        ----------
+        archive : str
+            name of the archive-file
+        natoms : int
+            number of atoms of each frame
+        sframe, step : int
+            step number of the first frame and steps between two frames
+            (used if no steps are given to write_frames)
+        timestep : float
+            time of a single step
+        has_unitcells : bool
+            store a unit cell for each frame
+        title : str
+            title of the trajectory
+        precision : float
+            coordinates are rounded to multiples of precision (angstrom)
+        chunk_size : int or None
+            number of frames which are compressed together (default: as many
+            frames as fit into CHUNK_BYTES, see chunk_frames)
+        level : int
+            zlib compression level (1: fastest, 9: smallest)
+
+        """
+        self.archive = archive
+        self.natoms = natoms
+        self.sframe = sframe
+        self.step = step
+        self.timestep = timestep
+        self.has_unitcells = has_unitcells
+        self.title = title
+        self.precision = precision
+        self.chunk_size = chunk_frames(natoms) if chunk_size is None else chunk_size
+        self.level = level
+
+        self.nframes = 0
+        self._steps = []
+        self._unitcells = []
+        self._chunk_offsets = []
+        self._chunk_sizes = []
+        self._pending = []
+
+        self._archive_out = open(archive, "wb")
+        self._archive_out.write(MAGIC)
+
+    def write_frames(self, coords, unitcells=None, steps=None):
+        """
+        Add frames to the archive.
+
+        Parameters
+        ----------
+        coords : np.array
+            (natoms, 3)- or (n, natoms, 3)-array of cartesian coordinates
+        unitcells : np.array or None
+            (6)- or (n, 6)-array of unit cells (see ag_lmpdcd.DCDWriter)
+        steps : array of ints or None
+            step number of each frame (default: continue with step)
+
+        """
+        coords = np.asarray(coords).reshape(-1, self.natoms, 3)
+
+        if self.has_unitcells:
+            if unitcells is None:
+                raise RuntimeError("Unit cells needed for {}!".format(self.archive))
+
+            self._unitcells.append(np.asarray(unitcells, dtype=np.float64).reshape(-1, 6))
+
+        if steps is None:
+            steps = self.sframe + (self.nframes + np.arange(len(coords))) * self.step
+
+        self._steps.append(np.asarray(steps, dtype=np.int64).reshape(-1))
+        self.nframes += len(coords)
+
+        # quantize right away, the float coordinates are not kept
+        quantized = np.rint(coords.astype(np.float64) / self.precision).astype(np.int32)
+        self._pending.append(quantized)
+        npending = sum(len(i) for i in self._pending)
+
+        while npending >= self.chunk_size:
+            pending = np.concatenate(self._pending)
+            self._write_chunk(pending[:self.chunk_size])
+            self._pending = [pending[self.chunk_size:]]
+            npending -= self.chunk_size
+
+    def _write_chunk(self, quantized):
+        """
+        Delta-encode and compress a chunk of quantized frames.
+        """
+        deltas = quantized.copy()
+        deltas[1:] -= quantized[:-1]
+        data = zlib.compress(deltas.astype("<i4").tobytes(), self.level)
+        self._chunk_offsets.append(self._archive_out.tell())
+        self._chunk_sizes.append(len(quantized))
+        self._archive_out.write(data)
+
+    def close(self):
+        """
+        Write the remaining frames and the index and close the file.
+        """
+        if self._archive_out.closed:
+            return
+
+        pending = [i for i in self._pending if len(i) > 0]
+
+        if len(pending) > 0:
+            self._write_chunk(np.concatenate(pending))
+
+        self._pending = []
+        index = dict(
+            natoms=self.natoms,
+            precision=self.precision,
+            timestep=self.timestep,
+            title=self.title,
+            steps=np.concatenate(self._steps) if self._steps else np.zeros(0, np.int64),
+            chunk_offsets=np.array(self._chunk_offsets, dtype=np.int64),
+            chunk_sizes=np.array(self._chunk_sizes, dtype=np.int64),
+        )
+
+        if self.has_unitcells:
+            index["unitcells"] = (np.concatenate(self._unitcells) if self._unitcells
+                                  else np.zeros((0, 6)))
+
+        index_bytes = io.BytesIO()
+        np.savez(index_bytes, **index)
+        index_offset = self._archive_out.tell()
+        self._archive_out.write(zlib.compress(index_bytes.getvalue(), self.level))
+        self._archive_out.write(struct.pack("<q", index_offset))
+        self._archive_out.close()
+
+
+class TrajectoryArchive(object):
+    """
+    Random access to the frames of an archive-file (see ArchiveWriter).
+
+    Same interface as ag_lmpdcd.DCDFile. Only the chunks of the requested
+    frames are decompressed; the last decompressed and the last decoded chunk
+    are kept so iterating over the frames decompresses each chunk only once.
+    If only some atoms are read, only their deltas are decoded.
+    """
+    def __init__(self, archive):
+        """
+        Read the index of the archive.
+        """
+        self.dcd = archive
+        self.dcds = [archive]
+        self._archive_in = open(archive, "rb")
+
+        if self._archive_in.read(len(MAGIC)) != MAGIC:
+            raise IOError("{} is not a trajectory archive!".format(archive))
+
+        self._archive_in.seek(-8, os.SEEK_END)
+        self._index_offset, = struct.unpack("<q", self._archive_in.read(8))
+        self._archive_in.seek(self._index_offset)
+        index_size = os.path.getsize(archive) - 8 - self._index_offset
+        index = np.load(io.BytesIO(zlib.decompress(self._archive_in.read(index_size))))
+
+        self.natoms = int(index["natoms"])
+        self.precision = float(index["precision"])
+        self.timestep = float(index["timestep"])
+        self.title = [str(index["title"])]
+        self.steps = index["steps"]
+        self._unitcells = index["unitcells"] if "unitcells" in index.files else None
+        self._chunk_offsets = index["chunk_offsets"]
+        self._chunk_sizes = index["chunk_sizes"]
+        # first frame of each chunk
+        self._chunk_starts = np.concatenate(([0], np.cumsum(self._chunk_sizes)))
+        self._cached_deltas = (None, None)
+        self._cached_chunk = (None, None, None)
+
+        # same attributes as DCDFile
+        self.nframes = len(self.steps)
+        self.sframe = int(self.steps[0]) if self.nframes > 0 else 0
+        self.step = int(self.steps[1] - self.steps[0]) if self.nframes > 1 else 1
+        self.lframe = int(self.steps[-1]) if self.nframes > 0 else 0
+        self.extra_blck = int(self._unitcells is not None)
+        self.has_4dims = 0
+        self.is_charmm = True
+
+    def __len__(self):
+        return self.nframes
+
+    @property
+    def unitcells(self):
+        """
+        Unit cells of all frames, (nframes, 6)-array (None if the archive
+        has no unit cells).
+        """
+        return self._unitcells
+
+    def _deltas(self, chunk_idx):
+        """
+        Decompress a chunk to its (frames, atoms, 3)-array of int32-deltas.
+        """
+        if self._cached_deltas[0] == chunk_idx:
+            return self._cached_deltas[1]
+
+        if chunk_idx + 1 < len(self._chunk_offsets):
+            end = self._chunk_offsets[chunk_idx + 1]
+        else:
+            end = self._index_offset
+
+        self._archive_in.seek(self._chunk_offsets[chunk_idx])
+        data = zlib.decompress(self._archive_in.read(end - self._chunk_offsets[chunk_idx]))
+        deltas = np.frombuffer(data, dtype="<i4").reshape(-1, self.natoms, 3)
+        self._cached_deltas = (chunk_idx, deltas)
+        return deltas
+
+    def _chunk(self, chunk_idx, atoms=None):
+        """
+        Decode a chunk (or only some atoms of it) to quantized (absolute)
+        coordinates.
+        """
+        atoms_key = None if atoms is None else np.asarray(atoms).tobytes()
+
+        if self._cached_chunk[:2] == (chunk_idx, atoms_key):
+            return self._cached_chunk[2]
+
+        deltas = self._deltas(chunk_idx)
+
+        if atoms is not None:
+            deltas = deltas[:, atoms]
+
+        # int32 sums are exact, the quantized coordinates are int32 as well
+        quantized = np.cumsum(deltas, axis=0, dtype=np.int32)
+        self._cached_chunk = (chunk_idx, atoms_key, quantized)
+        return quantized
+
+    def read(self, key=slice(None), dtype=np.float32, out=None, atoms=None):
+        """
+        Get the coordinates of one or several frames (see ag_lmpdcd.DCDFile.read).
+        """
+        frame_idxs = np.arange(self.nframes)[key]
+        single = np.ndim(frame_idxs) == 0
+        frame_idxs = np.atleast_1d(frame_idxs)
+        natoms = self.natoms if atoms is None else len(atoms)
+
+        if out is None:
+            out = np.empty((len(frame_idxs), natoms, 3), dtype=dtype)
+        elif single:
+            out = out[np.newaxis]
+
+        chunk_idxs = np.searchsorted(self._chunk_starts, frame_idxs, side="right") - 1
+
+        for chunk_idx in np.unique(chunk_idxs):
+            out_idxs = np.flatnonzero(chunk_idxs == chunk_idx)
+            chunk_frame_idxs = frame_idxs[out_idxs] - self._chunk_starts[chunk_idx]
+            quantized = self._chunk(chunk_idx, atoms)[chunk_frame_idxs]
+            out[out_idxs] = quantized * self.precision
+
+        if single:
+            return out[0]
+
+        return out
+
+    def __getitem__(self, key):
+        """
+        Get the coordinates of one or several frames (see read).
+        """
+        return self.read(key)
+
+    def get_box(self, frame_idx):
+        """
+        Get the box (lattice box-type) of a frame (None if there are no unit cells).
+        """
+        if self._unitcells is None:
+            return None
+
+        a, b, c, alpha, beta, gamma = agldh.unitcell_to_lattice(self._unitcells[frame_idx])
+        return mdb.Box(ltc_a=a, ltc_b=b, ltc_c=c, ltc_alpha=alpha,
+                       ltc_beta=beta, ltc_gamma=gamma, boxtype="lattice")
+
+    def get_boxes(self, key=slice(None)):
+        """
+        Get the boxes of several frames at once (see ag_lmpdcd.DCDFile.get_boxes).
+        """
+        if self._unitcells is None:
+            return None
+
+        return mdb.BoxSeries(*agldh.unitcell_to_lattice(self._unitcells[key]))
+
+    def iter_frames(self, start=None, stop=None, step=None, atoms=None,
+                    dtype=np.float32):
+        """
+        Iterate over the frames one by one (see ag_lmpdcd.DCDFile.iter_frames).
+        """
+        frame_idxs = range(self.nframes)[slice(start, stop, step)]
+        natoms = self.natoms if atoms is None else len(atoms)
+        coords = np.empty((natoms, 3), dtype=dtype)
+
+        for frame_idx in frame_idxs:
+            self.read(frame_idx, out=coords, atoms=atoms)
+            yield (coords, self.get_box(frame_idx))
+
+    def get_steps(self):
+        """
+        Step number of each frame.
+        """
+        return self.steps
+
+    def close(self):
+        """
+        Close the archive-file.
+        """
+        self._archive_in.close()
+        self._cached_deltas = (None, None)
+        self._cached_chunk = (None, None, None)
+
+
+def dcd_to_archive(archive, *dcds, **writer_args):
+    """
+    Archive one or several dcd-files (pieces are chained, see ag_lmpdcd.DCDChain).
+
+    Parameters
+    ----------
+    archive : str
+        name of the archive-file
+    dcds : str
+        names of the dcd-files
+    writer_args
+        precision, chunk_size and level (see ArchiveWriter)
+
+    """
+    import ag_lmpdcd as agldcd
+
+    trajectory = agldcd.open_dcds(*dcds)
+    title = trajectory.title[0] if getattr(trajectory, "title", None) else "Created by ag_lmparchive"
+    archive_out = ArchiveWriter(archive, trajectory.natoms,
+                                timestep=trajectory.timestep,
+                                has_unitcells=bool(trajectory.extra_blck),
+                                title=title, **writer_args)
+    steps = trajectory.get_steps()
+
+    # a chunk at a time keeps the memory constant
+    for start in range(0, trajectory.nframes, archive_out.chunk_size):
+        frames = slice(start, start + archive_out.chunk_size)
+        unitcells = None
+
+        if trajectory.extra_blck:
+            unitcells = trajectory.unitcells[frames]
+
+        archive_out.write_frames(trajectory[frames], unitcells, steps[frames])
+
+    archive_out.close()
+    trajectory.close()
+
+
+def archive_to_dcd(archive, dcd, start=None, stop=None, step=None):
+    """
+    Write (some of) the frames of an archive to a dcd-file.
+
+    Parameters
+    ----------
+    archive : str
+        name of the archive-file
+    dcd : str
+        name of the dcd-file
+    start, stop, step : int or None
+        frames to write (same as slicing)
+
+    """
+    import ag_lmpdcd as agldcd
+
+    trajectory = TrajectoryArchive(archive)
+    frame_idxs = np.arange(trajectory.nframes)[slice(start, stop, step)]
+    steps = trajectory.get_steps()[frame_idxs]
+    dcd_step = int(steps[1] - steps[0]) if len(steps) > 1 else trajectory.step
+    dcd_out = agldcd.DCDWriter(dcd, trajectory.natoms,
+                               sframe=int(steps[0]) if len(steps) > 0 else 0,
+                               step=dcd_step, timestep=trajectory.timestep,
+                               has_unitcells=bool(trajectory.extra_blck),
+                               title=trajectory.title[0])
+
+    chunk_size = chunk_frames(trajectory.natoms)
+
+    for chunk_start in range(0, len(frame_idxs), chunk_size):
+        frames = frame_idxs[chunk_start:chunk_start + chunk_size]
+        unitcells = None
+
+        if trajectory.extra_blck:
+            unitcells = trajectory.unitcells[frames]
+
+        dcd_out.write_frames(trajectory[frames], unitcells)
+
+    dcd_out.close()
+    trajectory.close()
@@ -0,0 +1,251 @@
+"""
+Exchange coordinates, boxes and thermodynamic data between a Universe and a
+running lammps instance without writing intermediate files.
+
+Per-atom data is moved by the gather/scatter functions of the lammps library
+interface (lammps.gather_atoms, lammps.scatter_atoms), the ctypes arrays are
+wrapped by numpy views and not copied element by element. Gathered arrays are
+ordered by atom id, i.e. in the order of Universe.atoms after read_lmpdat
+(atom ids have to be consecutive, see 'atom_modify map' in lammps).
+
+The lammps instance is only used by the methods command, get_natoms,
+extract_box, extract_global, reset_box, gather_atoms, scatter_atoms,
+create_atoms and get_thermo, any object providing these methods (e.g. the
+mock object of test_ag_lmpbridge) can be used instead.
+
+Examples
+--------
+
+Minimize a prepared system and continue with the minimized coordinates
+----------------------------------------------------------------------
+lmp = lammps()
+lmp.file(lmpcuts.settings_file)
+lmp.command("read_data {}".format(lmpdat))
+push_universe(lmp, solvate_sys)  # e.g. coordinates from sysprep
+lmp.command("minimize 1e-6 1e-8 1000 10000")
+pull_universe(lmp, solvate_sys, unwrap=True)
+thermo = get_thermo(lmp, ["pe", "press", "vol"])
+
+"""
+import copy
+import ctypes
+import numpy as np
+import md_box as mdb
+import ag_lmprst_helpers as aglrh
+
+# data types of gather_atoms and scatter_atoms
+LAMMPS_INT = 0
+LAMMPS_DOUBLE = 1
+
+# tilt factors below are treated as zero (e.g. of lattice boxes with right angles)
+TILT_TOLERANCE = 1e-8
+
+
+def gather_atoms(lmp, name, dtype=LAMMPS_DOUBLE, count=3):
+    """
+    Gather a per-atom property of all atoms ordered by atom id.
+
+    Parameters
+    ----------
+    lmp : lammps.lammps
+        lammps instance
+    name : str
+        name of the property (e.g. 'x', 'v', 'f', 'image', 'type', 'q')
+    dtype : int
+        LAMMPS_INT or LAMMPS_DOUBLE
+    count : int
+        number of values per atom (e.g. 3 for x, 1 for type)
+
+    Returns
+    -------
+    values : numpy.ndarray
+        (natoms, count)-array (or (natoms,) if count is 1), view of the
+        gathered ctypes array
+
+    """
+    values = np.ctypeslib.as_array(lmp.gather_atoms(name, dtype, count))
+
+    if count > 1:
+        values = values.reshape(-1, count)
+
+    return values
+
+
+def scatter_atoms(lmp, name, values, dtype=LAMMPS_DOUBLE):
+    """
+    Scatter a per-atom property to all atoms ordered by atom id.
+
+    Parameters
+    ----------
+    lmp : lammps.lammps
+        lammps instance
+    name : str
+        name of the property (e.g. 'x', 'v', 'image', 'type', 'q')
+    values : numpy.ndarray
+        (natoms, count)- or (natoms,)-array
+    dtype : int
+        LAMMPS_INT or LAMMPS_DOUBLE
+
+    """
+    ctype = ctypes.c_int if dtype == LAMMPS_INT else ctypes.c_double
+    values = np.ascontiguousarray(values, dtype=ctype)
+    count = 1 if values.ndim == 1 else values.shape[1]
+
+    if len(values) != lmp.get_natoms():
+        raise ValueError("{} values given for {} atoms in lammps!".format(
+            len(values), lmp.get_natoms()))
+
+    lmp.scatter_atoms(name, dtype, count, np.ctypeslib.as_ctypes(values.ravel()))
+
+
+def get_lammps_box(lmp):
+    """
+    Current box of the lammps instance (boxtype 'lammps').
+    """
+    boxlo, boxhi, xy, yz, xz = lmp.extract_box()[:5]
+    return mdb.Box(boxtype="lammps",
+                   lmp_xlo=boxlo[0], lmp_xhi=boxhi[0],
+                   lmp_ylo=boxlo[1], lmp_yhi=boxhi[1],
+                   lmp_zlo=boxlo[2], lmp_zhi=boxhi[2],
+                   lmp_xy=xy, lmp_xz=xz, lmp_yz=yz)
+
+
+def set_lammps_box(lmp, box):
+    """
+    Change the box of the lammps instance.
+
+    Lattice and cartesian boxes are converted (the box given is not changed).
+    The box is reset if lammps holds no atoms, otherwise it is changed by
+    change_box (atoms are not remapped).
+
+    Raises
+    ------
+    ValueError
+        if the box has tilt factors but the box of lammps is orthogonal
+        (see 'change_box all triclinic' in lammps)
+
+    """
+    if box.boxtype == "lattice":
+        box = copy.deepcopy(box)
+        box.box_lat2lmp()
+    elif box.boxtype == "cartesian":
+        box = copy.deepcopy(box)
+        box.box_cart2lmp()
+
+    tilts = (box.lmp_xy or 0.0, box.lmp_xz or 0.0, box.lmp_yz or 0.0)
+    triclinic = bool(lmp.extract_global("triclinic", LAMMPS_INT))
+
+    if not triclinic:
+        if any(abs(tilt) > TILT_TOLERANCE for tilt in tilts):
+            raise ValueError("Box has tilt factors (xy, xz, yz) {} but the box of "
+                             "lammps is orthogonal!".format(tilts))
+
+        tilts = (0.0, 0.0, 0.0)
+
+    if lmp.get_natoms() == 0:
+        lmp.reset_box([box.lmp_xlo, box.lmp_ylo, box.lmp_zlo],
+                      [box.lmp_xhi, box.lmp_yhi, box.lmp_zhi],
+                      tilts[0], tilts[2], tilts[1])
+        return
+
+    change_box = ["change_box all"]
+    change_box.append("x final {:.17g} {:.17g}".format(box.lmp_xlo, box.lmp_xhi))
+    change_box.append("y final {:.17g} {:.17g}".format(box.lmp_ylo, box.lmp_yhi))
+    change_box.append("z final {:.17g} {:.17g}".format(box.lmp_zlo, box.lmp_zhi))
+
+    if triclinic:
+        change_box.append("xy final {:.17g} xz final {:.17g} yz final {:.17g}".format(*tilts))
+
+    change_box.append("units box")
+    lmp.command(" ".join(change_box))
+
+
+def gather_coords(lmp, unwrap=False):
+    """
+    Coordinates of all atoms, unwrapped by their image flags if wanted.
+    """
+    coords = gather_atoms(lmp, "x", LAMMPS_DOUBLE, 3)
+
+    if unwrap is False:
+        return coords.copy()
+
+    images = aglrh.decode_images(gather_atoms(lmp, "image", LAMMPS_INT, 1))
+    boxlo, boxhi, xy, yz, xz = lmp.extract_box()[:5]
+    h = np.array([[boxhi[0] - boxlo[0], 0.0, 0.0],
+                  [xy, boxhi[1] - boxlo[1], 0.0],
+                  [xz, yz, boxhi[2] - boxlo[2]]])
+    return coords + images.dot(h)
+
+
+def get_thermo(lmp, keywords):
+    """
+    Current values of thermo keywords (e.g. 'pe', 'temp', 'press', 'vol').
+
+    Returns
+    -------
+    thermo : dict
+        value of each keyword
+
+    """
+    return {keyword: lmp.get_thermo(keyword) for keyword in keywords}
+
+
+def push_universe(lmp, universe, frame_id=-1, velocities=None):
+    """
+    Put the coordinates and the box of a frame into the lammps instance.
+
+    If lammps holds the same number of atoms (e.g. after read_data or
+    read_restart of the same system), the coordinates (and velocities) are
+    scattered to the atoms and the image flags are reset. If lammps holds no
+    atoms yet (e.g. after create_box), the atoms are created by their atom
+    types (atm_key) instead, which is only sensible for systems without
+    topology.
+
+    Parameters
+    ----------
+    lmp : lammps.lammps
+        lammps instance
+    universe : md_universe.Universe
+        system with atoms, ts_coords and ts_boxes
+    frame_id : int
+        frame of ts_coords and ts_boxes to use
+    velocities : None or numpy.ndarray
+        (natoms, 3)-array with the velocities of the atoms
+
+    """
+    coords = np.asarray(universe.ts_coords[frame_id], dtype=np.float64)[:, :3]
+    natoms = lmp.get_natoms()
+
+    if universe.ts_boxes:
+        set_lammps_box(lmp, universe.ts_boxes[frame_id])
+
+    if natoms == 0:
+        atm_types = [int(atom.atm_key) for atom in universe.atoms]
+        ncreated = lmp.create_atoms(len(coords), None, atm_types, coords.ravel(),
+                                    None if velocities is None else np.ravel(velocities))
+
+        if ncreated != len(coords):
+            raise ValueError("lammps created {} of {} atoms!".format(
+                ncreated, len(coords)))
+    elif natoms == len(coords):
+        scatter_atoms(lmp, "x", coords)
+        scatter_atoms(lmp, "image", aglrh.encode_images(np.zeros((natoms, 3))),
+                      LAMMPS_INT)
+
+        if velocities is not None:
+            scatter_atoms(lmp, "v", velocities)
+    else:
+        raise ValueError("Universe has {} atoms, lammps {}!".format(
+            len(coords), natoms))
+
+
+def pull_universe(lmp, universe, unwrap=False):
+    """
+    Append the current coordinates and box of lammps to ts_coords and ts_boxes.
+    """
+    if universe.atoms and len(universe.atoms) != lmp.get_natoms():
+        raise ValueError("Universe has {} atoms, lammps {}!".format(
+            len(universe.atoms), lmp.get_natoms()))
+
+    universe.ts_coords.append(gather_coords(lmp, unwrap).astype(universe.ts_dtype))
+    universe.ts_boxes.append(get_lammps_box(lmp))
@@ -0,0 +1,806 @@
+
+import os
+import struct
+import threading
+import time
+import numpy as np
+import md_box as mdb
+import ag_lmpdcd_helpers as agldh
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2
+
+
+def frame_dtype(natoms, has_unitcells, has_4dims=False):
+    """
+    Layout of one frame (each record is framed by its length in bytes).
+    """
+    fields = []
+
+    if has_unitcells:
+        fields += [("cell_head", "i4"), ("unitcell", "f8", 6), ("cell_tail", "i4")]
+
+    for dim in ("x", "y", "z"):
+        fields += [(dim + "_head", "i4"), (dim, "f4", natoms), (dim + "_tail", "i4")]
+
+    if has_4dims:
+        fields += [("w_head", "i4"), ("w", "f4", natoms), ("w_tail", "i4")]
+
+    return np.dtype(fields)
+
+
+def _select(dim, key, atoms=None):
+    """
+    Select frames and atoms of a (nframes, natoms)-array of one dimension.
+    """
+    if atoms is None:
+        return dim[key]
+
+    # only the atoms of the selected frames are gathered
+    if isinstance(key, slice) or np.ndim(key) == 0:
+        return dim[key][..., atoms]
+
+    return dim[np.asarray(key)[:, np.newaxis], atoms]
+
+
+class DCDFile(object):
+    """
+    Random access to the frames of a DCD-file (CHARMM/LAMMPS flavor).
+
+    After the header all frames have the same size in bytes, so the file is
+    mapped into memory (np.memmap) as an array of frame records. Reading a
+    frame does not read the ones before and the coordinates (x, y, z) and
+    unit cells are available as views into the file without any copy.
+
+    Sources:    http://www.ks.uiuc.edu/Research/vmd/plugins/molfile/dcdplugin.html
+                http://prody.csb.pitt.edu/_modules/prody/trajectory/dcdfile.html#codemodal
+    """
+    def __init__(self, dcd, debug=False):
+        """
+        Read the header and title of the DCD and map all frames.
+
+        Parameters
+        ----------
+        dcd : str
+            name of the dcd-file
+        debug : bool
+            print further information
+
+        """
+        self.dcd = dcd
+        self.dcds = [dcd]
+        self.extra_blck = None  # only if unit cell
+        self.has_4dims  = None  # purpose unknown
+        self.is_charmm  = False
+
+        with open(dcd, "rb") as dcd_in:
+            self._read_header(dcd_in, debug)
+            self._read_title(dcd_in, debug)
+            # position in file (bytes) after header and title
+            self.header_size = dcd_in.tell()
+
+        self.frame_dtype = frame_dtype(self.natoms, self.extra_blck, self.has_4dims)
+
+        # number of frames by file size (header may be outdated if the
+        # simulation crashed)
+        nframes = (os.path.getsize(dcd) - self.header_size) // self.frame_dtype.itemsize
+
+        if nframes != self.nframes:
+            print("***Warning: Header of {} says {} frames, found {}.".format(
+                dcd, self.nframes, nframes))
+            self.nframes = nframes
+
+        # empty maps are not possible
+        if self.nframes == 0:
+            self._frames = np.zeros(0, dtype=self.frame_dtype)
+        else:
+            self._frames = np.memmap(dcd, dtype=self.frame_dtype, mode="r",
+                                     offset=self.header_size, shape=(self.nframes,))
+
+    def _read_header(self, dcd_in, debug=False):
+        """
+        Read header block.
+        """
+        hdr_blck = agldh.read_record(dcd_in)
+        hdr = struct.unpack('4c9if10i', hdr_blck)
+        self.nframes  = hdr[4]  # total number of frames
+        self.sframe   = hdr[5]  # number of start frame
+        self.step     = hdr[6]  # number of frames between each frame
+        self.lframe   = hdr[7]  # number of last frame
+        self.timestep = hdr[13]
+
+        # check charmm-formatting
+        if hdr[23] != 0:
+            self.is_charmm = True
+            self.extra_blck = hdr[14]
+            # some dcd files have 4 dimensions?
+            self.has_4dims = hdr[15]
+
+            if debug is True:
+                print("***Reading Charmm formatted DCD with 4 dimensions!***")
+
+    def _read_title(self, dcd_in, debug=False):
+        """
+        Read title blocks (only possible if header block was read before!)
+        """
+        title_1 = agldh.read_record(dcd_in)  # 1st title block
+        title_2 = agldh.read_record(dcd_in)  # 2nd title block
+        self.natoms, = struct.unpack("i", title_2)
+
+        # each title line has 80 characters
+        ntitle, = struct.unpack("i", title_1[:4])
+        self.title = [title_1[4 + 80*i:4 + 80*(i+1)].decode("ascii", "replace").rstrip()
+                      for i in range(ntitle)]
+
+        if debug is True:
+            print("   Remark 1: {}\n   Remark 2: Number of Atoms: {}".format(
+                  title_1, self.natoms))
+
+    def __len__(self):
+        return self.nframes
+
+    @property
+    def x(self):
+        """
+        x-coordinates of all frames, (nframes, natoms)-view into the file.
+        """
+        return self._frames["x"]
+
+    @property
+    def y(self):
+        """
+        y-coordinates of all frames, (nframes, natoms)-view into the file.
+        """
+        return self._frames["y"]
+
+    @property
+    def z(self):
+        """
+        z-coordinates of all frames, (nframes, natoms)-view into the file.
+        """
+        return self._frames["z"]
+
+    @property
+    def coords(self):
+        """
+        Coordinates of all frames, (nframes, natoms, 3)-view into the file
+        (read-only).
+
+        x, y and z of a frame are stored one after another with a fixed
+        distance in bytes, i.e. they can be strided like a third dimension.
+        """
+        x = self._frames["x"]
+        dim_stride = self.frame_dtype.fields["y"][1] - self.frame_dtype.fields["x"][1]
+        return np.lib.stride_tricks.as_strided(x, shape=x.shape + (3,),
+                                               strides=x.strides + (dim_stride,),
+                                               writeable=False)
+
+    @property
+    def unitcells(self):
+        """
+        Unit cells of all frames, (nframes, 6)-view into the file (None if
+        the dcd has no unit cells).
+
+        Layout of each unit cell is [A, cos(gamma), B, cos(beta), cos(alpha), C]
+        (historical reasons).
+        """
+        if not self.extra_blck:
+            return None
+
+        return self._frames["unitcell"]
+
+    def read(self, key=slice(None), dtype=np.float32, out=None, atoms=None):
+        """
+        Get the coordinates of one or several frames.
+
+        Each dimension is copied from the file straight into its column of
+        the (interleaved) output array, i.e. there are no temporary arrays
+        for x, y and z. Single precision (as stored in the file) is kept
+        unless another dtype is requested. Frames skipped by the key (e.g.
+        a slice with a step) and atoms not selected are never read from
+        the file.
+
+        Parameters
+        ----------
+        key : int, slice or array of ints
+            frame index (negative indices count from the last frame)
+        dtype : np.dtype
+            dtype of the coordinates (ignored if out is given)
+        out : np.array or None
+            array to fill (e.g. from ag_lmpdcd_helpers.deploy_array)
+        atoms : array of ints or None
+            indices of the atoms to get (default: all atoms)
+
+        Returns
+        -------
+        coords : np.array
+            (natoms, 3)-array for one frame, (n, natoms, 3)-array otherwise
+
+        """
+        if out is None:
+            nframes = np.shape(np.arange(self.nframes)[key])
+            natoms = self.natoms if atoms is None else len(atoms)
+            out = np.empty(nframes + (natoms, 3), dtype=dtype)
+
+        for dim_idx, dim in enumerate((self.x, self.y, self.z)):
+            out[..., dim_idx] = _select(dim, key, atoms)
+
+        return out
+
+    def __getitem__(self, key):
+        """
+        Get the coordinates of one or several frames.
+
+        Frames selected by an int or a slice are read-only views into the
+        file (see coords), arrays of frame indices are copied (see read).
+        """
+        if isinstance(key, slice) or np.ndim(key) == 0:
+            return self.coords[key]
+
+        return self.read(key)
+
+    def get_box(self, frame_idx):
+        """
+        Get the box (lattice box-type) of a frame (None if the dcd has no unit cells).
+        """
+        if not self.extra_blck:
+            return None
+
+        a, b, c, alpha, beta, gamma = agldh.unitcell_to_lattice(self.unitcells[frame_idx])
+        return mdb.Box(ltc_a=a, ltc_b=b, ltc_c=c, ltc_alpha=alpha,
+                       ltc_beta=beta, ltc_gamma=gamma, boxtype="lattice")
+
+    def get_boxes(self, key=slice(None)):
+        """
+        Get the boxes of several frames at once (None if the dcd has no
+        unit cells).
+
+        All unit cells are read in one go and converted together.
+
+        Parameters
+        ----------
+        key : slice or array of ints
+            frame indices
+
+        Returns
+        -------
+        boxes : md_box.BoxSeries
+
+        """
+        if not self.extra_blck:
+            return None
+
+        return mdb.BoxSeries(*agldh.unitcell_to_lattice(self.unitcells[key]))
+
+    def iter_frames(self, start=None, stop=None, step=None, atoms=None,
+                    dtype=np.float32):
+        """
+        Iterate over the frames one by one.
+
+        All frames are copied into the same buffer, i.e. only one frame is
+        kept in memory regardless of the length of the trajectory. Copy the
+        coordinates if they are needed after the next iteration.
+
+        Parameters
+        ----------
+        start, stop, step : int or None
+            frames to iterate over (same as slicing, e.g. -1 is the last frame)
+        atoms : array of ints or None
+            indices of the atoms to get (default: all atoms)
+        dtype : np.dtype
+            dtype of the coordinates (default: single precision as in the file)
+
+        Yields
+        ------
+        coords : np.array
+            (natoms, 3)-array of the current frame (reused buffer)
+        box : md_box.Box or None
+            box of the current frame (lattice box-type)
+
+        """
+        frame_idxs = range(self.nframes)[slice(start, stop, step)]
+        natoms = self.natoms if atoms is None else len(atoms)
+        coords = np.empty((natoms, 3), dtype=dtype)
+
+        for frame_idx in frame_idxs:
+            self.read(frame_idx, out=coords, atoms=atoms)
+            yield (coords, self.get_box(frame_idx))
+
+    def get_steps(self):
+        """
+        Step number of each frame.
+        """
+        return self.sframe + np.arange(self.nframes) * self.step
+
+    def close(self):
+        """
+        Release the memory map (views which are still used keep it alive).
+        """
+        self._frames = None
+
+
+class DCDChain(object):
+    """
+    Several DCD-files (e.g. pieces of the same run) as one trajectory.
+
+    All pieces are memory mapped (see DCDFile) and frames are only read when
+    accessed. Frames are addressed by a global index over all pieces.
+    Restarted runs usually write the last frame of a piece again as first
+    frame of the next piece; these duplicates at the seams are removed by
+    their step numbers (from the headers), i.e. frames of a piece whose step
+    is not larger than the last step of the pieces before are skipped.
+    """
+    def __init__(self, *dcds, **kwargs):
+        """
+        Map all pieces and create the global frame index.
+
+        Parameters
+        ----------
+        dcds : str
+            names of the dcd-files (in the order of the run)
+        remove_duplicates : bool
+            skip frames at the seams by their step numbers (default: True)
+
+        """
+        remove_duplicates = kwargs.get("remove_duplicates", True)
+        self.dcds = list(dcds)
+        self.pieces = [DCDFile(dcd) for dcd in dcds]
+
+        for piece in self.pieces[1:]:
+            if piece.natoms != self.pieces[0].natoms:
+                raise RuntimeError("Different number of atoms in DCD-files!")
+
+            if bool(piece.extra_blck) != bool(self.pieces[0].extra_blck):
+                raise RuntimeError("Unit cells are missing in some DCD-files!")
+
+        piece_idxs = []
+        frame_idxs = []
+        steps = []
+
+        for piece_idx, piece in enumerate(self.pieces):
+            piece_steps = piece.get_steps()
+            piece_frames = np.arange(piece.nframes)
+
+            if remove_duplicates is True and len(steps) > 0 and len(steps[-1]) > 0:
+                # steps of each piece are sorted, skip all up to the last one so far
+                first_new = np.searchsorted(piece_steps, steps[-1][-1], side="right")
+                piece_steps = piece_steps[first_new:]
+                piece_frames = piece_frames[first_new:]
+
+            piece_idxs.append(np.full(len(piece_frames), piece_idx, dtype=int))
+            frame_idxs.append(piece_frames)
+            steps.append(piece_steps)
+
+        self._piece_idxs = np.concatenate(piece_idxs)
+        self._frame_idxs = np.concatenate(frame_idxs)
+        self.steps = np.concatenate(steps)
+
+        # same attributes as DCDFile
+        first = self.pieces[0]
+        self.nframes = len(self._frame_idxs)
+        self.natoms = first.natoms
+        self.sframe = first.sframe
+        self.step = first.step
+        self.lframe = self.steps[-1] if self.nframes > 0 else first.lframe
+        self.timestep = first.timestep
+        self.extra_blck = first.extra_blck
+        self.has_4dims = first.has_4dims
+        self.is_charmm = first.is_charmm
+
+    def __len__(self):
+        return self.nframes
+
+    def locate(self, frame_idx):
+        """
+        Get the piece and the index of a (global) frame inside that piece.
+        """
+        return (self.pieces[self._piece_idxs[frame_idx]], self._frame_idxs[frame_idx])
+
+    def _frame_idxs_of(self, key):
+        """
+        Global frame indices of an int, slice or array of ints.
+        """
+        return np.arange(self.nframes)[key]
+
+    def read(self, key=slice(None), dtype=np.float32, out=None, atoms=None):
+        """
+        Get the coordinates of one or several frames (see DCDFile.read).
+        """
+        frame_idxs = self._frame_idxs_of(key)
+
+        if np.ndim(frame_idxs) == 0:
+            piece, piece_frame_idx = self.locate(frame_idxs)
+            return piece.read(piece_frame_idx, dtype, out, atoms)
+
+        if out is None:
+            natoms = self.natoms if atoms is None else len(atoms)
+            out = np.empty((len(frame_idxs), natoms, 3), dtype=dtype)
+
+        for piece_idx, piece in enumerate(self.pieces):
+            out_idxs = np.flatnonzero(self._piece_idxs[frame_idxs] == piece_idx)
+
+            if len(out_idxs) == 0:
+                continue
+
+            piece_frame_idxs = self._frame_idxs[frame_idxs[out_idxs]]
+            piece_steps = np.unique(np.diff(piece_frame_idxs))
+
+            # evenly spaced frames are sliced (views instead of fancy indexing)
+            if len(piece_steps) == 1 and piece_steps[0] > 0:
+                piece_frame_idxs = slice(piece_frame_idxs[0], piece_frame_idxs[-1] + 1,
+                                         piece_steps[0])
+
+            # frames of a slice are contiguous in the output, fill in place
+            if out_idxs[-1] - out_idxs[0] + 1 == len(out_idxs):
+                piece.read(piece_frame_idxs, out=out[out_idxs[0]:out_idxs[-1] + 1],
+                           atoms=atoms)
+            else:
+                out[out_idxs] = piece.read(piece_frame_idxs, dtype, atoms=atoms)
+
+        return out
+
+    def __getitem__(self, key):
+        """
+        Get the coordinates of one or several frames (see DCDFile.read).
+
+        Frames may be spread over several files, i.e. they are always copied.
+        """
+        return self.read(key)
+
+    @property
+    def unitcells(self):
+        """
+        Unit cells of all frames, (nframes, 6)-array (None if the dcds have
+        no unit cells).
+        """
+        if not self.extra_blck:
+            return None
+
+        unitcells = np.empty((self.nframes, 6))
+
+        for piece_idx, piece in enumerate(self.pieces):
+            mask = self._piece_idxs == piece_idx
+            unitcells[mask] = piece.unitcells[self._frame_idxs[mask]]
+
+        return unitcells
+
+    def get_box(self, frame_idx):
+        """
+        Get the box (lattice box-type) of a frame (None if the dcds have no unit cells).
+        """
+        piece, piece_frame_idx = self.locate(frame_idx)
+        return piece.get_box(piece_frame_idx)
+
+    def get_boxes(self, key=slice(None)):
+        """
+        Get the boxes of several frames at once (see DCDFile.get_boxes).
+        """
+        if not self.extra_blck:
+            return None
+
+        frame_idxs = np.atleast_1d(self._frame_idxs_of(key))
+        unitcells = np.empty((len(frame_idxs), 6))
+
+        for piece_idx, piece in enumerate(self.pieces):
+            mask = self._piece_idxs[frame_idxs] == piece_idx
+
+            if np.any(mask):
+                unitcells[mask] = piece.unitcells[self._frame_idxs[frame_idxs[mask]]]
+
+        return mdb.BoxSeries(*agldh.unitcell_to_lattice(unitcells))
+
+    def iter_frames(self, start=None, stop=None, step=None, atoms=None,
+                    dtype=np.float32):
+        """
+        Iterate over the frames one by one (see DCDFile.iter_frames).
+        """
+        frame_idxs = range(self.nframes)[slice(start, stop, step)]
+        natoms = self.natoms if atoms is None else len(atoms)
+        coords = np.empty((natoms, 3), dtype=dtype)
+
+        for frame_idx in frame_idxs:
+            piece, piece_frame_idx = self.locate(frame_idx)
+            piece.read(piece_frame_idx, out=coords, atoms=atoms)
+            yield (coords, piece.get_box(piece_frame_idx))
+
+    def get_steps(self):
+        """
+        Step number of each frame.
+        """
+        return self.steps
+
+    def close(self):
+        """
+        Release the memory maps of all pieces.
+        """
+        for piece in self.pieces:
+            piece.close()
+
+
+def open_dcds(*dcds):
+    """
+    Map a single dcd-file (DCDFile) or chain several ones (DCDChain).
+
+    A single trajectory archive (see ag_lmparchive) or lammps text dump (see
+    ag_lmpdump) is opened as well.
+    """
+    import ag_lmparchive as aglarc
+    import ag_lmpdump as agldump
+
+    if len(dcds) == 1:
+        if aglarc.is_archive(dcds[0]):
+            return aglarc.TrajectoryArchive(dcds[0])
+
+        if agldump.is_dump(dcds[0]):
+            return agldump.DumpFile(dcds[0])
+
+        return DCDFile(dcds[0])
+
+    return DCDChain(*dcds)
+
+
+class FramePrefetcher(object):
+    """
+    Read the next frames in a background thread while the caller works on
+    the current one (e.g. on slow network file systems like $FASTTMP).
+
+    The frames are read into a ring of preallocated buffers; if all of them
+    are full, the reading thread waits until the caller is done with a
+    frame (backpressure), i.e. memory is bounded by the number of buffers.
+    Iterating gives the same as iter_frames of the trajectory. Do not use
+    the trajectory otherwise while iterating.
+
+    Counters (seconds) after or during iterating:
+        read_time   time the thread spent reading frames
+        wait_time   time the caller waited for frames
+        hidden_time read time overlapped with the caller's work
+    """
+    def __init__(self, trajectory, start=None, stop=None, step=None, atoms=None,
+                 dtype=np.float32, nbuffers=8):
+        """
+        Parameters
+        ----------
+        trajectory : DCDFile, DCDChain or ag_lmparchive.TrajectoryArchive
+            trajectory to read from (see open_dcds)
+        start, stop, step, atoms, dtype
+            see DCDFile.iter_frames
+        nbuffers : int
+            number of frames read ahead at most
+
+        """
+        self.trajectory = trajectory
+        self.frame_idxs = range(trajectory.nframes)[slice(start, stop, step)]
+        self.atoms = atoms
+        self.nbuffers = max(int(nbuffers), 1)
+        natoms = trajectory.natoms if atoms is None else len(atoms)
+        # one more buffer than read ahead, the caller holds the current one
+        self._buffers = np.empty((self.nbuffers + 1, natoms, 3), dtype=dtype)
+
+        self.nframes_read = 0
+        self.read_time = 0.0
+        self.wait_time = 0.0
+
+    @property
+    def hidden_time(self):
+        return max(self.read_time - self.wait_time, 0.0)
+
+    def get_stats(self):
+        """
+        Counters of the frames read so far.
+        """
+        return {"nframes": self.nframes_read, "read_time": self.read_time,
+                "wait_time": self.wait_time, "hidden_time": self.hidden_time}
+
+    def _read_ahead(self, free, ready, stop):
+        """
+        Fill free buffers with the next frames (runs in the background thread).
+        """
+        try:
+            for frame_idx in self.frame_idxs:
+                buffer_idx = free.get()
+
+                if stop.is_set():
+                    return
+
+                start_time = time.time()
+                self.trajectory.read(frame_idx, out=self._buffers[buffer_idx],
+                                     atoms=self.atoms)
+                box = self.trajectory.get_box(frame_idx)
+                self.read_time += time.time() - start_time
+                ready.put((buffer_idx, box, None))
+        except Exception as error:
+            ready.put((None, None, error))
+            return
+
+        ready.put((None, None, None))
+
+    def __iter__(self):
+        free = queue.Queue()
+        ready = queue.Queue()
+        stop = threading.Event()
+
+        for buffer_idx in range(self.nbuffers + 1):
+            free.put(buffer_idx)
+
+        thread = threading.Thread(target=self._read_ahead, args=(free, ready, stop))
+        thread.daemon = True
+        thread.start()
+
+        try:
+            while True:
+                start_time = time.time()
+                buffer_idx, box, error = ready.get()
+                self.wait_time += time.time() - start_time
+
+                if error is not None:
+                    raise error
+
+                if buffer_idx is None:
+                    break
+
+                self.nframes_read += 1
+                yield (self._buffers[buffer_idx], box)
+                # the caller is done with the frame, buffer may be refilled
+                free.put(buffer_idx)
+        finally:
+            stop.set()
+            # wake up the thread if it waits for a free buffer
+            free.put(0)
+            thread.join()
+
+
+class DCDWriter(object):
+    """
+    Write frames to a DCD-file (CHARMM/LAMMPS flavor with unit cells).
+
+    Frames are written in bulk (one tofile per call of write_frames), the
+    number of frames in the header is patched when the file is closed.
+    """
+    def __init__(self, dcd, natoms, sframe=0, step=1, timestep=1.0,
+                 has_unitcells=True, title="Created by ag_lmpdcd", append=False):
+        """
+        Create a new DCD-file or open an existing one to append frames.
+
+        Parameters
+        ----------
+        dcd : str
+            name of the dcd-file
+        natoms : int
+            number of atoms of each frame
+        sframe, step : int
+            step number of the first frame and steps between two frames
+            (taken from the file if appending)
+        timestep : float
+            time of a single step
+        has_unitcells : bool
+            write a unit cell for each frame
+        title : str
+            title of the dcd (80 characters at most)
+        append : bool
+            append frames to an existing dcd-file (must have the same
+            number of atoms and unit cells)
+
+        """
+        self.dcd = dcd
+        self.natoms = natoms
+
+        if append is True and os.path.isfile(dcd):
+            existing = DCDFile(dcd)
+
+            if existing.natoms != natoms:
+                raise RuntimeError("Different number of atoms in DCD-files!")
+
+            if bool(existing.extra_blck) != has_unitcells or existing.has_4dims:
+                raise RuntimeError("Frame layout of {} differs!".format(dcd))
+
+            self.sframe = existing.sframe
+            self.step = existing.step
+            self.nframes = existing.nframes
+            self.frame_dtype = existing.frame_dtype
+            existing.close()
+
+            # remove incomplete frames (e.g. crashed simulation)
+            self._dcdfile = open(dcd, "r+b")
+            self._dcdfile.truncate(existing.header_size + self.nframes * self.frame_dtype.itemsize)
+            self._dcdfile.seek(0, os.SEEK_END)
+        else:
+            self.sframe = sframe
+            self.step = step
+            self.nframes = 0
+            self._dcdfile = open(dcd, "wb")
+            self._write_header(timestep, has_unitcells, title)
+            self.frame_dtype = frame_dtype(natoms, has_unitcells)
+
+    def _write_record(self, record):
+        """
+        Write a record framed by its length in bytes.
+        """
+        self._dcdfile.write(struct.pack("i", len(record)))
+        self._dcdfile.write(record)
+        self._dcdfile.write(struct.pack("i", len(record)))
+
+    def _write_header(self, timestep, has_unitcells, title):
+        """
+        Write header and title blocks.
+        """
+        hdr = struct.pack("4c9if10i", b"C", b"O", b"R", b"D",
+                          0, self.sframe, self.step, self.sframe, 0, 0, 0, 0, 0,
+                          timestep, int(has_unitcells), 0, 0, 0, 0, 0, 0, 0, 0,
+                          24)
+        self._write_record(hdr)
+        title = title.encode("ascii", "replace")[:80].ljust(80)
+        self._write_record(struct.pack("i", 1) + title)
+        self._write_record(struct.pack("i", self.natoms))
+
+    def write_frames(self, coords, unitcells=None):
+        """
+        Append frames to the file.
+
+        Parameters
+        ----------
+        coords : np.array
+            (natoms, 3)- or (n, natoms, 3)-array of cartesian coordinates
+        unitcells : np.array or None
+            (6)- or (n, 6)-array of unit cells, layout is
+            [A, cos(gamma), B, cos(beta), cos(alpha), C]
+            (see ag_lmpdcd_helpers.lattice_to_unitcell)
+
+        """
+        coords = np.asarray(coords).reshape(-1, self.natoms, 3)
+        frames = np.empty(len(coords), dtype=self.frame_dtype)
+
+        if "unitcell" in self.frame_dtype.names:
+            if unitcells is None:
+                raise RuntimeError("Unit cells needed for {}!".format(self.dcd))
+
+            frames["cell_head"] = frames["cell_tail"] = 48
+            frames["unitcell"] = np.asarray(unitcells).reshape(-1, 6)
+
+        for dim_idx, dim in enumerate(("x", "y", "z")):
+            frames[dim + "_head"] = frames[dim + "_tail"] = 4 * self.natoms
+            frames[dim] = coords[:, :, dim_idx]
+
+        frames.tofile(self._dcdfile)
+        self.nframes += len(frames)
+
+    def close(self):
+        """
+        Patch number of frames and last step in the header and close the file.
+        """
+        if self._dcdfile.closed:
+            return
+
+        # first record starts after its length and 'CORD'
+        self._dcdfile.seek(8)
+        self._dcdfile.write(struct.pack("i", self.nframes))
+        self._dcdfile.seek(20)
+        self._dcdfile.write(struct.pack("i", self.sframe + max(self.nframes - 1, 0) * self.step))
+        self._dcdfile.close()
+
+
+def write_dcd(dcd, coords, unitcells=None, append=False, **writer_args):
+    """
+    Write (or append) all frames to a dcd-file at once.
+
+    Parameters
+    ----------
+    dcd : str
+        name of the dcd-file
+    coords : np.array
+        (n, natoms, 3)-array of cartesian coordinates
+    unitcells : np.array or None
+        (n, 6)-array of unit cells (no unit cells are written if None)
+    append : bool
+        append frames to an existing dcd-file
+    writer_args
+        further arguments for DCDWriter (sframe, step, timestep, title)
+
+    """
+    coords = np.asarray(coords)
+    natoms = coords.shape[-2]
+    dcd_out = DCDWriter(dcd, natoms, has_unitcells=unitcells is not None,
+                        append=append, **writer_args)
+    dcd_out.write_frames(coords, unitcells)
+    dcd_out.close()
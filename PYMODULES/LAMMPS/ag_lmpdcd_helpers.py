@@ -38,15 +38,45 @@ def check_open(dcd_file):
         raise ValueError("I/O operation on closed file")
 
 
-def deploy_array(num_frames, natoms):
+def unitcell_to_lattice(unitcell):
     """
-    Preallocate memory for upcoming arrays
+    Convert the unit cell record of a frame (or the (n, 6)-array of the
+    records of n frames at once) to lattice vectors and angles.
+
+    Layout of the unit cell is [A, cos(gamma), B, cos(beta), cos(alpha), C]
+    (historical reasons).
+
+    Returns
+    -------
+    a, b, c, alpha, beta, gamma : floats or arrays of floats
+        lattice vectors and angles (radians)
+
     """
-    x_coordset = np.zeros((num_frames, natoms))
-    y_coordset = np.zeros((num_frames, natoms))
-    z_coordset = np.zeros((num_frames, natoms))
+    unitcell = np.asarray(unitcell)
+    M_PI_2 = np.pi / 2
+    alpha = np.radians(90.0 - np.arcsin(unitcell[..., 4])*90.0/M_PI_2)  # cosAB
+    beta  = np.radians(90.0 - np.arcsin(unitcell[..., 3])*90.0/M_PI_2)  # cosAC
+    gamma = np.radians(90.0 - np.arcsin(unitcell[..., 1])*90.0/M_PI_2)  # cosBC
+    return (unitcell[..., 0], unitcell[..., 2], unitcell[..., 5], alpha, beta, gamma)
 
-    return (x_coordset, y_coordset, z_coordset)
+
+def lattice_to_unitcell(a, b, c, alpha, beta, gamma):
+    """
+    Convert lattice vectors and angles (radians) to the unit cell record of
+    a frame (inverse of unitcell_to_lattice).
+    """
+    return (a, np.cos(gamma), b, np.cos(beta), np.cos(alpha), c)
+
+
+def deploy_array(num_frames, natoms, dtype=np.float64):
+    """
+    Preallocate memory for upcoming frames.
+
+    All coordinates are kept in a single (num_frames, natoms, 3)-array (x, y
+    and z interleaved) so frames can be filled directly without temporary
+    arrays for each dimension.
+    """
+    return np.empty((num_frames, natoms, 3), dtype=dtype)
 
 
 def reshape_arguments(sframe, nframes, step, frame_start, frame_stop, key):
@@ -0,0 +1,426 @@
+"""
+Streaming reader for lammps text dumps (dump atom/custom).
+
+Each frame is a block of header lines (step, number of atoms, box bounds,
+column names) followed by one line per atom. The atom lines of a frame are
+read at once and split into a (natoms, ncols)-array; lines are sorted by
+atom id (lammps writes them in arbitrary order if run in parallel).
+Orthogonal and triclinic boxes and unscaled (x, xu) as well as scaled
+(xs, xsu) coordinates are supported.
+
+DumpFile has the same interface as ag_lmpdcd.DCDFile, ag_lmpdcd.open_dcds
+opens dumps as well, i.e. LmpStuff.import_dcd, read_frames, iter_frames and
+ag_frame_analysis work with dumps. Further per-atom columns (e.g. forces,
+velocities, per-atom energies) are available by iter_columns and
+read_columns.
+
+Examples
+--------
+
+Stream the frames
+-----------------
+dump = DumpFile("production.lammpstrj")
+for coords, box in dump.iter_frames(step=10):
+    pass
+
+Forces and per-atom energies of each frame
+------------------------------------------
+for frc_pe in dump.iter_columns(["fx", "fy", "fz", "c_pe"]):
+    pass
+
+"""
+
+import itertools
+import numpy as np
+import md_box as mdb
+
+# names of the coordinate columns (unscaled first)
+COORD_COLUMNS = (("x", "y", "z"), ("xu", "yu", "zu"),
+                 ("xs", "ys", "zs"), ("xsu", "ysu", "zsu"))
+
+
+def is_dump(file_name):
+    """
+    Check if a file is a lammps text dump (by its first line).
+    """
+    with open(file_name, "rb") as file_in:
+        return file_in.readline().startswith(b"ITEM: TIMESTEP")
+
+
+def bounds_to_lammps(bounds):
+    """
+    Convert the box bounds of a dump (one frame or (n, 9)-array of n frames)
+    to the lammps box.
+
+    Layout of the bounds is [xlo_bound, xhi_bound, ylo_bound, yhi_bound,
+    zlo_bound, zhi_bound, xy, xz, yz] (tilt factors are 0 for orthogonal
+    boxes).
+
+    Sources:    https://lammps.sandia.gov/doc/Howto_triclinic.html
+
+    Returns
+    -------
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz : floats or arrays of floats
+
+    """
+    bounds = np.asarray(bounds, dtype=np.float64)
+    xy, xz, yz = bounds[..., 6], bounds[..., 7], bounds[..., 8]
+    x_tilts = np.stack((np.zeros_like(xy), xy, xz, xy + xz))
+    xlo = bounds[..., 0] - x_tilts.min(axis=0)
+    xhi = bounds[..., 1] - x_tilts.max(axis=0)
+    ylo = bounds[..., 2] - np.minimum(0.0, yz)
+    yhi = bounds[..., 3] - np.maximum(0.0, yz)
+    return (xlo, xhi, ylo, yhi, bounds[..., 4], bounds[..., 5], xy, xz, yz)
+
+
+def bounds_to_lattice(bounds):
+    """
+    Convert the box bounds of a dump to lattice vectors and angles (radians),
+    same equations as ag_cryst.box_lmp2lat for arrays.
+    """
+    xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = bounds_to_lammps(bounds)
+    lx, ly, lz = xhi - xlo, yhi - ylo, zhi - zlo
+    a = lx
+    b = np.sqrt(ly**2 + xy**2)
+    c = np.sqrt(lz**2 + xz**2 + yz**2)
+    alpha = np.arccos((xy*xz + ly*yz)/(b*c))
+    beta = np.arccos(xz/c)
+    gamma = np.arccos(xy/b)
+    return (a, b, c, alpha, beta, gamma)
+
+
+class DumpFile(object):
+    """
+    Frames of a lammps text dump, read block by block.
+
+    Iterating over the frames streams the file once. Random access (read,
+    nframes, negative indices) needs the byte offset of each frame, the
+    offsets are gathered by a single pass over the file when first needed
+    (atom lines are only counted, not parsed).
+    """
+    def __init__(self, dump):
+        """
+        Read the header of the first frame.
+        """
+        self.dump = dump
+        self.dcds = [dump]
+        self._dump_in = open(dump, "rb")
+        # set when box bounds with tilt factors are read
+        self.triclinic = False
+        header = self._read_header()
+
+        if header is None:
+            raise IOError("{} is not a lammps dump!".format(dump))
+
+        self.sframe, self.natoms, _, self.columns, _ = header
+        self._dump_in.seek(0)
+
+        # columns needed for the coordinates and the order of the atoms
+        self._id_col = self.columns.index("id") if "id" in self.columns else None
+
+        for coord_columns in COORD_COLUMNS:
+            if set(coord_columns) <= set(self.columns):
+                self._coord_cols = [self.columns.index(i) for i in coord_columns]
+                self.scaled = "s" in coord_columns[0]
+                break
+        else:
+            self._coord_cols = None
+            self.scaled = False
+
+        # byte offset, step and box bounds of each frame (see _index)
+        self._offsets = None
+        self._steps = None
+        self._bounds = None
+
+        # same attributes as ag_lmpdcd.DCDFile
+        self.extra_blck = 1
+        self.has_4dims = 0
+        self.is_charmm = False
+
+    def _read_header(self):
+        """
+        Read the header lines of the next frame.
+
+        Returns
+        -------
+        step : int
+        natoms : int
+        bounds : np.array
+            box bounds and tilt factors (see bounds_to_lammps)
+        columns : list of str
+            names of the per-atom columns
+        nbytes : int
+            size of the header in bytes
+
+        None at the end of the file.
+
+        """
+        lines = list(itertools.islice(self._dump_in, 9))
+
+        if not lines:
+            return None
+
+        if len(lines) != 9 or not lines[0].startswith(b"ITEM: TIMESTEP"):
+            raise IOError("Corrupt frame header in {}!".format(self.dump))
+
+        step = int(lines[1])
+        natoms = int(lines[3])
+        bounds = np.zeros(9)
+
+        for dim in range(3):
+            words = lines[5 + dim].split()
+            bounds[2*dim:2*dim + 2] = float(words[0]), float(words[1])
+
+            if len(words) > 2:
+                bounds[6 + dim] = float(words[2])
+                self.triclinic = True
+
+        columns = lines[8].decode().split()[2:]
+        return (step, natoms, bounds, columns, sum(len(i) for i in lines))
+
+    def _index(self):
+        """
+        Gather the byte offset, step and box bounds of all frames.
+        """
+        if self._offsets is not None:
+            return
+
+        offsets, steps, bounds = [], [], []
+        offset = 0
+        self._dump_in.seek(0)
+
+        while True:
+            header = self._read_header()
+
+            if header is None:
+                break
+
+            step, natoms, frame_bounds, _, nbytes = header
+
+            if natoms != self.natoms:
+                raise IOError("Number of atoms changes in frame {} of {}!".format(
+                    len(offsets), self.dump))
+
+            offsets.append(offset)
+            steps.append(step)
+            bounds.append(frame_bounds)
+            offset += nbytes + sum(len(i) for i in itertools.islice(self._dump_in, natoms))
+
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._steps = np.array(steps, dtype=np.int64)
+        self._bounds = np.array(bounds).reshape(-1, 9)
+
+    @property
+    def nframes(self):
+        self._index()
+        return len(self._offsets)
+
+    @property
+    def step(self):
+        self._index()
+        return int(self._steps[1] - self._steps[0]) if len(self._steps) > 1 else 1
+
+    @property
+    def lframe(self):
+        self._index()
+        return int(self._steps[-1])
+
+    def __len__(self):
+        return self.nframes
+
+    def _read_entries(self, natoms, ncols):
+        """
+        Read the atom lines of the current frame, sorted by atom id.
+
+        Returns
+        -------
+        entries : np.array
+            (natoms, ncols)-array of byte strings
+
+        """
+        lines = list(itertools.islice(self._dump_in, natoms))
+
+        if len(lines) != natoms:
+            raise IOError("Frame ended after {} of {} atoms!".format(len(lines), natoms))
+
+        entries = np.array(b" ".join(lines).split()).reshape(natoms, ncols)
+
+        if self._id_col is not None:
+            entries = entries[np.argsort(entries[:, self._id_col].astype(np.int64),
+                                         kind="stable")]
+
+        return entries
+
+    def _coords(self, entries, bounds, atoms=None):
+        """
+        Cartesian coordinates of the (sorted) entries of a frame.
+        """
+        if self._coord_cols is None:
+            raise IOError("{} has no coordinates!".format(self.dump))
+
+        if atoms is not None:
+            entries = entries[atoms]
+
+        coords = entries[:, self._coord_cols].astype(np.float64)
+
+        if self.scaled is True:
+            xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = bounds_to_lammps(bounds)
+            xs, ys, zs = coords.T.copy()
+            coords[:, 0] = xlo + xs*(xhi - xlo) + ys*xy + zs*xz
+            coords[:, 1] = ylo + ys*(yhi - ylo) + zs*yz
+            coords[:, 2] = zlo + zs*(zhi - zlo)
+
+        return coords
+
+    def _iter_entries(self, start=None, stop=None, step=None):
+        """
+        Iterate over the box bounds and entries of the frames of a slice.
+
+        Without negative indices the file is streamed from its beginning,
+        the atom lines of the frames in between are skipped unparsed.
+        """
+        if any(i is not None and i < 0 for i in (start, stop, step)):
+            for frame_idx in range(self.nframes)[slice(start, stop, step)]:
+                self._dump_in.seek(self._offsets[frame_idx])
+                _, natoms, bounds, columns, _ = self._read_header()
+                yield (bounds, self._read_entries(natoms, len(columns)))
+
+            return
+
+        start = 0 if start is None else start
+        step = 1 if step is None else step
+        self._dump_in.seek(0)
+
+        for frame_idx in itertools.count():
+            if stop is not None and frame_idx >= stop:
+                break
+
+            header = self._read_header()
+
+            if header is None:
+                break
+
+            _, natoms, bounds, columns, _ = header
+
+            if frame_idx < start or (frame_idx - start) % step != 0:
+                next(itertools.islice(self._dump_in, natoms, natoms), None)
+                continue
+
+            entries = self._read_entries(natoms, len(columns))
+            # the caller may read other frames in between
+            offset = self._dump_in.tell()
+            yield (bounds, entries)
+            self._dump_in.seek(offset)
+
+    def read(self, key=slice(None), dtype=np.float32, out=None, atoms=None):
+        """
+        Get the coordinates of one or several frames (see ag_lmpdcd.DCDFile.read).
+        """
+        frame_idxs = np.arange(self.nframes)[key]
+        single = np.ndim(frame_idxs) == 0
+        frame_idxs = np.atleast_1d(frame_idxs)
+        natoms = self.natoms if atoms is None else len(atoms)
+
+        if out is None:
+            out = np.empty((len(frame_idxs), natoms, 3), dtype=dtype)
+        elif single:
+            out = out[np.newaxis]
+
+        for out_idx, frame_idx in enumerate(frame_idxs):
+            self._dump_in.seek(self._offsets[frame_idx])
+            _, natoms, bounds, columns, _ = self._read_header()
+            entries = self._read_entries(natoms, len(columns))
+            out[out_idx] = self._coords(entries, bounds, atoms)
+
+        if single:
+            return out[0]
+
+        return out
+
+    def __getitem__(self, key):
+        """
+        Get the coordinates of one or several frames (see read).
+        """
+        return self.read(key)
+
+    def read_columns(self, frame_idx, columns, atoms=None, dtype=np.float64):
+        """
+        Get per-atom columns (e.g. ["vx", "vy", "vz"]) of a frame, sorted by
+        atom id.
+
+        Returns
+        -------
+        data : np.array
+            (natoms, len(columns))-array
+
+        """
+        self._index()
+        self._dump_in.seek(self._offsets[frame_idx])
+        _, natoms, _, frame_columns, _ = self._read_header()
+        entries = self._read_entries(natoms, len(frame_columns))
+
+        if atoms is not None:
+            entries = entries[atoms]
+
+        return entries[:, [frame_columns.index(i) for i in columns]].astype(dtype)
+
+    def iter_columns(self, columns, start=None, stop=None, step=None, atoms=None,
+                     dtype=np.float64):
+        """
+        Iterate over per-atom columns of the frames one by one (see read_columns
+        and iter_frames).
+        """
+        col_idxs = [self.columns.index(i) for i in columns]
+
+        for _, entries in self._iter_entries(start, stop, step):
+            if atoms is not None:
+                entries = entries[atoms]
+
+            yield entries[:, col_idxs].astype(dtype)
+
+    def get_box(self, frame_idx):
+        """
+        Get the box (lattice box-type) of a frame.
+        """
+        self._index()
+        return self._lattice_box(self._bounds[frame_idx])
+
+    def _lattice_box(self, bounds):
+        a, b, c, alpha, beta, gamma = [float(i) for i in bounds_to_lattice(bounds)]
+        return mdb.Box(ltc_a=a, ltc_b=b, ltc_c=c, ltc_alpha=alpha,
+                       ltc_beta=beta, ltc_gamma=gamma, boxtype="lattice")
+
+    def get_boxes(self, key=slice(None)):
+        """
+        Get the boxes of several frames at once (see ag_lmpdcd.DCDFile.get_boxes).
+        """
+        self._index()
+        return mdb.BoxSeries(*bounds_to_lattice(self._bounds[key]))
+
+    def iter_frames(self, start=None, stop=None, step=None, atoms=None,
+                    dtype=np.float32):
+        """
+        Iterate over the frames one by one (see ag_lmpdcd.DCDFile.iter_frames).
+
+        The file is streamed, frames which are not asked for are skipped
+        without parsing their atom lines.
+        """
+        natoms = self.natoms if atoms is None else len(atoms)
+        coords = np.empty((natoms, 3), dtype=dtype)
+
+        for bounds, entries in self._iter_entries(start, stop, step):
+            coords[:] = self._coords(entries, bounds, atoms)
+            yield (coords, self._lattice_box(bounds))
+
+    def get_steps(self):
+        """
+        Step number of each frame.
+        """
+        self._index()
+        return self._steps
+
+    def close(self):
+        """
+        Close the dump-file.
+        """
+        self._dump_in.close()
@@ -1,11 +1,145 @@
 #!/usr/bin/env python
 
+import os
 import collections
-import pdb
+import warnings
+import numpy as np
 import log_universe as logu
 
 __version__ = "2018-02-07"
 
+# lines that start and end the thermo output of a run
+THERMO_START = ("Memory usage per processor", "Per MPI rank memory allocation")
+THERMO_STOP = ("Loop time of", "WARNING: Wall time limit reached")
+
+
+def _find_line(text, prefixes, pos, found):
+    """
+    Position of the first line at or after pos starting with one of prefixes
+    (-1 if none).
+
+    found keeps the last position of each prefix (-1 if there is none left),
+    i.e. the text is searched only once for each prefix.
+    """
+    positions = []
+
+    for prefix in prefixes:
+        if prefix not in found or -1 < found[prefix] < pos:
+            found[prefix] = text.find("\n" + prefix, max(pos - 1, 0))
+
+            if found[prefix] != -1:
+                found[prefix] += 1
+
+        if found[prefix] != -1:
+            positions.append(found[prefix])
+
+    return min(positions) if positions else -1
+
+
+def _thermo_runs(text, keys=None):
+    """
+    Find the header and the body of each thermo output in a single scan and
+    parse the bodies (see _parse_thermo).
+
+    Parameters
+    ----------
+    text : str
+        content of a log-file (or the part of it not read yet)
+    keys : None or list of str
+        thermo keywords if text starts within the thermo output of a run
+
+    Returns
+    -------
+    runs : list of OrderedDicts
+        values of each run (or its part in text)
+    keys : None or list of str
+        thermo keywords if text ends within the thermo output of a run
+    pos : int
+        end of the last complete thermo header or run; text after pos is
+        either no thermo output or a header that is not written completely
+
+    """
+    text = "\n" + text
+    runs = []
+    found = {}
+    pos = 1
+
+    while True:
+        if keys is None:
+            start = _find_line(text, THERMO_START, pos, found)
+
+            if start == -1:
+                pos = len(text)
+                break
+
+            # header is the line after the memory usage
+            header_start = text.find("\n", start) + 1
+            body_start = text.find("\n", header_start) + 1
+
+            if header_start == 0 or body_start == 0:
+                pos = start
+                break
+
+            keys = text[header_start:body_start].split()
+            pos = body_start
+
+        stop = _find_line(text, THERMO_STOP, pos, found)
+        runs.append(_parse_thermo(keys, text[pos:len(text) if stop == -1 else stop]))
+
+        if stop == -1:
+            pos = len(text)
+            break
+
+        keys = None
+        pos = stop
+
+    return runs, keys, pos - 1
+
+
+def _parse_thermo(keys, body):
+    """
+    Convert the body of a thermo output to one array for each keyword.
+
+    The whole body is parsed by one numpy call; if it contains further lines
+    (e.g. warnings) or incomplete lines, only lines with one number for each
+    keyword are used.
+    """
+    ncols = len(keys)
+    nrows = body.count("\n") + (not body.endswith("\n"))
+
+    with warnings.catch_warnings():
+        # numpy warns (instead of raising) on data it cannot read
+        warnings.simplefilter("error", DeprecationWarning)
+
+        try:
+            values = np.fromstring(body, sep=" ")
+        except (ValueError, DeprecationWarning):
+            values = None
+
+    if values is None or values.size != nrows * ncols:
+        rows = []
+
+        for line in body.splitlines():
+            row = line.split()
+
+            if len(row) != ncols:
+                continue
+
+            try:
+                rows.append([float(i) for i in row])
+            except ValueError:
+                continue
+
+        values = np.array(rows, dtype=np.float64)
+
+    values = values.reshape(-1, ncols)
+    cdata = collections.OrderedDict()
+
+    for ckey, column in zip(keys, values.T):
+        cdata[ckey] = logu.column_array(ckey, column)
+
+    return cdata
+
 
 class LmpLog(logu.LogUniverse):
     """
@@ -17,49 +151,133 @@ class LmpLog(logu.LogUniverse):
     def read_lmplog(self, *lmplogs):
         """
         Read a log.lammps file with one or more thermo entries.
-        """
-        #pdb.set_trace()
 
+        Each run is appended to data as an OrderedDict with one array for
+        each thermo keyword (e.g. data[-1]["PotEng"]).
+        """
         for lmplog in lmplogs:
             with open(lmplog, "r") as log_in:
-                line = log_in.readline()
-                #eof = False  # end of file
+                text = log_in.read()
+
+            self.data.extend(_thermo_runs(text)[0])
+
+    def add_log(self, log_to_add):
+        """Add data from another log-file to current log-file."""
+        log = LmpLog()
+        log.read_lmplog(log_to_add)
+        self.data.extend(log.data)
 
-                while line != '':
-                    # starting point of thermo-output
-                    if (line.startswith("Memory usage per processor") or line.startswith("Per MPI rank memory allocation")):
 
-                        # deploy containers for the data to come
-                        thermo_line = log_in.readline()
-                        keys = thermo_line.split()
+class LmpLogTail(object):
+    """
+    Follow log.lammps file(s) while lammps writes them.
 
-                        # prepare current container
-                        cdata = collections.OrderedDict(
-                            list(zip(keys, [[] for i in range(len(keys))]))
-                        )
+    The byte offset up to which each file was read and the keywords of a run
+    not finished yet are kept, each call of read_new only parses the lines
+    added since the last call. Lines are only read when complete, i.e. a file
+    lammps is still writing can be read at any time. A file is read from its
+    beginning again if it was replaced (other inode) or rewritten (shorter
+    than what was read, or the bytes before the offset changed, e.g. by the
+    'log' command of lammps).
 
-                        # read further lines until end of run is reached
-                        line = log_in.readline()
+    Everything read is kept until forget is called, i.e. logs not checked
+    anymore should be forgotten.
 
-                        while line.startswith("Loop time of") is False and line.startswith("WARNING: Wall time limit reached") is False and line != '':
-                            values = [float(i) for i in line.split()]
+    Examples
+    --------
+    tail = LmpLogTail()
 
-                            for key, value in zip(keys, values):
-                                cdata[key].append(value)
+    while running:
+        new_runs = tail.read_new("log.lammps")  # only rows written meanwhile
+        pe = tail.get_values("PotEng", "log.lammps")  # all rows so far
 
-                            line = log_in.readline()
+    tail.forget("log.lammps")
 
-                        self.data.append(cdata)
+    """
+    # bytes before the offset compared to detect rewritten files
+    MARK_SIZE = 64
 
-                    line = log_in.readline()
+    def __init__(self):
+        self.offsets = {}  # bytes read of each file
+        self.keys = {}     # thermo keywords of the run still written in each file
+        self.runs = {}     # runs (parts of runs) read of each file
+        self.stats = {}    # device, inode, size and mtime of each file when read
+        self.marks = {}    # last bytes read of each file
 
-        self._int_values()
+    def reset(self, lmplog):
+        """
+        Forget everything read of a file (it is read from its beginning again).
+        """
+        self.offsets[lmplog] = 0
+        self.keys[lmplog] = None
+        self.runs[lmplog] = []
+        self.stats[lmplog] = None
+        self.marks[lmplog] = b""
 
-    def add_log(self, log_to_add):
-        """Add data from another log-file to current log-file."""
-        log = LmpLog()
-        log.read_lmplog(log_to_add)
-        self.data.extend(log.data)
+    def forget(self, *lmplogs):
+        """
+        Drop everything kept of lmplogs (all files if none are given).
+        """
+        for lmplog in lmplogs or list(self.offsets):
+            for kept in (self.offsets, self.keys, self.runs, self.stats, self.marks):
+                kept.pop(lmplog, None)
+
+    def read_new(self, lmplog):
+        """
+        Read the thermo output added to a log-file since the last call.
+
+        Returns
+        -------
+        new_runs : list of OrderedDicts
+            values of each run written since the last call (the first one
+            continues the last run of the previous call if it was not
+            finished yet); runs without new values are omitted
+
+        """
+        stat = os.stat(lmplog)
+        stat = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime)
+
+        read_stat = self.stats.get(lmplog)
+
+        if read_stat is None or stat[:2] != read_stat[:2] or stat[2] < self.offsets[lmplog]:
+            self.reset(lmplog)
+        elif stat == read_stat:
+            return []
+
+        mark = self.marks[lmplog]
+
+        with open(lmplog, "rb") as log_in:
+            log_in.seek(self.offsets[lmplog] - len(mark))
+            new_bytes = log_in.read()
+
+        if not new_bytes.startswith(mark):
+            self.reset(lmplog)
+            return self.read_new(lmplog)
+
+        # only complete lines
+        new_bytes = new_bytes[len(mark):new_bytes.rfind(b"\n") + 1]
+        text = new_bytes.decode("utf-8", "surrogateescape")
+        new_runs, self.keys[lmplog], pos = _thermo_runs(text, self.keys[lmplog])
+        nbytes = len(text[:pos].encode("utf-8", "surrogateescape"))
+        self.offsets[lmplog] += nbytes
+        self.marks[lmplog] = (mark + new_bytes[:nbytes])[-self.MARK_SIZE:]
+        self.stats[lmplog] = stat
+
+        new_runs = [cdata for cdata in new_runs if len(cdata) and len(list(cdata.values())[0])]
+        self.runs[lmplog].extend(new_runs)
+        return new_runs
+
+    def get_values(self, keyword, *lmplogs):
+        """
+        All values of keyword read so far from lmplogs (in the given order).
+        """
+        values = [cdata[keyword] for lmplog in lmplogs
+                  for cdata in self.runs.get(lmplog, []) if keyword in cdata]
+
+        if not values:
+            return np.array([], dtype=np.float64)
+
+        return np.concatenate(values)
 
 
 def read_lammps_log(*lammps_log_files):
@@ -1,42 +1,563 @@
 #!/usr/bin/env python
+"""
+Read the binary restart files of lammps (write_restart) without lammps.
 
+Layout of a (single) restart-file
+---------------------------------
+    magic string, endian flag, format revision
+    header          pairs of flag and value (ints, bigints, doubles,
+                    strings and vectors), ends with -1
+    groups          number of groups and their names
+    type arrays     masses (and type labels), ends with -1
+    force fields    pair, bond, angle, ... styles and their coefficients
+                    (layout depends on the style), ends with -1
+    fixes           global and per-atom restart info of fixes
+    file layout     MULTIPROC flag, ends with -1
+    atom data       PERPROC flag, number of doubles and the packed atoms of
+                    each processor
+    magic string
+
+The header, the groups and the masses are parsed, the force fields and
+fixes are skipped (the file layout is searched for). The atom data is
+mapped into memory (np.frombuffer over an mmap) and converted at once; each
+atom is packed as [size, x, y, z, id, type, mask, image, vx, vy, vz, ...]
+with the integers stored bitwise as doubles (ubuf).
+
+Sources:    https://github.com/lammps/lammps/blob/develop/src/write_restart.cpp
+            https://github.com/lammps/lammps/blob/develop/src/read_restart.cpp
+            https://github.com/lammps/lammps/blob/develop/src/lmprestart.h
+
+Examples
+--------
+rst = read_lmprst("quench.lmprst")
+coords = rst.get_coords(unwrap=True)
+box = rst.get_box()
+
+"""
+
+import mmap
 import struct
 import numpy as np
+import md_box as mdb
+
+MAGIC = b"LammpS RestartT\x00"
+ENDIAN = 0x0001
+FORMAT_REVISION = 3
+# version written by write_lmprst
+LAMMPS_VERSION = "2 Aug 2023"
+
+# flags of the header (lmprestart.h)
+(VERSION, SMALLINT, TAGINT, BIGINT, UNITS, NTIMESTEP, DIMENSION, NPROCS,
+ PROCGRID, NEWTON_PAIR, NEWTON_BOND, XPERIODIC, YPERIODIC, ZPERIODIC,
+ BOUNDARY, ATOM_STYLE, NATOMS, NTYPES, NBONDS, NBONDTYPES, BOND_PER_ATOM,
+ NANGLES, NANGLETYPES, ANGLE_PER_ATOM, NDIHEDRALS, NDIHEDRALTYPES,
+ DIHEDRAL_PER_ATOM, NIMPROPERS, NIMPROPERTYPES, IMPROPER_PER_ATOM,
+ TRICLINIC, BOXLO, BOXHI, XY, XZ, YZ, SPECIAL_LJ, SPECIAL_COUL, MASS, PAIR,
+ BOND, ANGLE, DIHEDRAL, IMPROPER, MULTIPROC, MPIIO, PROCSPERFILE, PERPROC,
+ IMAGEINT, BOUNDMIN, TIMESTEP, ATOM_ID, ATOM_MAP_STYLE, ATOM_MAP_USER,
+ ATOM_SORTFREQ, ATOM_SORTBINSIZE, COMM_MODE, COMM_CUTOFF, COMM_VEL, NO_PAIR,
+ EXTRA_BOND_PER_ATOM, EXTRA_ANGLE_PER_ATOM, EXTRA_DIHEDRAL_PER_ATOM,
+ EXTRA_IMPROPER_PER_ATOM, EXTRA_SPECIAL_PER_ATOM, ATOM_MAXSPECIAL,
+ NELLIPSOIDS, NLINES, NTRIS, NBODIES, ATIME, ATIMESTEP) = range(72)
+
+# name and kind of value of each header flag
+HEADER_FLAGS = {
+    VERSION: ("version", "string"), SMALLINT: ("smallint", "int"),
+    TAGINT: ("tagint", "int"), BIGINT: ("bigint", "int"),
+    IMAGEINT: ("imageint", "int"), UNITS: ("units", "string"),
+    NTIMESTEP: ("ntimestep", "bigint"), DIMENSION: ("dimension", "int"),
+    NPROCS: ("nprocs", "int"), PROCGRID: ("procgrid", "int_vec"),
+    NEWTON_PAIR: ("newton_pair", "int"), NEWTON_BOND: ("newton_bond", "int"),
+    XPERIODIC: ("xperiodic", "int"), YPERIODIC: ("yperiodic", "int"),
+    ZPERIODIC: ("zperiodic", "int"), BOUNDARY: ("boundary", "int_vec"),
+    BOUNDMIN: ("boundmin", "double_vec"), ATOM_STYLE: ("atom_style", "atom_style"),
+    NATOMS: ("natoms", "bigint"), NTYPES: ("ntypes", "int"),
+    NBONDS: ("nbonds", "bigint"), NBONDTYPES: ("nbondtypes", "int"),
+    BOND_PER_ATOM: ("bond_per_atom", "int"),
+    NANGLES: ("nangles", "bigint"), NANGLETYPES: ("nangletypes", "int"),
+    ANGLE_PER_ATOM: ("angle_per_atom", "int"),
+    NDIHEDRALS: ("ndihedrals", "bigint"), NDIHEDRALTYPES: ("ndihedraltypes", "int"),
+    DIHEDRAL_PER_ATOM: ("dihedral_per_atom", "int"),
+    NIMPROPERS: ("nimpropers", "bigint"), NIMPROPERTYPES: ("nimpropertypes", "int"),
+    IMPROPER_PER_ATOM: ("improper_per_atom", "int"),
+    TRICLINIC: ("triclinic", "int"), BOXLO: ("boxlo", "double_vec"),
+    BOXHI: ("boxhi", "double_vec"), XY: ("xy", "double"), XZ: ("xz", "double"),
+    YZ: ("yz", "double"), SPECIAL_LJ: ("special_lj", "double_vec"),
+    SPECIAL_COUL: ("special_coul", "double_vec"), TIMESTEP: ("timestep", "double"),
+    ATOM_ID: ("atom_id", "int"), ATOM_MAP_STYLE: ("atom_map_style", "int"),
+    ATOM_MAP_USER: ("atom_map_user", "int"), ATOM_SORTFREQ: ("atom_sortfreq", "int"),
+    ATOM_SORTBINSIZE: ("atom_sortbinsize", "double"), COMM_MODE: ("comm_mode", "int"),
+    COMM_CUTOFF: ("comm_cutoff", "double"), COMM_VEL: ("comm_vel", "int"),
+    EXTRA_BOND_PER_ATOM: ("extra_bond_per_atom", "int"),
+    EXTRA_ANGLE_PER_ATOM: ("extra_angle_per_atom", "int"),
+    EXTRA_DIHEDRAL_PER_ATOM: ("extra_dihedral_per_atom", "int"),
+    EXTRA_IMPROPER_PER_ATOM: ("extra_improper_per_atom", "int"),
+    EXTRA_SPECIAL_PER_ATOM: ("extra_special_per_atom", "int"),
+    ATOM_MAXSPECIAL: ("atom_maxspecial", "int"),
+    NELLIPSOIDS: ("nellipsoids", "bigint"), NLINES: ("nlines", "bigint"),
+    NTRIS: ("ntris", "bigint"), NBODIES: ("nbodies", "bigint"),
+    ATIME: ("atime", "double"), ATIMESTEP: ("atimestep", "bigint"),
+}
+
+
+class RestartParser(object):
+    """
+    Sequential reading of the values of a restart-file (mapped into memory).
+    """
+    def __init__(self, buf, byte_order="<", pos=0):
+        self.buf = buf
+        self.byte_order = byte_order
+        self.pos = pos
+
+    def _unpack(self, fmt, size):
+        values = struct.unpack_from(self.byte_order + fmt, self.buf, self.pos)
+        self.pos += size
+        return values
+
+    def int(self):
+        return self._unpack("i", 4)[0]
+
+    def bigint(self):
+        return self._unpack("q", 8)[0]
+
+    def double(self):
+        return self._unpack("d", 8)[0]
+
+    def string(self):
+        nchars = self.int()
+        value = self.buf[self.pos:self.pos + nchars].rstrip(b"\x00").decode()
+        self.pos += nchars
+        return value
+
+    def int_vec(self):
+        nvalues = self.int()
+        return list(self._unpack("{}i".format(nvalues), 4*nvalues))
+
+    def double_vec(self):
+        nvalues = self.int()
+        return list(self._unpack("{}d".format(nvalues), 8*nvalues))
+
+    def atom_style(self):
+        style = self.string()
+        return [style] + [self.string() for _ in range(self.int())]
+
+    def peek_int(self, offset=0):
+        return struct.unpack_from(self.byte_order + "i", self.buf, self.pos + offset)[0]
+
+
+def _is_flag(value):
+    """
+    Check if an int looks like a flag of the header (or its end).
+    """
+    return value == -1 or 0 <= value < 256
+
+
+class LmpRestart(object):
+    """
+    Header, masses and per-atom data of a lammps restart-file.
+
+    All per-atom arrays are sorted by atom id.
+    """
+    def __init__(self, rst_lmp, debug=False):
+        """
+        Parse the whole restart-file.
+        """
+        self.rst_lmp = rst_lmp
+        self.header = {}
+        self.groups = []
+        self.masses = None
+
+        with open(rst_lmp, "rb") as rst_in:
+            buf = mmap.mmap(rst_in.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read(buf, debug)
+        finally:
+            buf.close()
+
+    def _read(self, buf, debug=False):
+        """
+        Read all sections of the file.
+        """
+        if buf[:len(MAGIC)] != MAGIC:
+            raise IOError("{} is not a lammps restart-file!".format(self.rst_lmp))
+
+        if buf[-len(MAGIC):] != MAGIC:
+            raise IOError("{} is incomplete (no magic string at its end)!".format(
+                self.rst_lmp))
+
+        # endian flag written by lammps, byte order of the machine it ran on
+        byte_order = "<"
+        if struct.unpack_from("<i", buf, len(MAGIC))[0] != ENDIAN:
+            byte_order = ">"
+
+        parser = RestartParser(buf, byte_order, len(MAGIC) + 4)
+        self.revision = parser.int()
+
+        if debug is True:
+            print("***Info: Restart-file format revision {}.".format(self.revision))
+
+        self._read_header(parser, debug)
+        self._read_groups(parser)
+        self._read_type_arrays(parser)
+        self._read_atoms(buf, byte_order, self._find_atoms(buf, parser))
+
+    def _read_header(self, parser, debug=False):
+        """
+        Read the flags and values of the header.
+        """
+        while True:
+            flag = parser.int()
+
+            if flag == -1:
+                break
+
+            if flag in HEADER_FLAGS:
+                name, kind = HEADER_FLAGS[flag]
+                self.header[name] = getattr(parser, kind)()
+                continue
+
+            # flags of newer lammps versions, value is an int or 8 bytes
+            if debug is True:
+                print("***Warning: Unknown flag {} in restart header.".format(flag))
+
+            if _is_flag(parser.peek_int(4)):
+                self.header[flag] = parser.int()
+            else:
+                self.header[flag] = parser.double()
+
+    def _read_groups(self, parser):
+        """
+        Read the names of all groups (deleted groups have no name).
+        """
+        ngroups = parser.int()
+
+        while len(self.groups) < ngroups:
+            name = parser.string()
+
+            if name:
+                self.groups.append(name)
+
+    def _read_type_arrays(self, parser):
+        """
+        Read the masses of the atom types (other type arrays are skipped).
+        """
+        if parser.peek_int() == MASS:
+            parser.int()
+            self.masses = np.array(parser.double_vec())
+
+    def _find_atoms(self, buf, parser):
+        """
+        Search the file layout after the force fields and fixes (the layout
+        of both depends on the styles used).
+
+        Returns
+        -------
+        chunks : list of tuples
+            offset and number of doubles of the atom data of each processor
+
+        """
+        pos = parser.pos
+
+        while True:
+            pos = buf.find(struct.pack(parser.byte_order + "i", MULTIPROC), pos)
+
+            if pos == -1:
+                raise IOError("No atom data found in {}!".format(self.rst_lmp))
+
+            layout = RestartParser(buf, parser.byte_order, pos + 4)
+            multiproc = layout.int()
+
+            # mpiio flag of older lammps versions
+            if layout.peek_int() == MPIIO:
+                layout.int()
+                layout.int()
+
+            if layout.peek_int() == -1 and layout.peek_int(4) == PERPROC:
+                chunks = self._atom_chunks(buf, layout)
 
+                if chunks is not None:
+                    if multiproc != 0:
+                        raise IOError("Restart-files of several files are not supported!")
 
-def import_lmprst(rst_lmp):
-    f = open(rst_lmp)
-    return f
+                    return chunks
+
+            pos += 4
+
+    def _atom_chunks(self, buf, layout):
+        """
+        Walk over the atom data of all processors (None if the chunks do not
+        fill the file up to the magic string, i.e. a false file layout).
+        """
+        layout.int()
+        chunks = []
+
+        while layout.pos < len(buf) - len(MAGIC):
+            if layout.int() != PERPROC:
+                return None
+
+            ndoubles = layout.int()
+            chunks.append((layout.pos, ndoubles))
+            layout.pos += 8*ndoubles
+
+        if layout.pos != len(buf) - len(MAGIC):
+            return None
+
+        return chunks
+
+    def _read_atoms(self, buf, byte_order, chunks):
+        """
+        Convert the atom data of all processors at once.
+        """
+        data = np.concatenate([np.frombuffer(buf, dtype=byte_order + "f8", count=ndoubles,
+                                             offset=offset)
+                               for offset, ndoubles in chunks] + [np.zeros(0)])
+
+        # first entry of each atom is the number of its entries
+        if len(data) > 0 and len(data) % int(data[0]) == 0 and np.all(
+                data[::int(data[0])] == data[0]):
+            starts = np.arange(0, len(data), int(data[0]))
+        else:
+            starts = []
+            start = 0
+
+            while start < len(data):
+                starts.append(start)
+                start += int(data[start])
+
+            starts = np.array(starts, dtype=np.int64)
+
+        integers = data.view(byte_order + "i8")
+        order = np.argsort(integers[starts + 4], kind="stable")
+        starts = starts[order]
+
+        self.atm_ids = integers[starts + 4]
+        self.atm_types = integers[starts + 5]
+        self.masks = integers[starts + 6]
+        self.images = decode_images(integers[starts + 7], self.header.get("imageint", 4))
+        self.coords = data[starts[:, np.newaxis] + np.arange(1, 4)].astype(np.float64)
+        self.velocities = data[starts[:, np.newaxis] + np.arange(8, 11)].astype(np.float64)
+
+    @property
+    def natoms(self):
+        return len(self.atm_ids)
+
+    @property
+    def ntimestep(self):
+        return self.header.get("ntimestep")
+
+    def get_lammps_box(self):
+        """
+        Box bounds and tilt factors (xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz).
+        """
+        boxlo, boxhi = self.header["boxlo"], self.header["boxhi"]
+        return (boxlo[0], boxhi[0], boxlo[1], boxhi[1], boxlo[2], boxhi[2],
+                self.header.get("xy", 0.0), self.header.get("xz", 0.0),
+                self.header.get("yz", 0.0))
+
+    def get_box(self):
+        """
+        Box of the restart-file (boxtype 'lammps').
+        """
+        xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = self.get_lammps_box()
+        return mdb.Box(boxtype="lammps", lmp_xlo=xlo, lmp_xhi=xhi, lmp_ylo=ylo,
+                       lmp_yhi=yhi, lmp_zlo=zlo, lmp_zhi=zhi, lmp_xy=xy,
+                       lmp_xz=xz, lmp_yz=yz)
+
+    def get_coords(self, unwrap=False):
+        """
+        Coordinates of all atoms, unwrapped by their image flags if wanted.
+        """
+        if unwrap is False:
+            return self.coords.copy()
+
+        xlo, xhi, ylo, yhi, zlo, zhi, xy, xz, yz = self.get_lammps_box()
+        h = np.array([[xhi - xlo, 0.0, 0.0],
+                      [xy, yhi - ylo, 0.0],
+                      [xz, yz, zhi - zlo]])
+        return self.coords + self.images.dot(h)
+
+
+def decode_images(images, imageint_size=4):
+    """
+    Split the packed image flags of the atoms into their x, y and z parts.
+    """
+    nbits = 10 if imageint_size == 4 else 21
+    img_max = 1 << (nbits - 1)
+    img_mask = (1 << nbits) - 1
+    images = np.asarray(images, dtype=np.int64)
+    return np.column_stack(((images & img_mask) - img_max,
+                            ((images >> nbits) & img_mask) - img_max,
+                            (images >> 2*nbits) - img_max))
+
+
+def encode_images(images, imageint_size=4):
+    """
+    Pack the x, y and z image flags of the atoms (inverse of decode_images).
+    """
+    nbits = 10 if imageint_size == 4 else 21
+    images = np.asarray(images, dtype=np.int64) + (1 << (nbits - 1))
+    return images[:, 0] | (images[:, 1] << nbits) | (images[:, 2] << 2*nbits)
 
 
 def read_lmprst(rst_lmp, debug=False):
     """
+    Read a lammps restart-file (see LmpRestart).
+    """
+    return LmpRestart(rst_lmp, debug)
+
+
+def write_lmprst(rst_lmp, coords, atm_types, boxlo, boxhi, tilts=None,
+                 velocities=None, images=None, masses=None, ntimestep=0,
+                 timestep=1.0, units="real", extra=None):
     """
-    #if debug:
-    #    check_open(dcd_file)
-    f = import_lmprst
-    magic_string = f.read(len("LammpS RestartT"))
-    endian = struct.unpack('i', f.read(4))
-    version_numeric = struct.unpack('i', f.read(4))
-    xperiodic = struct.unpack('i', f.read(4))
-
-    # first 4 bytes of entry give length of whole block (bytes)
-    first, = struct.unpack('i', f.read(4))
-    return first
-
-#write_string(VERSION,universe->version);
-#write_int(SMALLINT,sizeof(smallint));
-#write_int(IMAGEINT,sizeof(imageint));
-#write_int(TAGINT,sizeof(tagint));
-#write_int(BIGINT,sizeof(bigint));
-#write_string(UNITS,update->unit_style);
-#write_bigint(NTIMESTEP,update->ntimestep);
-#write_int(DIMENSION,domain->dimension);
-#write_int(NPROCS,nprocs);
-#write_int_vec(PROCGRID,3,comm->procgrid);
-#write_int(NEWTON_PAIR,force->newton_pair);
-#write_int(NEWTON_BOND,force->newton_bond);
-#write_int(XPERIODIC,domain->xperiodic);
-#write_int(YPERIODIC,domain->yperiodic);
-#write_int(ZPERIODIC,domain->zperiodic);
-#write_int_vec(BOUNDARY,6,&domain->boundary[0][0]);
+    Write a restart-file of atom style atomic as lammps does (single
+    processor, no force fields and no fixes), i.e. lammps can read it with
+    read_restart. Reference for LmpRestart.
+
+    Parameters
+    ----------
+    rst_lmp : str
+        name of the restart-file
+    coords : np.array
+        (natoms, 3)-array of the coordinates (atom ids are 1, 2, ...)
+    atm_types : list of ints
+        atom type of each atom (starting with 1)
+    boxlo, boxhi : lists of floats
+        lower and upper bounds of the box
+    tilts : list of floats or None
+        xy, xz and yz of a triclinic box
+    velocities, images : np.array or None
+        (natoms, 3)-arrays of the velocities and image flags (default: zeros)
+    masses : list of floats or None
+        mass of each atom type
+    ntimestep : int
+    timestep : float
+    units : str
+    extra : list of lists of floats or None
+        further values appended to the entries of each atom (as the per-atom
+        restart data of fixes), the number of values may differ between the
+        atoms; lammps skips them if no fix claims them
+
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    natoms = len(coords)
+    atm_types = np.asarray(atm_types, dtype=np.int64)
+    ntypes = int(atm_types.max()) if natoms > 0 else 1
+
+    if velocities is None:
+        velocities = np.zeros((natoms, 3))
+
+    if images is None:
+        images = np.zeros((natoms, 3), dtype=np.int64)
+
+    parts = [MAGIC, struct.pack("<2i", ENDIAN, FORMAT_REVISION)]
+
+    def add_int(flag, value):
+        parts.append(struct.pack("<2i", flag, value))
+
+    def add_bigint(flag, value):
+        parts.append(struct.pack("<iq", flag, value))
+
+    def add_double(flag, value):
+        parts.append(struct.pack("<id", flag, value))
+
+    def add_string(value):
+        value = value.encode() + b"\x00"
+        parts.append(struct.pack("<i", len(value)) + value)
+
+    def add_vec(flag, fmt, values):
+        parts.append(struct.pack("<2i{}{}".format(len(values), fmt), flag,
+                                 len(values), *values))
+
+    # header
+    # lammps parses the date of its version
+    parts.append(struct.pack("<i", VERSION))
+    add_string(LAMMPS_VERSION)
+    add_int(SMALLINT, 4)
+    add_int(IMAGEINT, 4)
+    add_int(TAGINT, 4)
+    add_int(BIGINT, 8)
+    parts.append(struct.pack("<i", UNITS))
+    add_string(units)
+    add_bigint(NTIMESTEP, ntimestep)
+    add_int(DIMENSION, 3)
+    add_int(NPROCS, 1)
+    add_vec(PROCGRID, "i", [1, 1, 1])
+    add_int(NEWTON_PAIR, 1)
+    add_int(NEWTON_BOND, 1)
+    add_int(XPERIODIC, 1)
+    add_int(YPERIODIC, 1)
+    add_int(ZPERIODIC, 1)
+    add_vec(BOUNDARY, "i", [0]*6)
+    add_vec(BOUNDMIN, "d", [0.0]*6)
+    parts.append(struct.pack("<i", ATOM_STYLE))
+    add_string("atomic")
+    parts.append(struct.pack("<i", 0))
+    add_bigint(NATOMS, natoms)
+    add_int(NTYPES, ntypes)
+
+    for nflag, ntypes_flag, per_atom_flag in ((NBONDS, NBONDTYPES, BOND_PER_ATOM),
+                                              (NANGLES, NANGLETYPES, ANGLE_PER_ATOM),
+                                              (NDIHEDRALS, NDIHEDRALTYPES, DIHEDRAL_PER_ATOM),
+                                              (NIMPROPERS, NIMPROPERTYPES, IMPROPER_PER_ATOM)):
+        add_bigint(nflag, 0)
+        add_int(ntypes_flag, 0)
+        add_int(per_atom_flag, 0)
+
+    add_int(TRICLINIC, int(tilts is not None))
+    add_vec(BOXLO, "d", list(boxlo))
+    add_vec(BOXHI, "d", list(boxhi))
+
+    for flag, tilt in zip((XY, XZ, YZ), tilts if tilts is not None else (0.0, 0.0, 0.0)):
+        add_double(flag, tilt)
+
+    add_vec(SPECIAL_LJ, "d", [0.0, 0.0, 0.0])
+    add_vec(SPECIAL_COUL, "d", [0.0, 0.0, 0.0])
+    add_double(TIMESTEP, timestep)
+    add_int(ATOM_ID, 1)
+    add_int(ATOM_MAP_STYLE, 0)
+    add_int(ATOM_MAP_USER, 0)
+    add_int(ATOM_SORTFREQ, 1000)
+    add_double(ATOM_SORTBINSIZE, 0.0)
+    add_int(COMM_MODE, 0)
+    add_double(COMM_CUTOFF, 0.0)
+    add_int(COMM_VEL, 0)
+    parts.append(struct.pack("<i", -1))
+
+    # groups (only 'all')
+    parts.append(struct.pack("<i", 1))
+    add_string("all")
+
+    # type arrays, force fields, fixes (global and per-atom) and file layout
+    if masses is not None:
+        add_vec(MASS, "d", list(masses))
+
+    parts.append(struct.pack("<5i", -1, -1, 0, 0, MULTIPROC))
+    parts.append(struct.pack("<2i", 0, -1))
+
+    # atom data: size, x, y, z, id, type, mask, image, vx, vy, vz (, extra)
+    atoms = np.empty((natoms, 11))
+    integers = atoms.view(np.int64)
+    atoms[:, 0] = 11
+    atoms[:, 1:4] = coords
+    integers[:, 4] = np.arange(1, natoms + 1)
+    integers[:, 5] = atm_types
+    integers[:, 6] = 1
+    integers[:, 7] = encode_images(images)
+    atoms[:, 8:11] = velocities
+
+    if extra is not None:
+        atoms = [np.concatenate((catom, cextra)) for catom, cextra in zip(atoms, extra)]
+
+        for catom in atoms:
+            catom[0] = len(catom)
+
+        atoms = np.concatenate(atoms + [np.zeros(0)])
+
+    parts.append(struct.pack("<2i", PERPROC, atoms.size))
+    parts.append(atoms.astype("<f8").tobytes())
+    parts.append(MAGIC)
+
+    with open(rst_lmp, "wb") as rst_out:
+        rst_out.write(b"".join(parts))
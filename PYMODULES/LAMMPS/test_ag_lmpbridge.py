@@ -0,0 +1,185 @@
+"""
+Tests of ag_lmpbridge against a mock lammps instance (run with pytest).
+"""
+
+import ctypes
+import numpy as np
+import pytest
+import md_box as mdb
+import md_stars as mds
+import ag_lammps as aglmp
+import ag_lmpbridge as aglb
+import ag_lmprst_helpers as aglrh
+
+
+class MockLammps(object):
+    """
+    Stand-in for lammps.lammps with the methods used by ag_lmpbridge.
+
+    Per-atom properties are kept ordered by atom id; change_box commands are
+    applied to the box (only the keywords written by set_lammps_box).
+    """
+    def __init__(self, natoms=0, boxlo=(0.0, 0.0, 0.0), boxhi=(10.0, 10.0, 10.0),
+                 tilts=None, atm_types=None):
+        self.triclinic = int(tilts is not None)
+        self.boxlo = list(boxlo)
+        self.boxhi = list(boxhi)
+        self.xy, self.xz, self.yz = tilts if tilts is not None else (0.0, 0.0, 0.0)
+        self.properties = {
+            "x": np.zeros((natoms, 3)),
+            "v": np.zeros((natoms, 3)),
+            "image": aglrh.encode_images(np.zeros((natoms, 3))).astype(np.int32),
+            "type": np.ones(natoms, dtype=np.int32) if atm_types is None else
+                    np.asarray(atm_types, dtype=np.int32),
+        }
+        self.thermo = {"pe": -1.5, "vol": 1000.0}
+        self.commands = []
+
+    def get_natoms(self):
+        return len(self.properties["x"])
+
+    def extract_box(self):
+        return (list(self.boxlo), list(self.boxhi), self.xy, self.yz, self.xz,
+                [1, 1, 1], 0)
+
+    def extract_global(self, name, dtype=aglb.LAMMPS_INT):
+        return getattr(self, name)
+
+    def reset_box(self, boxlo, boxhi, xy, yz, xz):
+        self.boxlo, self.boxhi = list(boxlo), list(boxhi)
+        self.xy, self.yz, self.xz = xy, yz, xz
+
+    def gather_atoms(self, name, dtype, count):
+        values = self.properties[name]
+        ctype = ctypes.c_int if dtype == aglb.LAMMPS_INT else ctypes.c_double
+        return np.ctypeslib.as_ctypes(np.ascontiguousarray(values, dtype=ctype).ravel())
+
+    def scatter_atoms(self, name, dtype, count, data):
+        values = np.ctypeslib.as_array(data).copy()
+        self.properties[name] = values.reshape(-1, count) if count > 1 else values
+
+    def create_atoms(self, natoms, atm_ids, atm_types, coords, velocities):
+        self.properties["x"] = np.append(self.properties["x"],
+                                         np.reshape(coords, (natoms, 3)), axis=0)
+        self.properties["v"] = np.append(self.properties["v"], np.zeros((natoms, 3)), axis=0)
+        self.properties["type"] = np.append(self.properties["type"], atm_types)
+        self.properties["image"] = np.append(self.properties["image"],
+                                             aglrh.encode_images(np.zeros((natoms, 3))))
+        return natoms
+
+    def command(self, cmd):
+        self.commands.append(cmd)
+        words = cmd.split()
+
+        if words[:2] != ["change_box", "all"]:
+            return
+
+        for idx, word in enumerate(words):
+            if word in ("x", "y", "z") and words[idx + 1] == "final":
+                dim = "xyz".index(word)
+                self.boxlo[dim] = float(words[idx + 2])
+                self.boxhi[dim] = float(words[idx + 3])
+            elif word in ("xy", "xz", "yz") and words[idx + 1] == "final":
+                setattr(self, word, float(words[idx + 2]))
+
+    def get_thermo(self, keyword):
+        return self.thermo[keyword]
+
+
+def _universe(coords, box):
+    universe = aglmp.LmpStuff()
+    universe.atoms = [mds.Atom(atm_id=idx + 1, atm_key=1 + idx % 2) for idx in range(len(coords))]
+    universe.ts_coords = [np.asarray(coords, dtype=np.float64)]
+    universe.ts_boxes = [box]
+    return universe
+
+
+def _lmp_box(xlo, xhi, ylo, yhi, zlo, zhi, xy=0.0, xz=0.0, yz=0.0):
+    return mdb.Box(boxtype="lammps", lmp_xlo=xlo, lmp_xhi=xhi, lmp_ylo=ylo, lmp_yhi=yhi,
+                   lmp_zlo=zlo, lmp_zhi=zhi, lmp_xy=xy, lmp_xz=xz, lmp_yz=yz)
+
+
+def test_push_pull_round_trip():
+    rng = np.random.RandomState(1)
+    coords = rng.uniform(0.0, 12.0, (8, 3))
+    lmp = MockLammps(natoms=8, tilts=(0.0, 0.0, 0.0))
+    lmp.properties["image"] = aglrh.encode_images(rng.randint(-2, 3, (8, 3))).astype(np.int32)
+    box = _lmp_box(-1.0, 12.0, 0.0, 11.0, 0.5, 13.0, xy=1.0, xz=-0.5, yz=0.25)
+    velocities = rng.normal(0.0, 1.0, (8, 3))
+    universe = _universe(coords, box)
+
+    aglb.push_universe(lmp, universe, velocities=velocities)
+    assert np.array_equal(lmp.properties["x"], coords)
+    assert np.array_equal(lmp.properties["v"], velocities)
+    # image flags are reset
+    assert np.array_equal(aglrh.decode_images(lmp.properties["image"]), np.zeros((8, 3)))
+    assert "xy final 1 xz final -0.5 yz final 0.25" in lmp.commands[-1]
+
+    aglb.pull_universe(lmp, universe, unwrap=True)
+    assert len(universe.ts_coords) == 2
+    assert np.array_equal(universe.ts_coords[-1], coords)
+
+    pulled_box = universe.ts_boxes[-1]
+    for attr in ("lmp_xlo", "lmp_xhi", "lmp_ylo", "lmp_yhi", "lmp_zlo", "lmp_zhi",
+                 "lmp_xy", "lmp_xz", "lmp_yz"):
+        assert getattr(pulled_box, attr) == getattr(box, attr)
+
+
+def test_pull_unwrap():
+    images = np.array([[1, 0, 0], [0, -1, 2], [-1, 1, -1]])
+    lmp = MockLammps(natoms=3, boxhi=(10.0, 8.0, 6.0), tilts=(1.5, -0.5, 0.25))
+    lmp.properties["x"] = np.arange(9.0).reshape(3, 3)
+    lmp.properties["image"] = aglrh.encode_images(images).astype(np.int32)
+    h = np.array([[10.0, 0.0, 0.0], [1.5, 8.0, 0.0], [-0.5, 0.25, 6.0]])
+
+    assert np.allclose(aglb.gather_coords(lmp, unwrap=True),
+                       lmp.properties["x"] + images.dot(h))
+    assert np.array_equal(aglb.gather_coords(lmp), lmp.properties["x"])
+
+
+def test_push_creates_atoms():
+    lmp = MockLammps()
+    coords = np.array([[1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [3.0, 3.0, 3.0]])
+    box = mdb.Box("lattice", ltc_a=12.0, ltc_b=12.0, ltc_c=12.0, ltc_alpha=np.pi/2,
+                  ltc_beta=np.pi/2, ltc_gamma=np.pi/2)
+    aglb.push_universe(lmp, _universe(coords, box))
+
+    assert lmp.get_natoms() == 3
+    assert np.array_equal(aglb.gather_atoms(lmp, "type", aglb.LAMMPS_INT, 1), [1, 2, 1])
+    assert np.array_equal(aglb.gather_coords(lmp), coords)
+    assert np.allclose(np.subtract(lmp.boxhi, lmp.boxlo), 12.0)
+    # right angles give tilt factors of about 1e-16
+    assert (lmp.xy, lmp.xz, lmp.yz) == (0.0, 0.0, 0.0)
+
+
+def test_tilts_of_orthogonal_box():
+    lmp = MockLammps(natoms=2)
+    box = _lmp_box(0.0, 10.0, 0.0, 10.0, 0.0, 10.0, xy=2.0)
+
+    with pytest.raises(ValueError):
+        aglb.set_lammps_box(lmp, box)
+
+    with pytest.raises(ValueError):
+        aglb.set_lammps_box(MockLammps(), box)
+
+    aglb.set_lammps_box(lmp, _lmp_box(0.0, 11.0, 0.0, 12.0, 0.0, 13.0))
+    assert "xy" not in lmp.commands[-1]
+    assert lmp.boxhi == [11.0, 12.0, 13.0]
+
+
+def test_atom_count_mismatch():
+    lmp = MockLammps(natoms=4)
+    universe = _universe(np.zeros((3, 3)), _lmp_box(0.0, 10.0, 0.0, 10.0, 0.0, 10.0))
+
+    with pytest.raises(ValueError):
+        aglb.push_universe(lmp, universe)
+
+    with pytest.raises(ValueError):
+        aglb.pull_universe(lmp, universe)
+
+    with pytest.raises(ValueError):
+        aglb.scatter_atoms(lmp, "x", np.zeros((3, 3)))
+
+
+def test_get_thermo():
+    assert aglb.get_thermo(MockLammps(), ["pe", "vol"]) == {"pe": -1.5, "vol": 1000.0}
@@ -0,0 +1,102 @@
+"""
+Round trips of write_lmprst and read_lmprst (run with pytest).
+"""
+
+import numpy as np
+import ag_lmprst_helpers as aglrh
+
+
+def _random_system(natoms, seed=42):
+    """
+    Coordinates, atom types, velocities and image flags of natoms atoms.
+    """
+    rng = np.random.RandomState(seed)
+    coords = rng.uniform(0.0, 10.0, (natoms, 3))
+    atm_types = rng.randint(1, 4, natoms)
+    velocities = rng.normal(0.0, 1.0e-3, (natoms, 3))
+    images = rng.randint(-3, 4, (natoms, 3))
+    return coords, atm_types, velocities, images
+
+
+def _check_atoms(rst, coords, atm_types, velocities, images):
+    assert rst.natoms == len(coords)
+    assert np.array_equal(rst.atm_ids, np.arange(1, len(coords) + 1))
+    assert np.array_equal(rst.atm_types, atm_types)
+    assert np.array_equal(rst.coords, coords)
+    assert np.array_equal(rst.velocities, velocities)
+    assert np.array_equal(rst.images, images)
+
+
+def test_orthogonal(tmp_path):
+    coords, atm_types, velocities, images = _random_system(50)
+    rst_lmp = str(tmp_path / "ortho.rst")
+    aglrh.write_lmprst(rst_lmp, coords, atm_types, [0.0, -1.0, 2.0], [10.0, 9.0, 12.0],
+                       velocities=velocities, images=images,
+                       masses=[12.011, 1.008, 15.999], ntimestep=1234)
+    rst = aglrh.read_lmprst(rst_lmp)
+
+    _check_atoms(rst, coords, atm_types, velocities, images)
+    assert np.array_equal(rst.masses, [12.011, 1.008, 15.999])
+    assert rst.ntimestep == 1234
+    assert rst.header["atom_style"] == ["atomic"]
+    assert rst.groups == ["all"]
+    assert rst.get_lammps_box() == (0.0, 10.0, -1.0, 9.0, 2.0, 12.0, 0.0, 0.0, 0.0)
+
+    lengths = np.array([10.0, 10.0, 10.0])
+    assert np.allclose(rst.get_coords(unwrap=True), coords + images * lengths)
+    assert np.array_equal(rst.get_coords(), coords)
+
+
+def test_triclinic(tmp_path):
+    coords, atm_types, velocities, images = _random_system(20, seed=7)
+    rst_lmp = str(tmp_path / "tric.rst")
+    aglrh.write_lmprst(rst_lmp, coords, atm_types, [0.0, 0.0, 0.0], [10.0, 8.0, 6.0],
+                       tilts=[1.5, -0.5, 0.25], velocities=velocities, images=images)
+    rst = aglrh.read_lmprst(rst_lmp)
+
+    _check_atoms(rst, coords, atm_types, velocities, images)
+    assert rst.masses is None
+    assert rst.header["triclinic"] == 1
+    assert rst.get_lammps_box()[6:] == (1.5, -0.5, 0.25)
+
+    # rows of h are the box vectors a, b and c
+    h = np.array([[10.0, 0.0, 0.0], [1.5, 8.0, 0.0], [-0.5, 0.25, 6.0]])
+    assert np.allclose(rst.get_coords(unwrap=True), coords + images.dot(h))
+
+    box = rst.get_box()
+    assert (box.lmp_xy, box.lmp_xz, box.lmp_yz) == (1.5, -0.5, 0.25)
+
+
+def test_variable_size_records(tmp_path):
+    # atoms with a different number of entries are walked one by one
+    coords, atm_types, velocities, images = _random_system(30, seed=3)
+    extra = [np.arange(i % 4, dtype=np.float64) for i in range(len(coords))]
+    rst_lmp = str(tmp_path / "extra.rst")
+    aglrh.write_lmprst(rst_lmp, coords, atm_types, [0.0, 0.0, 0.0], [10.0, 10.0, 10.0],
+                       velocities=velocities, images=images, extra=extra)
+    rst = aglrh.read_lmprst(rst_lmp)
+
+    _check_atoms(rst, coords, atm_types, velocities, images)
+
+
+def test_same_size_extra_records(tmp_path):
+    coords, atm_types, velocities, images = _random_system(10, seed=5)
+    extra = np.ones((len(coords), 2))
+    rst_lmp = str(tmp_path / "extra2.rst")
+    aglrh.write_lmprst(rst_lmp, coords, atm_types, [0.0, 0.0, 0.0], [10.0, 10.0, 10.0],
+                       velocities=velocities, images=images, extra=extra)
+    rst = aglrh.read_lmprst(rst_lmp)
+
+    _check_atoms(rst, coords, atm_types, velocities, images)
+
+
+def test_no_atoms(tmp_path):
+    rst_lmp = str(tmp_path / "empty.rst")
+    aglrh.write_lmprst(rst_lmp, np.zeros((0, 3)), [], [0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+    assert aglrh.read_lmprst(rst_lmp).natoms == 0
+
+
+def test_images():
+    images = np.array([[0, 0, 0], [-511, 511, 1], [3, -2, -512]])
+    assert np.array_equal(aglrh.decode_images(aglrh.encode_images(images)), images)
+    assert np.array_equal(aglrh.decode_images(aglrh.encode_images(images, 8), 8), images)
@@ -1,8 +1,21 @@
 
 import collections
+import numpy as np
 
 __version__ = "2017-05-05"
 
+# keywords with integer values
+INT_KEYS = ("Atoms", "Bonds", "Angles", "Step")
+
+
+def column_array(keyword, values):
+    """
+    Contiguous array of the values of keyword (int64 for INT_KEYS, float64
+    otherwise); arrays of the right type are not copied.
+    """
+    dtype = np.int64 if keyword in INT_KEYS else np.float64
+    return np.ascontiguousarray(values, dtype=dtype)
+
 
 class LogUniverse(object):
     """
@@ -10,83 +23,123 @@ class LogUniverse(object):
     """
     def __init__(self):
         """
-        data = [{ikey: [value1, value2, ...], jkey: [value1, value2, ...], ...}]
+        data = [{ikey: array([value1, value2, ...]), jkey: array([...]), ...}]
         keys   str; keywords such as 'Step', 'Temp'
-        value: list/tuple of floats/ints;
+        value: 1D-arrays of the same length for each run (see column_array);
+               lists are accepted by all methods as well
         """
         self.data = []
 
+    def _to_arrays(self):
+        """
+        Convert the values of all runs to contiguous arrays (see column_array).
+        """
+        for cidx, cdata in enumerate(self.data):
+            self.data[cidx] = collections.OrderedDict(
+                (ckey, column_array(ckey, cvalues)) for ckey, cvalues in cdata.items())
+
     def sort_by_key(self):
         """
-        Sort data by key.
+        Sort the keywords of each run alphabetically (values are not copied).
         Sources:    http://stackoverflow.com/questions/9001509/how-can-i-sort-a-dictionary-by-key
         """
-        #TODO CHECK IF DICTIONARY WAS ALTERED, HAS NOT BEEN TESTED YET!
-        for cdata in self.data:
-            for subdata in cdata:
-                cdata = collections.OrderedDict(sorted(cdata.items()))
+        for cidx, cdata in enumerate(self.data):
+            self.data[cidx] = collections.OrderedDict(sorted(cdata.items()))
 
     def cut_data(self, start, stop, keyword=None):
         """
         Shrink all data-values by start and stop values
-        keyword:    str; should be ascending value, e.g. 'Step', 'Temp'
-        start:      float/int; first value in list of keyword, e.g. 2500 (Step)
-        stop:       float/int; last value in list of keyword, e.g. 350.6 (K)
+        keyword:    str; should be ascending value, e.g. 'Step'
+        start:      float/int; first value of keyword to keep, e.g. 2500 (Step),
+                    index if no keyword is given
+        stop:       float/int; last value of keyword to keep, e.g. 5000 (Step),
+                    index (not included) if no keyword is given
+
+        Runs keep views of the values, i.e. nothing is copied.
         """
-        #TODO currently not working properly
-        if keyword is not None:
-            for cdata in self.data:
-
-                for ikey in cdata:
-                    if ikey == keyword:
-                        start_ptr = cdata[ikey].index(start)
-                        stop_ptr  = cdata[ikey].index(stop)
-                    break
-
-                for jkey in cdata:
-                    cdata[jkey] = cdata[jkey][start_ptr:stop_ptr]
-        else:
-            for cdata in self.data:
-                for jkey in cdata:
-                    cdata[jkey] = cdata[jkey][start:stop]
+        for cidx, cdata in enumerate(self.data):
+            cdata = collections.OrderedDict(
+                (ckey, column_array(ckey, cvalues)) for ckey, cvalues in cdata.items())
+
+            if keyword is not None:
+                start_ptr = np.searchsorted(cdata[keyword], start, side="left")
+                stop_ptr = np.searchsorted(cdata[keyword], stop, side="right")
+            else:
+                start_ptr, stop_ptr = start, stop
+
+            for ckey in cdata:
+                cdata[ckey] = cdata[ckey][start_ptr:stop_ptr]
+
+            self.data[cidx] = cdata
 
-    def _int_values(self):
+    def get_values(self, keyword, dataframes=None):
         """
-        Convert values of keys Atoms, Bonds, Angles and Step to ints.
+        Values of keyword of several runs as one array.
+
+        dataframes: None or list of ints; runs to use (None: all runs with
+                    keyword)
+
+        The values of a single run are returned without being copied.
         """
-        for cdata in self.data:
-            for ckey in cdata:
-                if ckey in ("Atoms", "Bonds", "Angles", "Step"):
-                    cdata[ckey] = [int(i) for i in cdata[ckey]]
+        if dataframes is None:
+            dataframes = [cidx for cidx, cdata in enumerate(self.data) if keyword in cdata]
+
+        values = [column_array(keyword, self.data[cidx][keyword]) for cidx in dataframes]
 
-    def measure(self, dataframe=-1, start=0, stop=-1, keyword="PotEng", name="mean"):
-        """[summary]
+        if len(values) == 1:
+            return values[0]
+        elif not values:
+            return column_array(keyword, [])
 
-        [description]
+        return np.concatenate(values)
+
+    def measure(self, dataframe=-1, start=0, stop=None, keyword="PotEng", name="mean"):
+        """
+        Calculate a statistic of the values of keyword.
 
         Parameters
         ----------
-        dataframe : int, optional
-            [description] (the default is -1, which [default_description])
+        dataframe : int or None, optional
+            index of the run to use (the default is -1, which uses the last
+            run); None uses the values of all runs with keyword one after
+            another
         start : int, optional
-            [description] (the default is 0, which [default_description])
-        stop : int, optional
-            [description] (the default is -1, which [default_description])
+            index of the first value to use (the default is 0)
+        stop : int or None, optional
+            index of the value to stop at (not included) (the default is None,
+            which uses all values up to the last one)
         keyword : {str}, optional
-            [description] (the default is "PotEng", which [default_description])
+            keyword of the values (the default is "PotEng")
         name : {str}, optional
-            [description] (the default is "mean", which [default_description])
+            statistic to calculate; 'mean', 'median', 'sigma' (standard
+            deviation), 'min' or 'max' (the default is "mean")
+
+        Returns
+        -------
+        result : float
+            the statistic of the chosen values
 
         Raises
         ------
         IOError
-            [description]
+            if name is not known
         """
+        if dataframe is None:
+            values = self.get_values(keyword)
+        else:
+            values = column_array(keyword, self.data[dataframe][keyword])
+
+        values = values[start:stop]
+
         if name == "mean":
-            np.mean(self.data[dataframe][keyword][start:stop])
+            return np.mean(values)
         elif name == "median":
-            np.median(self.data[dataframe][keyword][start:stop])
+            return np.median(values)
         elif name == "sigma":
-            np.std(self.data[dataframe][keyword][start:])
+            return np.std(values)
+        elif name == "min":
+            return np.min(values)
+        elif name == "max":
+            return np.max(values)
         else:
             raise IOError("Unknown name: {}".format(name))
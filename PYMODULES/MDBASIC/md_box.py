@@ -1,5 +1,5 @@
 
-#import numpy as np
+import numpy as np
 import scipy.constants as sc
 import ag_vectalg as agv
 import ag_cryst as agc
@@ -279,3 +279,64 @@ class Box(object):
         Calculate the volume of the cell.
         """
         self.volume = agc.box_lat_volume(self.ltc_a, self.ltc_b, self.ltc_c, self.ltc_alpha, self.ltc_beta, self.ltc_gamma)
+
+
+class BoxSeries(object):
+    """
+    Boxes of consecutive frames (e.g. of an npt trajectory) as arrays.
+
+    All boxes are converted at once (lattice -> lammps, same equations as
+    ag_cryst.box_lat2lmp), each attribute holds one value per frame.
+    Indexing gives the box of a single frame as Box-instance of boxtype
+    'lammps' (the same as reading the frame and calling box_lat2lmp).
+    """
+    def __init__(self, ltc_a, ltc_b, ltc_c, ltc_alpha, ltc_beta, ltc_gamma):
+        """
+        ltc_a, ltc_b, ltc_c: arrays of floats; lattice box vectors of each frame
+        ltc_alpha, ltc_beta, ltc_gamma: arrays of floats; lattice angles (radians)
+        """
+        self.ltc_a = np.asarray(ltc_a, dtype=np.float64)
+        self.ltc_b = np.asarray(ltc_b, dtype=np.float64)
+        self.ltc_c = np.asarray(ltc_c, dtype=np.float64)
+        self.ltc_alpha = np.asarray(ltc_alpha, dtype=np.float64)
+        self.ltc_beta = np.asarray(ltc_beta, dtype=np.float64)
+        self.ltc_gamma = np.asarray(ltc_gamma, dtype=np.float64)
+
+        # lattice -> lammps
+        lx = self.ltc_a
+        self.lmp_xy = self.ltc_b * np.cos(self.ltc_gamma)
+        self.lmp_xz = self.ltc_c * np.cos(self.ltc_beta)
+        ly = np.sqrt(self.ltc_b**2 - self.lmp_xy**2)
+        self.lmp_yz = (self.ltc_b*self.ltc_c*np.cos(self.ltc_alpha) - self.lmp_xy*self.lmp_xz)/ly
+        lz = np.sqrt(self.ltc_c**2 - self.lmp_xz**2 - self.lmp_yz**2)
+
+        self.lmp_xhi = lx/2
+        self.lmp_yhi = ly/2
+        self.lmp_zhi = lz/2
+        self.lmp_xlo = -self.lmp_xhi
+        self.lmp_ylo = -self.lmp_yhi
+        self.lmp_zlo = -self.lmp_zhi
+
+    def __len__(self):
+        return len(self.ltc_a)
+
+    def __getitem__(self, idx):
+        """
+        Box (boxtype 'lammps') of a single frame.
+        """
+        return Box(boxtype="lammps",
+                   lmp_xlo=float(self.lmp_xlo[idx]), lmp_xhi=float(self.lmp_xhi[idx]),
+                   lmp_ylo=float(self.lmp_ylo[idx]), lmp_yhi=float(self.lmp_yhi[idx]),
+                   lmp_zlo=float(self.lmp_zlo[idx]), lmp_zhi=float(self.lmp_zhi[idx]),
+                   lmp_xy=float(self.lmp_xy[idx]), lmp_xz=float(self.lmp_xz[idx]),
+                   lmp_yz=float(self.lmp_yz[idx]))
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def get_volumes(self):
+        """
+        Volume of the box of each frame.
+        """
+        return (self.lmp_xhi - self.lmp_xlo) * (self.lmp_yhi - self.lmp_ylo) * (self.lmp_zhi - self.lmp_zlo)
@@ -1,11 +1,15 @@
 
 import time
+import itertools as it
 import math
 import numpy as np
 import ag_cryst as agc
 
 __version__ = "2019-04-30"
 
+# default number of pairs per block yielded by CellList
+CHUNK_SIZE = 65536
+
 
 class LinkedCells(object):
     """
@@ -180,3 +184,363 @@ class LinkedCells(object):
         if debug is True:
             print("***Linked-Cells Info: Took {} seconds to build {} linked cells.".format((end - start),
                   total_cells))
+
+
+class CellList(object):
+    """
+    Vectorized linked cells for pair searches in a periodic box.
+
+    The atoms are binned once by their fractional coordinates; afterwards all
+    pairs are found with numpy arrays instead of nested python loops. Each sub
+    cell is at least as wide as the cutoff, so only the 26 neighbor cells have
+    to be checked. Periodic images are treated by the minimum image convention,
+    i.e. the cutoff must not exceed half of the smallest box width.
+    """
+    def __init__(self,
+                 atm_coords,
+                 ltc_a, ltc_b, ltc_c,
+                 ltc_alpha, ltc_beta, ltc_gamma,
+                 cutoff,
+                 coords_type="cartesian"):
+        """
+        Bin all atoms into sub cells with side lengths of at least cutoff.
+
+        Parameters
+        ----------
+        atm_coords : array of floats
+            (n, 3)-array with the coordinates of all atoms
+        ltc_a, ltc_b, ltc_c : float
+            lattice vectors of the box
+        ltc_alpha, ltc_beta, ltc_gamma : float
+            lattice angles of the box in radians
+        cutoff : float
+            largest distance that will be searched for
+        coords_type : str
+            'cartesian' or 'fractional'
+
+        Raises
+        ------
+        ValueError
+            if cutoff exceeds half of the smallest perpendicular width of the
+            box (pairs would be missed by the minimum image convention)
+
+        """
+        self.cutoff = cutoff
+        self.M_fc = np.array(agc.M_fract2cart(ltc_a, ltc_b, ltc_c,
+                                              ltc_alpha, ltc_beta, ltc_gamma))
+        atm_coords = np.asarray(atm_coords, dtype=np.float64).reshape(-1, 3)
+
+        if coords_type != "fractional":
+            atm_coords = self.to_fractional(atm_coords)
+
+        # wrap all atoms back into the box
+        self.atm_coords = atm_coords - np.floor(atm_coords)
+
+        # perpendicular widths of the box define the number of sub cells
+        volume = abs(np.linalg.det(self.M_fc))
+        vt_a, vt_b, vt_c = self.M_fc.T
+        widths = volume / np.array([np.linalg.norm(np.cross(vt_b, vt_c)),
+                                    np.linalg.norm(np.cross(vt_c, vt_a)),
+                                    np.linalg.norm(np.cross(vt_a, vt_b))])
+        self.widths = widths
+
+        if 2 * cutoff > widths.min() + 1e-6:
+            raise ValueError("Cutoff ({}) must not exceed half of the smallest "
+                             "box width ({})!".format(cutoff, widths.min() / 2))
+
+        self.ncells = np.maximum(np.floor(widths / cutoff), 1).astype(int)
+
+        # boxes with lots of vacuum would give mostly empty cells, use larger
+        # cells instead (at most two cells per atom)
+        max_cells = 2 * max(len(self.atm_coords), 1)
+
+        if np.prod(self.ncells) > max_cells:
+            factor = (np.prod(self.ncells, dtype=float) / max_cells)**(1/3)
+            self.ncells = np.maximum(np.floor(self.ncells / factor), 1).astype(int)
+
+        # sort atoms by their sub cell (compressed storage of all cells)
+        self.atm_cells = self._cell_idxs(self.atm_coords)
+        flat_cells = self._flat_idxs(self.atm_cells)
+        self.order = np.argsort(flat_cells, kind="stable")
+        self.counts = np.bincount(flat_cells, minlength=np.prod(self.ncells))
+        self.starts = np.cumsum(self.counts) - self.counts
+
+        # neighbor offsets along each box vector; with less than three sub
+        # cells the offsets -1 and +1 point to the same cell
+        offsets = []
+        for ncell in self.ncells:
+            if ncell >= 3:
+                offsets.append((-1, 0, 1))
+            else:
+                offsets.append(tuple(range(ncell)))
+
+        self.offsets = [np.array(i) for i in it.product(*offsets)]
+
+    def to_fractional(self, atm_coords):
+        """
+        Convert cartesian coordinates to fractional coordinates of the box.
+        """
+        return np.linalg.solve(self.M_fc, np.transpose(atm_coords)).T
+
+    def _cell_idxs(self, frac_coords):
+        """
+        Get the sub cell (index along a, b and c) of wrapped fractional coordinates.
+        """
+        cell_idxs = np.floor(frac_coords * self.ncells).astype(int)
+        # coordinates of exactly 1.0 (rounding) belong to the last cell
+        return np.minimum(cell_idxs, self.ncells - 1)
+
+    def _flat_idxs(self, cell_idxs):
+        """
+        Convert sub cell indices along a, b and c to a single index.
+        """
+        return ((cell_idxs[:, 0] * self.ncells[1] + cell_idxs[:, 1]) *
+                self.ncells[2] + cell_idxs[:, 2])
+
+    def _candidates(self, nbr_cells):
+        """
+        Get all atoms of the given neighbor cell of each query.
+
+        Returns
+        -------
+        query_idxs : array of ints
+            index of the query for each candidate
+        atm_idxs : array of ints
+            index of each candidate atom
+
+        """
+        counts = self.counts[nbr_cells]
+        query_idxs = np.repeat(np.arange(len(nbr_cells)), counts)
+        # position of each candidate inside its neighbor cell
+        group_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        ranks = np.arange(len(query_idxs)) - group_starts
+        atm_idxs = self.order[np.repeat(self.starts[nbr_cells], counts) + ranks]
+        return (query_idxs, atm_idxs)
+
+    def _iter_candidates(self, cell_idxs, chunk_size=None):
+        """
+        Get the candidates of all neighbor cells (see _candidates) offset by offset.
+
+        With a chunk_size, the queries of each offset are sliced so that each
+        slice has about chunk_size candidates (at least one query per slice).
+        """
+        for offset in self.offsets:
+            nbr_cells = self._flat_idxs((cell_idxs + offset) % self.ncells)
+            bounds = [0, len(nbr_cells)]
+
+            if chunk_size is not None and len(nbr_cells) > 0:
+                ends = np.cumsum(self.counts[nbr_cells])
+                splits = np.searchsorted(ends, np.arange(chunk_size, ends[-1], chunk_size),
+                                         side="right")
+                bounds = np.unique(np.concatenate(([0], splits, [len(nbr_cells)])))
+
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                query_idxs, atm_idxs = self._candidates(nbr_cells[start:stop])
+                yield (query_idxs + start, atm_idxs)
+
+    def get_vectors(self, frac_coords_a, frac_coords_b):
+        """
+        Get minimum image (cartesian) vectors from a to b of fractional coordinates (row wise).
+        """
+        vt_ab = frac_coords_b - frac_coords_a
+        vt_ab -= np.rint(vt_ab)
+        return np.matmul(vt_ab, self.M_fc.T)
+
+    def get_distances(self, frac_coords_a, frac_coords_b):
+        """
+        Get minimum image distances between fractional coordinates (row wise).
+        """
+        vt_ab = self.get_vectors(frac_coords_a, frac_coords_b)
+        return np.sqrt(np.einsum("ij,ij->i", vt_ab, vt_ab))
+
+    def _check_cutoff(self, cutoff):
+        """
+        Use the cutoff of the cells if none is given, larger ones are not possible.
+        """
+        if cutoff is None:
+            return self.cutoff
+
+        if cutoff > self.cutoff:
+            raise ValueError("Cutoff must not be larger than {}!".format(self.cutoff))
+
+        return cutoff
+
+    def iter_pairs(self, cutoff=None, groups=None, chunk_size=CHUNK_SIZE):
+        """
+        Find all pairs of atoms that are closer than cutoff.
+
+        Pairs are yielded blockwise so consumers may reduce them on the fly or
+        stop early. Each pair is only found once (idx_i < idx_j).
+
+        Parameters
+        ----------
+        cutoff : float or None
+            maximum distance between two atoms, must not be larger than the
+            cutoff the cells were built with (default: that cutoff)
+        groups : array of ints or None
+            group (e.g. molecule) of each atom; pairs of the same group are
+            skipped
+        chunk_size : int or None
+            number of pairs per block (the last block may be smaller); the
+            candidates are generated in slices of about that size, too, so
+            the memory needed is bounded; None gives one block per neighbor
+            cell offset
+
+        Yields
+        ------
+        idxs_i, idxs_j : array of ints
+            atom indices of each pair
+        dists : array of floats
+            distance of each pair
+
+        """
+        cutoff = self._check_cutoff(cutoff)
+        blocks = self._iter_pairs(cutoff, groups, chunk_size)
+
+        if chunk_size is None:
+            return blocks
+
+        return rechunk(blocks, chunk_size)
+
+    def _iter_pairs(self, cutoff, groups, chunk_size):
+        """
+        Pairs of each slice of candidates (see iter_pairs).
+        """
+        for idxs_i, idxs_j in self._iter_candidates(self.atm_cells, chunk_size):
+            # each pair appears twice (once from each cell), keep one
+            mask = idxs_i < idxs_j
+
+            if groups is not None:
+                mask &= groups[idxs_i] != groups[idxs_j]
+
+            idxs_i = idxs_i[mask]
+            idxs_j = idxs_j[mask]
+            dists = self.get_distances(self.atm_coords[idxs_i], self.atm_coords[idxs_j])
+            mask = dists <= cutoff
+            yield (idxs_i[mask], idxs_j[mask], dists[mask])
+
+    def get_pairs(self, cutoff=None, groups=None):
+        """
+        Find all pairs of atoms that are closer than cutoff (see iter_pairs).
+        """
+        blocks = list(self.iter_pairs(cutoff, groups, chunk_size=None))
+        return tuple(np.concatenate(i) for i in zip(*blocks))
+
+    def iter_query(self, query_coords, cutoff=None, coords_type="cartesian",
+                   chunk_size=CHUNK_SIZE):
+        """
+        Find all binned atoms that are closer than cutoff to the query coordinates.
+
+        The query coordinates (e.g. of newly placed atoms) are not binned, so
+        checking them costs only as much as there are query coordinates.
+
+        Parameters
+        ----------
+        query_coords : array of floats
+            (m, 3)-array with the coordinates to check
+        cutoff : float or None
+            see iter_pairs
+        coords_type : str
+            'cartesian' or 'fractional'
+        chunk_size : int or None
+            see iter_pairs
+
+        Yields
+        ------
+        query_idxs : array of ints
+            index of the query coordinates of each pair
+        atm_idxs : array of ints
+            index of the binned atom of each pair
+        dists : array of floats
+            distance of each pair
+
+        """
+        cutoff = self._check_cutoff(cutoff)
+        query_coords = np.asarray(query_coords, dtype=np.float64).reshape(-1, 3)
+
+        if coords_type != "fractional":
+            query_coords = self.to_fractional(query_coords)
+
+        query_coords = query_coords - np.floor(query_coords)
+        blocks = self._iter_query(query_coords, cutoff, chunk_size)
+
+        if chunk_size is None:
+            return blocks
+
+        return rechunk(blocks, chunk_size)
+
+    def _iter_query(self, query_coords, cutoff, chunk_size):
+        """
+        Contacts of each slice of candidates (see iter_query).
+        """
+        query_cells = self._cell_idxs(query_coords)
+
+        for query_idxs, atm_idxs in self._iter_candidates(query_cells, chunk_size):
+            dists = self.get_distances(query_coords[query_idxs], self.atm_coords[atm_idxs])
+            mask = dists <= cutoff
+            yield (query_idxs[mask], atm_idxs[mask], dists[mask])
+
+    def get_contacts(self, query_coords, cutoff=None, first_only=False):
+        """
+        Get the query coordinates that are closer than cutoff to any binned atom.
+
+        Parameters
+        ----------
+        query_coords : array of floats
+            (m, 3)-array with the coordinates to check
+        cutoff : float or None
+            see iter_pairs
+        first_only : bool
+            stop searching after the first block with any contact
+
+        Returns
+        -------
+        query_idxs : array of ints
+            sorted indices of the query coordinates with close contacts
+
+        """
+        contacts = [np.zeros(0, dtype=int)]
+
+        for query_idxs, _, _ in self.iter_query(query_coords, cutoff):
+            contacts.append(query_idxs)
+
+            if first_only is True and len(query_idxs) > 0:
+                break
+
+        return np.unique(np.concatenate(contacts))
+
+
+def rechunk(blocks, chunk_size):
+    """
+    Merge and split blocks of equally long arrays to blocks of chunk_size rows.
+
+    Parameters
+    ----------
+    blocks : iterable of tuples of arrays
+        e.g. (idxs_i, idxs_j, dists) as yielded by CellList.iter_pairs
+    chunk_size : int
+        rows of each yielded block (the last block may be smaller)
+
+    Yields
+    ------
+    block : tuple of arrays
+
+    """
+    buffered = []
+    nbuffered = 0
+
+    for block in blocks:
+        if len(block[0]) == 0:
+            continue
+
+        buffered.append(block)
+        nbuffered += len(block[0])
+
+        while nbuffered >= chunk_size:
+            merged = [np.concatenate(i) for i in zip(*buffered)]
+            yield tuple(i[:chunk_size] for i in merged)
+            buffered = [tuple(i[chunk_size:] for i in merged)]
+            nbuffered -= chunk_size
+
+    if nbuffered > 0:
+        yield tuple(np.concatenate(i) for i in zip(*buffered))
@@ -87,6 +87,7 @@ class Universe(object):
         self.pair_types  = []  # holds all pair-coefficients
         # coordinate and box sections
         self.ts_coords   = []  # all coordinates of all frames
+        self.ts_dtype    = np.float64  # dtype of coordinates read from trajectories
         self.ts_forces   = []  # all forces of all frames
         #self.ts_velocs   = []  # all velocities of all frames
         self.ts_boxes    = []  # instances of Box() of each frame
@@ -981,228 +982,132 @@ class Universe(object):
         linked_cells.create_lnk_cells(rcut_a, rcut_b, rcut_c)
         self.ts_lnk_cls.append(linked_cells)
 
+    def create_cell_list(self, frame_id=-1, cutoff=4.0, atm_idxs=None):
+        """
+        Bin atoms into vectorized linked cells (see md_linked_cells.CellList).
+
+        Parameters
+        ----------
+        frame_id : int
+            frame whose coordinates and box are used
+        cutoff : float
+            largest distance that will be searched for
+        atm_idxs : array of ints or None
+            atoms to bin (default: all atoms); pairs found by the cell list
+            are indices into atm_idxs
+
+        Returns
+        -------
+        cell_list : md_linked_cells.CellList
+
+        Raises
+        ------
+        ValueError
+            if cutoff exceeds half of the smallest width of the box
+
+        """
+        tmp_copy_box = copy.copy(self.ts_boxes[frame_id])
+
+        if tmp_copy_box.boxtype == "lammps":
+            tmp_copy_box.box_lmp2lat()
+        elif tmp_copy_box.boxtype == "cartesian":
+            tmp_copy_box.box_cart2lat()
+
+        atm_coords = np.asarray(self.ts_coords[frame_id], dtype=np.float64)
+
+        if atm_idxs is not None:
+            atm_coords = atm_coords[atm_idxs]
+
+        return mdlc.CellList(atm_coords,
+                             tmp_copy_box.ltc_a,
+                             tmp_copy_box.ltc_b,
+                             tmp_copy_box.ltc_c,
+                             tmp_copy_box.ltc_alpha,
+                             tmp_copy_box.ltc_beta,
+                             tmp_copy_box.ltc_gamma,
+                             cutoff)
+
     def chk_atm_dist(self,
                      frame_id=-1,
                      min_dist=0.80,
                      exclude_same_molecule=True,
                      excluded_atm_idxs=None,
                      get_aggregates=False,
+                     chunk_size=mdlc.CHUNK_SIZE,
                      debug=False):
         """
-        Check the inter atomic distances inside the sub cells and between
-        atoms of neighboring sub cells. Each sub cell has 26 neighbor cells.
+        Check the inter atomic distances of all atoms (periodic boundaries).
+
+        Pairs closer than min_dist are taken in blocks of chunk_size pairs from
+        the cell list (see md_linked_cells.CellList.iter_pairs) and reduced on
+        the fly, i.e. the memory needed does not grow with the number of close
+        contacts.
 
         Input:
             > min_dist      float; minimal distance between two atoms
-            > periodic      boolean; check also atoms which lie in periodic boxes.
             > exclude_same_molecule boolean; do not compare atoms of the same molecule
             > get_aggregates boolean; check if all atoms are part of the same aggregate,
                                 return an array of atom-indices if True for each aggregate
             > excluded_atm_ids list, tuple or set of int; indices of atoms to be excluded from the distance check
+            > chunk_size    int; number of pairs processed at once
 
         Return:
-            > close_contacts    list of lists; contains all atom-idx with closer
+            > close_contacts    set; contains all atom-idx with closer
                                 contacts as min_dist
         """
-        if debug is True:
-            # not sure if that is the case - i think this works with wrapped cells
-            print("***Info: Atom distance check only works with unwrapped cells! " +
-                  "Unwrap cells if necessary.")
-
-        if excluded_atm_idxs is None:
-            excluded_atm_idxs = []
-
-        # convert lists, tuples to set
-        if not isinstance(excluded_atm_idxs, set):
-            if isinstance(excluded_atm_idxs, (list, tuple)):
-                excluded_atm_idxs = set(excluded_atm_idxs)
-
-        # PBC - get cartesian box vectors
-        this_boxtype = self.ts_boxes[frame_id].boxtype
-        tmp_box = copy.copy(self.ts_boxes[frame_id])
-
-        # convert (the copy) of the current box-type to a cartesian box-type
-        if this_boxtype == "lammps":
-            tmp_box.box_lmp2cart()
-        elif this_boxtype == "lattice":
-            tmp_box.box_lat2cart()
-        else:
-            pass
-
         if exclude_same_molecule is True and debug is True:
             print("***Info: 'exclude_same_molecule' chosen. " +
                   "Groups should be assigned by molecule affiliation " +
                   "or this will fail!")
 
-        # get maximum possible number of aggregates
-        if get_aggregates is True:
-            connected_groups = []
+        # only atoms which are not excluded are binned
+        included = np.ones(len(self.atoms), dtype=bool)
 
-        # linked cells must have been defined before
-        linked_cells = self.ts_lnk_cls[frame_id]
+        if excluded_atm_idxs is not None and len(excluded_atm_idxs) > 0:
+            included[list(excluded_atm_idxs)] = False
 
-        # to check intra-sub-cellular distances convert the fractional coordinates
-        # back to cartesian coordinates
-        close_contacts = []
-
-        # number n-1 of boxes to check (without the last one since we start counting from 0 to n-1)
-        ra = linked_cells.ra
-        rb = linked_cells.rb
-        rc = linked_cells.rc
+        atm_idxs = np.flatnonzero(included)
+        atm_grp_ids = np.array([self.atoms[i].grp_id for i in atm_idxs], dtype=int)
+        atm_groups = atm_grp_ids if exclude_same_molecule is True else None
 
         if debug is True:
             print("***Info: Checking distances")
             start = time.time()
 
-        # matrix cartesian to fractional (inverse of fractional matrix)
-        M_fc = agc.M_fract2cart(linked_cells.ltc_a,
-                                linked_cells.ltc_b,
-                                linked_cells.ltc_c,
-                                linked_cells.ltc_alpha,
-                                linked_cells.ltc_beta,
-                                linked_cells.ltc_gamma)
-
-        for cra in range(ra):
-            # check from a along box vector b
-            for crb in range(rb):
-                # finally check along box vector c (from a and b)
-                for crc in range(rc):
-
-                    if debug is True:
-                        print("Checking current cell: ", cra, crb, crc)
-
-                    # position of current cell
-                    current_cell = linked_cells.linked_cells[cra][crb][crc]
-
-                    # 0 = same cell, 1 = next cell along a
-                    for i in [-1, 0, 1]:
-                        cra_idx = cra + i
-
-                        # if neighbor cell index reached last cell,
-                        # the mirrored neighbor is the first cell
-                        # but the coordinates of the neibhbor need to be shifted
-                        shift_cell_ra_0 = False
-
-                        if cra_idx == ra:
-                            shift_cell_ra_0 = True
-                            cra_idx = 0
-
-                        # 0 = same cell, 1 = next cell along b
-                        for j in [-1, 0, 1]:
-                            crb_idx = crb + j
-
-                            # if neighbor cell index reached last cell,
-                            # the mirrored neighbor is the first cell
-                            # but the coordinates of the neibhbor need to be shifted
-                            shift_cell_rb_0 = False
-
-                            if crb_idx == rb:
-                                shift_cell_rb_0 = True
-                                crb_idx = 0
-
-                            # 0 = same cell, 1 = next cell along c
-                            for k in [-1, 0, 1]:
-                                crc_idx = crc + k
-
-                                # if neighbor cell index reached last cell,
-                                # the mirrored neighbor is the first cell
-                                # but the coordinates of the neibhbor need to be shifted
-                                shift_cell_rc_0 = False
-
-                                if crc_idx == rc:
-                                    shift_cell_rc_0 = True
-                                    crc_idx = 0
-
-                                # check coordinates of current cell vs coordinates of cur_neighbor_cell
-                                cur_neighbor_cell = linked_cells.linked_cells[cra_idx][crb_idx][crc_idx]
-
-                                if debug is True:
-                                    print("Checking neighbor cell: ", cra_idx, crb_idx, crc_idx)
-
-                                for cidx_a in current_cell:
-                                    for cidx_b in cur_neighbor_cell:
-                                        # make a temporary copy of the current
-                                        # coordinates since we do not want to
-                                        # alter them permanently
-                                        tmp_coords_cidx_b = np.copy(linked_cells.atm_coords[cidx_b])
-
-                                        # skip atoms which are part of the same molecule (i.e. same grp_id) or if they are in the exclusion list (excluded_atm_idxs)
-                                        if exclude_same_molecule is True and (self.atoms[cidx_a].grp_id == self.atoms[cidx_b].grp_id):
-                                            continue
-
-                                        # skip all excluded atoms
-                                        if excluded_atm_idxs != []:
-                                            if cidx_a in excluded_atm_idxs or cidx_b in excluded_atm_idxs:
-                                                continue
-
-                                        # comparing first with last, therefor we have to shift
-                                        # the coordinates of the last back towards the first cell
-                                        if cra_idx == -1:
-                                            tmp_coords_cidx_b[0] = linked_cells.atm_coords[cidx_b][0] - 1
-
-                                        if crb_idx == -1:
-                                            tmp_coords_cidx_b[1] = linked_cells.atm_coords[cidx_b][1] - 1
-
-                                        if crc_idx == -1:
-                                            tmp_coords_cidx_b[2] = linked_cells.atm_coords[cidx_b][2] - 1
-
-                                        # comparing last with first, therefor we have to shift
-                                        # the coordinates from the first to the end
-                                        if shift_cell_ra_0 is True:
-                                            tmp_coords_cidx_b[0] = linked_cells.atm_coords[cidx_b][0] + 1
-
-                                        if shift_cell_rb_0 is True:
-                                            tmp_coords_cidx_b[1] = linked_cells.atm_coords[cidx_b][1] + 1
-
-                                        if shift_cell_rc_0 is True:
-                                            tmp_coords_cidx_b[2] = linked_cells.atm_coords[cidx_b][2] + 1
-
-                                        # get distance vector
-                                        vt_a = linked_cells.atm_coords[cidx_a]
-                                        vt_b = tmp_coords_cidx_b
-                                        vt_ab = vt_b - vt_a
-                                        # convert vector to cartesian coordinates
-                                        vt_ab = np.matmul(M_fc, vt_ab)
-                                        # get magnitude of distance vector
-                                        cdist = np.linalg.norm(vt_ab)
-
-                                        # compare if its magnitude is smaller than the given threshold
-                                        if cdist != 0 and cdist <= min_dist:
-                                            close_contacts.append(cidx_a)
-                                            close_contacts.append(cidx_b)
-
-                                            # add group id, but only if this combination is not already present
-                                            if get_aggregates is True:
-                                                if [self.atoms[cidx_a].grp_id, self.atoms[cidx_b].grp_id] not in connected_groups:
-                                                    connected_groups.append([self.atoms[cidx_a].grp_id, self.atoms[cidx_b].grp_id])
-
-                                        elif cdist == 0 and (cidx_a != cidx_b):
-                                            if debug is True:
-                                                print("***Warning: Distance between {} and {} is 0!".format(cidx_a, cidx_b))
-                                            close_contacts.append(cidx_a)
-                                            close_contacts.append(cidx_b)
-                                        else:
-                                            pass
+        cell_list = self.create_cell_list(frame_id, min_dist, atm_idxs)
+        close = np.zeros(len(atm_idxs), dtype=bool)
+        connected_groups = set()
+
+        for idxs_i, idxs_j, dists in cell_list.iter_pairs(groups=atm_groups,
+                                                          chunk_size=chunk_size):
+            close[idxs_i] = True
+            close[idxs_j] = True
+
+            if debug is True:
+                for cidx_a, cidx_b in zip(idxs_i[dists == 0], idxs_j[dists == 0]):
+                    print("***Warning: Distance between {} and {} is 0!".format(
+                        atm_idxs[cidx_a], atm_idxs[cidx_b]))
+
+            # add group ids, but only if this combination is not already present
+            if get_aggregates is True:
+                grp_pairs = np.unique(np.column_stack((atm_grp_ids[idxs_i],
+                                                       atm_grp_ids[idxs_j])), axis=0)
+                connected_groups.update(map(tuple, grp_pairs.tolist()))
 
         if debug is True:
             end = time.time()
             print("***Info: Distance search finished after: {} seconds.".format(end - start))
 
-        # remove duplicates
-        close_contacts = set(close_contacts)
-
-        #if get_aggregates is True:
-        #    print("***Info: Connected groups: ", connected_groups)
+        close_contacts = set(atm_idxs[close].tolist())
 
         # ==============================#
         # merge molecules to aggregates
         # ==============================#
         if get_aggregates is True:
             # create a dict with all groups
-            connections = to_graph(connected_groups)
+            connections = to_graph([list(i) for i in connected_groups])
             aggregates = connected_components(connections)
             aggregates = [i for i in aggregates]  # generator to list
-            #print(aggregates)
             return (close_contacts, aggregates)
 
         return close_contacts
@@ -1935,18 +1840,131 @@ class Universe(object):
         self.ts_boxes = []
         self.ts_lnk_cls = []
 
-    def find_h_bonds(self, frame_id, distance):
+    def _atm_elements(self):
+        """
+        Get the element of each atom by the mass of its atom type.
+        """
+        return [mde.elements.get(round(self.atm_types[atom.atm_key].weigh, 1), "X")
+                for atom in self.atoms]
+
+    def get_donor_hydrogen_pairs(self, donor_elements=("N", "O", "F")):
+        """
+        Find all hydrogen atoms bonded to possible h-bond donors.
+
+        Parameters
+        ----------
+        donor_elements : tuple of str
+            elements which may donate an h-bond
+
+        Returns
+        -------
+        donor_hydrogen_pairs : array of ints
+            (n, 2)-array with the indices of each donor and its hydrogen
+
+        """
+        elements = self._atm_elements()
+        donor_hydrogen_pairs = []
+
+        for cbond in self.bonds:
+            for donor, hydrogen in ((cbond.atm_id1, cbond.atm_id2),
+                                    (cbond.atm_id2, cbond.atm_id1)):
+                if elements[hydrogen] == "H" and elements[donor] in donor_elements:
+                    donor_hydrogen_pairs.append((donor, hydrogen))
+
+        return np.array(donor_hydrogen_pairs, dtype=int).reshape(-1, 2)
+
+    def get_acceptors(self, acceptor_elements=("N", "O", "F")):
+        """
+        Find all atoms which may accept an h-bond.
+        """
+        elements = self._atm_elements()
+        return np.array([idx for idx, element in enumerate(elements)
+                         if element in acceptor_elements], dtype=int)
+
+    def find_h_bonds(self, frame_ids=None, donor_hydrogen_pairs=None,
+                     acceptor_idxs=None, da_dist=3.5, dha_angle=120.0):
         """
         Find H-Bonds.
 
-        Measure the number of H-Bonds and return a list with atom-indices of all
-        atoms involved in the H-Bond, i.e. Acceptor, H-Atom, Donor.
+        Geometric criterion: the distance donor...acceptor must not exceed
+        da_dist and the angle donor-hydrogen...acceptor must be at least
+        dha_angle. Acceptors near each donor are taken from the cell list and
+        all angles of a frame are computed at once.
+
+        Parameters
+        ----------
+        frame_ids : list of ints or None
+            frames to process (default: all frames)
+        donor_hydrogen_pairs : array of ints or None
+            (n, 2)-array with donor and hydrogen indices (default: hydrogens
+            bonded to N, O or F, see get_donor_hydrogen_pairs)
+        acceptor_idxs : array of ints or None
+            indices of all acceptors (default: N, O and F, see get_acceptors)
+        da_dist : float
+            maximum distance between donor and acceptor
+        dha_angle : float
+            minimum angle donor-hydrogen...acceptor in degrees
+
+        Returns
+        -------
+        h_bonds : list of arrays
+            (m, 3)-array with the indices of donor, hydrogen and acceptor of
+            each h-bond for each frame
+
         """
+        if frame_ids is None:
+            frame_ids = list(range(len(self.ts_coords)))
+
+        if donor_hydrogen_pairs is None:
+            donor_hydrogen_pairs = self.get_donor_hydrogen_pairs()
+
+        if acceptor_idxs is None:
+            acceptor_idxs = self.get_acceptors()
+
+        donor_hydrogen_pairs = np.asarray(donor_hydrogen_pairs, dtype=int).reshape(-1, 2)
+        acceptor_idxs = np.asarray(acceptor_idxs, dtype=int)
+        donors, hydrogens = donor_hydrogen_pairs.T
+        cos_dha_angle = math.cos(math.radians(dha_angle))
+        h_bonds = []
 
-        # create linked cells of non already exist
-        if self.ts_lnk_cls != []:
-            print("***Info: Creating linked cells.")
-            self.create_linked_cells(frame_id)
+        for frame_id in frame_ids:
+            frame_h_bonds = [np.zeros((0, 3), dtype=int)]
+
+            if len(donors) == 0 or len(acceptor_idxs) == 0:
+                h_bonds.append(frame_h_bonds[0])
+                continue
+
+            cell_list = self.create_cell_list(frame_id, da_dist, acceptor_idxs)
+            atm_coords = np.asarray(self.ts_coords[frame_id], dtype=np.float64)
+            frac_donors = cell_list.to_fractional(atm_coords[donors])
+            frac_hydrogens = cell_list.to_fractional(atm_coords[hydrogens])
+            vts_hd = cell_list.get_vectors(frac_hydrogens, frac_donors)
+
+            for pair_idxs, acc_idxs, _ in cell_list.iter_query(frac_donors, coords_type="fractional"):
+                acceptors = acceptor_idxs[acc_idxs]
+                mask = acceptors != donors[pair_idxs]
+                pair_idxs = pair_idxs[mask]
+                acc_idxs = acc_idxs[mask]
+                acceptors = acceptors[mask]
+
+                # angle donor-hydrogen...acceptor
+                vts_hd_cur = vts_hd[pair_idxs]
+                vts_ha = cell_list.get_vectors(frac_hydrogens[pair_idxs],
+                                               cell_list.atm_coords[acc_idxs])
+                cos_angles = (np.einsum("ij,ij->i", vts_hd_cur, vts_ha) /
+                              (np.linalg.norm(vts_hd_cur, axis=1) *
+                               np.linalg.norm(vts_ha, axis=1)))
+                mask = cos_angles <= cos_dha_angle
+                frame_h_bonds.append(np.column_stack((donors[pair_idxs[mask]],
+                                                      hydrogens[pair_idxs[mask]],
+                                                      acceptors[mask])))
+
+            frame_h_bonds = np.concatenate(frame_h_bonds)
+            # same order regardless of the cells
+            frame_h_bonds = frame_h_bonds[np.lexsort(frame_h_bonds.T[::-1])]
+            h_bonds.append(frame_h_bonds)
+
+        return h_bonds
 
     def atom_ids_by_resname(self, resnames):
         """
@@ -1975,22 +1993,108 @@ class Universe(object):
 
         return atom_ids
 
+    def _molecule_idxs(self):
+        """
+        Get the index of the molecule (self.molecules) of each atom.
+        """
+        mol_idxs = np.full(len(self.atoms), -1, dtype=int)
+
+        for mol_idx, molecule in enumerate(self.molecules):
+            mol_idxs[list(molecule)] = mol_idx
+
+        return mol_idxs
+
+    def connect_molecules(self, frame_id=-1, atm_atm_dist=4, excluded_atm_idxs=None,
+                          stop_if_connected=False):
+        """
+        Join molecules with close contacts to aggregates.
+
+        Pairs of atoms closer than atm_atm_dist are taken block by block from
+        the cell list and their molecules are merged using union-find.
+        Molecules with any excluded atom are left out completely.
+
+        Parameters
+        ----------
+        frame_id : int
+            frame to process
+        atm_atm_dist : float
+            largest distance between two atoms of neighboring molecules
+        excluded_atm_idxs : list, tuple or set of int or None
+            atoms whose molecules are not part of any aggregate
+        stop_if_connected : bool
+            stop searching as soon as all molecules form a single aggregate
+
+        Returns
+        -------
+        aggregates : md_universe_helper_functions.UnionFind
+            disjoint sets of the included molecules
+        mol_idxs : array of ints
+            indices (self.molecules) of the included molecules; item i of
+            aggregates is molecule mol_idxs[i]
+
+        """
+        atm_mol_idxs = self._molecule_idxs()
+        included = np.ones(len(self.molecules), dtype=bool)
+
+        if excluded_atm_idxs is not None and len(excluded_atm_idxs) > 0:
+            excluded_mols = atm_mol_idxs[np.asarray(list(excluded_atm_idxs), dtype=int)]
+            included[excluded_mols[excluded_mols >= 0]] = False
+
+        mol_idxs = np.flatnonzero(included)
+        aggregates = mduh.UnionFind(len(mol_idxs))
+
+        if aggregates.ncomponents <= 1:
+            return (aggregates, mol_idxs)
+
+        # molecule index -> index of included molecule
+        mol_included_idxs = np.full(len(self.molecules), -1, dtype=int)
+        mol_included_idxs[mol_idxs] = np.arange(len(mol_idxs))
+
+        # only atoms of included molecules are binned (atoms without molecule
+        # have the molecule index -1 and are skipped)
+        atm_idxs = np.flatnonzero(atm_mol_idxs >= 0)
+        atm_idxs = atm_idxs[mol_included_idxs[atm_mol_idxs[atm_idxs]] >= 0]
+        atm_groups = mol_included_idxs[atm_mol_idxs[atm_idxs]]
+        cell_list = self.create_cell_list(frame_id, atm_atm_dist, atm_idxs)
+        nmols = len(mol_idxs)
+
+        for idxs_i, idxs_j, _ in cell_list.iter_pairs(groups=atm_groups):
+            # each molecule pair only has to be merged once
+            mol_pairs = np.unique(atm_groups[idxs_i] * nmols + atm_groups[idxs_j])
+
+            for mol_pair in mol_pairs.tolist():
+                aggregates.union(mol_pair // nmols, mol_pair % nmols)
+
+            if stop_if_connected is True and aggregates.ncomponents == 1:
+                break
+
+        return (aggregates, mol_idxs)
+
+    def get_cluster_sizes(self, frame_id=-1, atm_atm_dist=4, excluded_atm_idxs=None):
+        """
+        Get the number of molecules of each aggregate (largest first).
+
+        See connect_molecules for the parameters.
+        """
+        aggregates, _ = self.connect_molecules(frame_id, atm_atm_dist,
+                                               excluded_atm_idxs)
+        return [len(i) for i in aggregates.components()]
+
     def check_aggregate(self, frame_id=-1, atm_atm_dist=4, excluded_atm_idxs=None,
                         unwrap=False, debug=False):
         """
         Check if several molecules form an aggregate.
 
-        At the moment this works only for orthogonal cells (reason: sub-cell length)
-        Check if the aggregate did not get dissolved in the process. This is achieved
-        by calculating the center of geometry for each molecule and subsequent com-
-        parison of the distance between each center of geometry. The smallest distance
-        must not be larger than four times the radius of the biggest molecule in the
-        system.
+        Check if the aggregate did not get dissolved in the process. Molecules
+        with atoms closer than atm_atm_dist are joined (see connect_molecules);
+        the search stops as soon as all molecules are part of the same aggregate.
 
         Input:
             > frame_id          int; frame to process
             > atm_atm_dist      float; radius around an atom in which another atom
                                 should be positioned
+            > excluded_atm_idxs list, tuple or set of int; molecules of these atoms
+                                are not checked
             > debug             boolean; True if further output should be given,
                                 default=False
 
@@ -2004,56 +2108,16 @@ class Universe(object):
             print("***Check Aggregate Info: Unwrapping cell")
             self.unwrap_cell(frame_id)
 
-        # maximal possible distance between two atoms
-        cube_side = atm_atm_dist / math.sqrt(3)  # -> atm_atm_dist/(2*math.sqrt(3)) * 2
-
-        if debug is True:
-            print("***Check Aggregate Info: Cube side {}".format(cube_side))
-
-        self.create_linked_cells(frame_id, rcut_a=cube_side, rcut_b=cube_side, rcut_c=cube_side)
-
-        if excluded_atm_idxs is None:
-            excluded_atm_idxs = []
-            # no molecule is excluded
-            not_excluded_molecules = self.molecules
-        else:
-            # get all molecules that do not have any excluded atoms
-            not_excluded_molecules = []
-            exclude_molecule = False
-
-            for molecule in self.molecules:
-                # stop further searching if a single atom of the molecule is
-                # excluded
-                for atom in molecule:
-                    if atom in excluded_atm_idxs:
-                        exclude_molecule = True
-                        break
-
-                # only add the molecule if none of its atoms is excluded
-                if exclude_molecule is False:
-                    not_excluded_molecules.append(molecule)
-
-                # reset the exclusion for the next molecule
-                exclude_molecule = False
-
-        # include same molecule or it gets missing in our aggregates set
-        close_atoms, aggregates = self.chk_atm_dist(frame_id, min_dist=atm_atm_dist, exclude_same_molecule=True, get_aggregates=True, excluded_atm_idxs=excluded_atm_idxs, debug=False)
+        aggregates, _ = self.connect_molecules(frame_id, atm_atm_dist,
+                                               excluded_atm_idxs,
+                                               stop_if_connected=True)
 
         if debug is True:
-            debug_str = "***Check Aggregate Info: Number of cubes in direction"
-            print("{} a {}".format(debug_str, self.ts_lnk_cls[frame_id].ra))
-            print("{} b {}".format(debug_str, self.ts_lnk_cls[frame_id].rb))
-            print("{} c {}".format(debug_str, self.ts_lnk_cls[frame_id].rc))
-            print("***Group IDs of all aggregates: {}".format(aggregates))
-            print("***IDs of close atoms: {}".format(" ".join([str(i) for i in close_atoms])))
-
-        #print(len(aggregates))
-        #print(len(aggregates[0]))
-        #print(len(not_excluded_molecules))
-        #pdb.set_trace()
+            print("***Check Aggregate Info: Number of aggregates: {}".format(
+                aggregates.ncomponents))
 
         # aggregate is only o.k. if all molecules are part of it
-        if len(aggregates) == 1 and (len(aggregates[0]) == len(not_excluded_molecules)):
+        if aggregates.ncomponents <= 1:
             aggregate_ok = True
 
             if debug is True:
@@ -2062,7 +2126,6 @@ class Universe(object):
             print("***Error: Aggregate of frame {} looks (partially) dissolved :(".format(frame_id))
             aggregate_ok = False
 
-        #pdb.set_trace()
         return aggregate_ok
 
     def calculate_total_mass(self):
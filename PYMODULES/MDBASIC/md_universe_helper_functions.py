@@ -185,3 +185,56 @@ def get_atm_id3(item):
 
 def get_atm_id4(item):
     return item.atm_id4
+
+
+class UnionFind(object):
+    """
+    Disjoint sets (e.g. of molecules) with path compression and union by size.
+    """
+    def __init__(self, nitems):
+        self.parent = list(range(nitems))
+        self.size = [1] * nitems
+        self.ncomponents = nitems
+
+    def find(self, item):
+        """
+        Get the root of the set item belongs to.
+        """
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+
+        return root
+
+    def union(self, item_a, item_b):
+        """
+        Merge the sets of item_a and item_b. Return True if they were separate.
+        """
+        root_a = self.find(item_a)
+        root_b = self.find(item_b)
+
+        if root_a == root_b:
+            return False
+
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.ncomponents -= 1
+        return True
+
+    def components(self):
+        """
+        Get all sets as lists of items, largest set first.
+        """
+        sets = {}
+
+        for item in range(len(self.parent)):
+            sets.setdefault(self.find(item), []).append(item)
+
+        return sorted(sets.values(), key=len, reverse=True)
@@ -0,0 +1,54 @@
+"""
+Pair searches of CellList against all pairs (run with pytest).
+"""
+
+import itertools as it
+import numpy as np
+import pytest
+import md_linked_cells as mdlc
+
+RIGHT = np.pi / 2
+
+
+def _all_pairs(cell_list, cutoff):
+    """
+    Pairs closer than cutoff found by checking every pair of atoms.
+    """
+    pairs = np.array(list(it.combinations(range(len(cell_list.atm_coords)), 2)))
+    dists = cell_list.get_distances(cell_list.atm_coords[pairs[:, 0]],
+                                    cell_list.atm_coords[pairs[:, 1]])
+    return set(map(tuple, pairs[dists < cutoff]))
+
+
+def _found_pairs(cell_list, cutoff=None):
+    return set((idx_i, idx_j) for idx_i, idx_j, _ in zip(*cell_list.get_pairs(cutoff)))
+
+
+@pytest.mark.parametrize("box", [
+    (10.0, 10.0, 10.0, RIGHT, RIGHT, RIGHT),
+    (12.0, 9.0, 10.0, np.radians(80), np.radians(100), np.radians(70)),
+])
+def test_pairs(box):
+    rng = np.random.RandomState(0)
+    coords = rng.uniform(0.0, 1.0, (200, 3))
+    cell_list = mdlc.CellList(coords, *box, cutoff=3.0, coords_type="fractional")
+
+    assert _found_pairs(cell_list) == _all_pairs(cell_list, 3.0)
+    assert _found_pairs(cell_list, 1.5) == _all_pairs(cell_list, 1.5)
+
+
+def test_cutoff_of_half_the_box():
+    coords = np.array([[0.0, 0.0, 0.0], [4.9, 0.0, 0.0], [0.0, 0.0, 5.1]])
+    cell_list = mdlc.CellList(coords, 10.0, 10.0, 10.2, RIGHT, RIGHT, RIGHT, cutoff=5.0)
+    assert _found_pairs(cell_list) == {(0, 1)}
+
+
+def test_box_narrower_than_twice_the_cutoff():
+    coords = np.zeros((2, 3))
+
+    with pytest.raises(ValueError):
+        mdlc.CellList(coords, 20.0, 20.0, 7.0, RIGHT, RIGHT, RIGHT, cutoff=4.0)
+
+    # the perpendicular width (about 6.4) is smaller than all lattice vectors
+    with pytest.raises(ValueError):
+        mdlc.CellList(coords, 10.0, 10.0, 10.0, np.radians(40), RIGHT, RIGHT, cutoff=4.0)
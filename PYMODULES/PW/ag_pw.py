@@ -17,6 +17,7 @@ import scipy.constants as sc
 import md_box as mdb
 import md_stars as mds
 import md_universe as mdu
+import ag_filecache as agfc
 # import ag_vectalg as agv
 
 __version__ = "2018-06-22"
@@ -335,6 +336,7 @@ class PwStuff(mdu.Universe):
             print("***Warning: Folder for Pseudopotentials does not exist!")
             #time.sleep(5)
 
+    @agfc.cached_reader
     def read_pwout(self, pwout, read_crystal_sections=False, save_all_scf_steps=True):
         """
         CAVEAT: UNDER CONSTRUCTION! Read the output of pw.x.
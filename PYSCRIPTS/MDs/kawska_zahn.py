@@ -40,6 +40,7 @@ import md_box as mdb
 import ag_unify_md as agum
 import ag_geometry as agm
 import ag_unify_log as agul
+import ag_lmplog as agl
 import ag_vectalg as agv
 
 """
@@ -65,7 +66,9 @@ CAVEAT: THE PATTERN STUFF IS ADDED SHOULD BE ACCORDING TO A CERTAIN PROBABILITY.
 _pwd = os.getcwd()
 # percent of last values from log file to check
 percentage_to_check = 80
-_sqrt_3 = math.sqrt(3)
+
+# thermo output read so far of the log files checked for energy convergence
+log_tail = agl.LmpLogTail()
 
 thermargs = ["step", "temp", "press", "vol", "density",
              "cella", "cellb", "cellc", "cellalpha", "cellbeta", "cellgamma",
@@ -176,13 +179,12 @@ def check_energy_convergence(logfiles,
         > skewness, pvalue, zscore
         > data          list; all data for keyword from all files given
     """
-    data = []
+    # gather all values from all logfiles given (only lines written since the
+    # last check are parsed)
+    for logfile in logfiles:
+        log_tail.read_new(logfile)
 
-    # gather all values from all logfiles given
-    log_data = agul.LogUnification()
-    log_data.read_lmplog(*logfiles)
-    data = [value for data_index in range(len(log_data.data)) for value in
-            log_data.data[data_index][keyword]]
+    data = log_tail.get_values(keyword, *logfiles).tolist()
     num_values = len(data)
     percentage /= 100  # percentage to per cent
     testdata = data[-int(percentage * num_values):]
@@ -315,14 +317,9 @@ def check_aggregate(mdsys, frame_id=-1, atm_atm_dist=4, unwrap=False, debug=Fals
     """
     Check if several molecules form an aggregate.
 
-    #TODO Buggy, does not recognize aggregates properly when they form a chain?
-
-    At the moment this works only for orthogonal cells (reason: sub-cell length)
-    Check if the aggregate did not get dissolved in the process. This is achieved
-    by calculating the center of geometry for each molecule and subsequent com-
-    parison of the distance between each center of geometry. The smallest distance
-    must not be larger than four times the radius of the biggest molecule in the
-    system.
+    Molecules are joined by union-find on their close contacts (see
+    md_universe.Universe.check_aggregate); the search stops as soon as all
+    molecules are part of the same aggregate.
 
     Input:
         > mdsys             ag_unify_md.Unification; system output from 'SYS-PREPARATION'-step
@@ -336,45 +333,8 @@ def check_aggregate(mdsys, frame_id=-1, atm_atm_dist=4, unwrap=False, debug=Fals
         > aggregate_ok      boolean; True, if aggregate is still intact, False if
                             a part of it drifted away
     """
-    aggregate_ok = False
-
-    # lammps may internally have the coordinates wrapped -> unwrap cell when
-    # necessary (e.g. coordinates were taken from restart)
-    if unwrap is True:
-        print("***Check Aggregate Info: Unwrapping cell")
-        mdsys.unwrap_cell(frame_id)
-
-    # maximal possible distance between two atoms
-    cube_side = atm_atm_dist / _sqrt_3  # -> atm_atm_dist/(2*math.sqrt(3)) * 2
-
-    if debug is True:
-        print("***Check Aggregate Info: Cube side {}".format(cube_side))
-
-    mdsys.create_linked_cells(frame_id, rcut_a=cube_side, rcut_b=cube_side,
-                              rcut_c=cube_side)
-
-    # include same molecule or it gets missing in our aggregates set
-    close_atoms, aggregates = mdsys.chk_atm_dist(frame_id,
-                                                 min_dist=atm_atm_dist,
-                                                 exclude_same_molecule=False,
-                                                 get_aggregates=True,
-                                                 debug=False)
-
-    if debug is True:
-        print("***Check Aggregate Info: Number of cubes in direction a {}".format(mdsys.ts_lnk_cls[frame_id].ra))
-        print("***Check Aggregate Info: Number of cubes in direction b {}".format(mdsys.ts_lnk_cls[frame_id].rb))
-        print("***Check Aggregate Info: Number of cubes in direction c {}".format(mdsys.ts_lnk_cls[frame_id].rc))
-        print("***Group IDs of all aggregates: {}".format(aggregates))
-        print("***IDs of close atoms: {}".format(" ".join([str(i) for i in close_atoms])))
-
-    # aggregate is only o.k. if all molecules are part of it
-    if len(aggregates) == 1 and len(aggregates[0]) == len(mdsys.molecules):
-        aggregate_ok = True
-
-        if debug is True:
-            print("***Check Aggregate Info: Aggregate looks fine!")
-
-    return aggregate_ok
+    return mdsys.check_aggregate(frame_id=frame_id, atm_atm_dist=atm_atm_dist,
+                                 unwrap=unwrap, debug=debug)
 
 
 def cut_solvent_box(solvent_data, box, output_name, dcd_lammps=None):
@@ -1837,9 +1797,11 @@ for curcycle, idx_lmpa in remaining_cycles:
                         clog.read_lmplog(anneal_log)
 
                         # get index of frame with lowest potential energy
-                        if min_pe in clog.data[-1]["c_pe"]:
-                            # last frame is current frame read
-                            index_min_pe = clog.data[-1]["c_pe"].index(min_pe)
+                        # (last frame is current frame read)
+                        min_pe_idxs = np.flatnonzero(clog.data[-1]["c_pe"] == min_pe)
+
+                        if len(min_pe_idxs) > 0:
+                            index_min_pe = int(min_pe_idxs[0])
                             break
 
                     del (clog, min_pe)
@@ -1950,6 +1912,9 @@ for curcycle, idx_lmpa in remaining_cycles:
         if rank == 0:
             del solvate_sys
 
+    # logs of this cycle are not checked anymore
+    log_tail.forget()
+
     if rank == 0:
         print("***Current cycle finished successfully!")
 
@@ -32,12 +32,13 @@ args = parser.parse_args()
 cbz = agum.Unification()
 cbz.read_lmpdat(args.lmpdat)
 cbz.import_dcd(args.dcd)
-cbz.read_frames(frame=args.start)
 
 with open(args.out, "w") as f_out:
     f_out.write("{:>9}{:>17}{:>17}{:>17}{:>17}\n".format("Step", "ang_C13_N8_C5", "ang_C13_N8_C9", "ang_C9_N8_C5", "ang_b1_N8_b2"))
 
-    for n, frame in enumerate(cbz.ts_coords[args.start:]):
+    # frames are read one by one, only the current one is kept
+    for n, (frame, _) in enumerate(cbz.iter_frames(start=int(args.start))):
+        frame = frame.astype(float)
 
         # omega-1/-2/-3 - angles between carbon and nitrogen
         ang_C13_N8_C5 = cgt.angle_between_vectors(frame[24]-frame[15], frame[24]-frame[7])
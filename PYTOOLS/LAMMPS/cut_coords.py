@@ -5,6 +5,7 @@ import math
 import argparse
 import md_box as mdb
 import ag_unify_md as agum
+import ag_lammps as aglmp
 import ag_vectalg as agv
 import copy
 import numpy as np
@@ -30,8 +31,10 @@ parser.add_argument("-out",
 
 args = parser.parse_args()
 
+# forces and velocities are not cut by delete_atoms, skip them (and everything after them)
 mainsys = agum.Unification()
-mainsys.read_lmpdat(args.mainfile)
+mainsys.read_lmpdat(args.mainfile, sections=[i for i in aglmp.LMPDAT_SECTIONS
+                                             if i not in ("Velocities", "Forces")])
 #mainsys.ts_coords[-1] = [round(i, 3) for j in mainsys.ts_coords[-1] for i in j]
 cutsys = agum.Unification()
 #cutsys.read_pdb(args.coordinates_file)
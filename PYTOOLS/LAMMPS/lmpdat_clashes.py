@@ -48,9 +48,12 @@ frame = args.frame
 mydata = agum.Unification()
 mydata.read_lmpdat(args.lmpdat)
 mydata.import_dcd(args.dcd)
-mydata.read_frames(frame=None, to_frame=-1, frame_by="index")
-mydata.create_linked_cells(frame_id=args.frame, rcut_a=2, rcut_b=2, rcut_c=2)
-close_contacts = mydata.chk_atm_dist(frame_id=args.frame, min_dist=args.min_dist,
+# only the requested frame is read
+coords, box = next(mydata.iter_frames(start=frame))
+mydata.ts_coords = [coords.astype(float)]
+mydata.ts_boxes = [box]
+mydata.close_dcd()
+close_contacts = mydata.chk_atm_dist(frame_id=-1, min_dist=args.min_dist,
                                      exclude_same_molecule=False)
 #pdb.set_trace()
 print(close_contacts)